@@ -1,48 +1,76 @@
 import os
 import json
-from datetime import datetime, timezone
+import hashlib
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
-from flask import Flask, jsonify, request, redirect
+from flask import Flask, jsonify, request, redirect, stream_with_context
 from flask_cors import CORS
-from sqlalchemy import (Column, Integer, String, DateTime, Boolean, Text, create_engine, text)
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy import (Column, Integer, String, DateTime, Boolean, Text, Index, select, insert, update, delete, literal, or_, and_)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
-from scrapers.allevents import scrape_allevents
-from scrapers.eventfinda import scrape_eventfinda
-from scrapers.skiddle import scrape_skiddle
-from scrapers.sydney_com import scrape_sydney_com
-from scrapers.cityofsydney import scrape_cityofsydney
+from scrapers import registry as source_registry
+from scrapers.fanout import CityFanout
+from scrapers.session import validator_store, session_registry
+from scrapers.dates import annotate_event_times, parse_datetime, timezone_for_city
+from cache import ResponseCache
+from limits import RateLimiter, SessionStore, client_ip, store_from_url
+from database import make_engine
+from mailer import MailQueue, SMTPPool
+from mxcache import MXCache, dns_resolver
+from migrations import Migrator
+import dedup
+import exports
+import search
+import serializers
+from jobs import JobRunner, lock_from_url
 import re
 import uuid
-import socket
-try:
-    import dns.resolver
-except Exception:
-    dns = None
-import smtplib
-from email.message import EmailMessage
-import threading
-import time
+import base64
+from urllib.parse import urlencode
 from functools import wraps
 from flask import make_response
-from threading import Lock
 
 DB_PATH = os.environ.get("DB_PATH", "sqlite:///events.db")
 
 Base = declarative_base()
 
 
+def normalize_city(city):
+    return (city or "").strip().lower() or None
+
+
+def as_utc(dt):
+    # SQLite hands back naive datetimes; everything is stored in UTC
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt.astimezone(timezone.utc)
+
+
+def utc_isoformat(dt):
+    return as_utc(dt).isoformat() if dt else None
+
+
 class Event(Base):
     __tablename__ = "events"
     id = Column(Integer, primary_key=True)
     title = Column(String(512), nullable=False)
     start_time = Column(String(128))
     end_time = Column(String(128))
+    # start/end parsed from the raw text above, stored in UTC
+    start_at = Column(DateTime(timezone=True))
+    end_at = Column(DateTime(timezone=True))
     venue = Column(String(512))
     address = Column(String(1024))
     city = Column(String(128))
+    # lower-cased, trimmed city used for indexed equality lookups
+    city_key = Column(String(128), default=lambda ctx: normalize_city(ctx.get_current_parameters().get("city")))
     description = Column(Text)
     category = Column(String(256))
     image_url = Column(String(1024))
@@ -51,6 +79,17 @@ class Event(Base):
     last_scraped_time = Column(DateTime)
     active = Column(Boolean, default=True)
     featured = Column(Boolean, default=False)
+    # sha1 over EVENT_UPDATE_FIELDS, see event_fingerprint()
+    content_hash = Column(String(40))
+    # id of the canonical event of this event's near-duplicate cluster (its
+    # own id when it has no duplicates), see cluster_events()
+    cluster_id = Column(Integer)
+
+    __table_args__ = (
+        Index("ix_events_city_active_start_at", "city_key", "active", "start_at", "id"),
+        Index("ix_events_start_at", "start_at"),
+        Index("ix_events_source", "source"),
+    )
 
     def to_dict(self):
         return {
@@ -58,6 +97,8 @@ class Event(Base):
             "title": self.title,
             "start_time": self.start_time,
             "end_time": self.end_time,
+            "start_at": utc_isoformat(self.start_at),
+            "end_at": utc_isoformat(self.end_at),
             "venue": self.venue,
             "address": self.address,
             "city": self.city,
@@ -69,6 +110,7 @@ class Event(Base):
             "last_scraped_time": self.last_scraped_time.isoformat() if self.last_scraped_time else None,
             "active": self.active,
             "featured": self.featured,
+            "cluster_id": self.cluster_id,
         }
 
 
@@ -87,6 +129,14 @@ class TicketRequest(Base):
     ip_address = Column(String(64), nullable=True)
     user_agent = Column(String(512), nullable=True)
 
+    __table_args__ = (
+        Index("ix_ticket_requests_event_id", "event_id"),
+        # newest-first keyset pagination
+        Index("ix_ticket_requests_created_at_id", "created_at", "id"),
+        # looked up on every confirmation click
+        Index("ix_ticket_requests_confirm_token", "confirm_token"),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
@@ -103,78 +153,175 @@ class TicketRequest(Base):
         }
 
 
-engine = create_engine(DB_PATH, connect_args={"check_same_thread": False} if "sqlite" in DB_PATH else {})
-SessionLocal = sessionmaker(bind=engine)
-Base.metadata.create_all(engine)
+class ScrapeJob(Base):
+    __tablename__ = "scrape_jobs"
+    id = Column(String(32), primary_key=True, default=lambda: uuid.uuid4().hex)
+    status = Column(String(16), nullable=False, default="queued")  # queued, running, finished, failed
+    # 1 while queued or running, NULL afterwards; unique so at most one job is in flight
+    inflight = Column(Integer, unique=True, nullable=True, default=1)
+    trigger = Column(String(16))  # api, schedule
+    cities = Column(Text)  # JSON list
+    requested_at = Column(DateTime(timezone=True))
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    progress = Column(Text)  # JSON: per-city and per-source status, counts and durations
+    error = Column(Text)
+
+    __table_args__ = (
+        Index("ix_scrape_jobs_status_requested_at", "status", "requested_at"),
+    )
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "trigger": self.trigger,
+            "cities": json.loads(self.cities) if self.cities else None,
+            "requested_at": utc_isoformat(self.requested_at),
+            "started_at": utc_isoformat(self.started_at),
+            "finished_at": utc_isoformat(self.finished_at),
+            "progress": json.loads(self.progress) if self.progress else None,
+            "error": self.error,
+        }
 
 
-def ensure_schema():
-    # ensure 'featured' column exists for sqlite (simple migration)
-    if "sqlite" in DB_PATH:
-        conn = engine.connect()
-        try:
-            # Use text() to execute PRAGMA via SQLAlchemy connection
-            res = conn.execute(text("PRAGMA table_info('events')"))
-            cols = [r[1] for r in res.fetchall()]
-            if 'featured' not in cols:
-                try:
-                    conn.execute(text("ALTER TABLE events ADD COLUMN featured BOOLEAN DEFAULT 0"))
-                    print("Added 'featured' column to events table")
-                except Exception as e:
-                    # best-effort: ignore if cannot alter
-                    print(f"Could not add 'featured' column: {e}")
-        except Exception as e:
-            print(f"ensure_schema error: {e}")
-        finally:
-            conn.close()
-
-    # Also ensure ticket_requests columns exist (best-effort)
-    if "sqlite" in DB_PATH:
-        conn = engine.connect()
-        try:
-            res = conn.execute(text("PRAGMA table_info('ticket_requests')"))
-            cols = [r[1] for r in res.fetchall()]
-            add_cols = []
-            if 'confirmed' not in cols:
-                add_cols.append("ALTER TABLE ticket_requests ADD COLUMN confirmed BOOLEAN DEFAULT 0")
-            if 'confirm_token' not in cols:
-                add_cols.append("ALTER TABLE ticket_requests ADD COLUMN confirm_token VARCHAR(128)")
-            if 'confirm_sent_at' not in cols:
-                add_cols.append("ALTER TABLE ticket_requests ADD COLUMN confirm_sent_at DATETIME")
-            if 'confirmed_at' not in cols:
-                add_cols.append("ALTER TABLE ticket_requests ADD COLUMN confirmed_at DATETIME")
-            if 'ip_address' not in cols:
-                add_cols.append("ALTER TABLE ticket_requests ADD COLUMN ip_address VARCHAR(64)")
-            if 'user_agent' not in cols:
-                add_cols.append("ALTER TABLE ticket_requests ADD COLUMN user_agent VARCHAR(512)")
-            for sql in add_cols:
-                try:
-                    conn.execute(text(sql))
-                    print(f"Executed: {sql}")
-                except Exception as e:
-                    print(f"Could not execute '{sql}': {e}")
-        except Exception as e:
-            # table may not exist yet; create_all will handle it
-            print(f"ensure_schema ticket_requests error: {e}")
-        finally:
-            conn.close()
-
-
-ensure_schema()
+class EventChange(Base):
+    """One inserted, updated or deactivated event in an ingest run."""
+    __tablename__ = "event_changes"
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String(32), index=True)  # scrape job id, or a fresh id per ingest
+    event_id = Column(Integer, index=True)
+    original_url = Column(String(1024))
+    change = Column(String(16))  # inserted, updated, deactivated
+    fields = Column(Text)  # JSON list of changed fields for updates
+    changed_at = Column(DateTime(timezone=True), index=True)
 
-app = Flask(__name__)
-CORS(app)
+    def to_dict(self):
+        return {
+            "run_id": self.run_id,
+            "event_id": self.event_id,
+            "original_url": self.original_url,
+            "change": self.change,
+            "fields": json.loads(self.fields) if self.fields else None,
+            "changed_at": utc_isoformat(self.changed_at),
+        }
+
+
+# SQLite: WAL and friends applied on every connection; server databases: pool
+# settings (see database.py)
+engine = make_engine(
+    DB_PATH,
+    pragmas={
+        "synchronous": os.environ.get('DB_SQLITE_SYNCHRONOUS', 'NORMAL'),
+        "busy_timeout": int(os.environ.get('DB_SQLITE_BUSY_TIMEOUT', '5000')),
+        "mmap_size": int(os.environ.get('DB_SQLITE_MMAP_SIZE', str(256 * 1024 * 1024))),
+    },
+    pool={
+        "pool_size": int(os.environ.get('DB_POOL_SIZE', '5')),
+        "max_overflow": int(os.environ.get('DB_MAX_OVERFLOW', '10')),
+        "pool_timeout": float(os.environ.get('DB_POOL_TIMEOUT', '30')),
+        "pool_recycle": int(os.environ.get('DB_POOL_RECYCLE', '1800')),
+        "pool_pre_ping": os.environ.get('DB_POOL_PRE_PING', '1') not in ('0', 'false', 'no'),
+    },
+)
+SessionLocal = sessionmaker(bind=engine)
+# Schema changes ship as versioned migrations (migrations.py). With
+# DB_MIGRATE=auto each process applies pending ones on start (one query when
+# the schema is current); with "off" run `python migrate.py` before deploying.
+DB_MIGRATE = os.environ.get('DB_MIGRATE', 'auto')
+migrator = Migrator(
+    engine, Base.metadata,
+    lock=lambda: lock_from_url(os.environ.get('DB_MIGRATE_LOCK', 'db'), engine, 'migrate'),
+    wait=float(os.environ.get('DB_MIGRATE_WAIT', '300')),
+)
+if DB_MIGRATE == 'auto':
+    migrator.upgrade()
+elif DB_MIGRATE == 'off' and migrator.current() < migrator.head:
+    print(f"Database schema is behind (version {migrator.current()} of {migrator.head}); run `python migrate.py`")
 
-# Simple in-memory rate limiter: { ip: [timestamps] }
-_rate_limiter = {}
-_rate_lock = Lock()
+app = Flask(__name__)
+CORS(app, expose_headers=['X-Next-Cursor', 'Link', 'ETag'])
+
+# Number of reverse proxies in front of the app. Each appends the address it
+# saw to X-Forwarded-For, so the client address is taken that many entries
+# from the right; entries further left are client-supplied. 0 (the default)
+# ignores the header and uses the socket's peer address.
+TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES > 0:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES)
+
+# Per-IP token-bucket rate limits and admin sessions. "memory" is per process;
+# sqlite:///path shares them between gunicorn workers (see limits.py)
 RATE_LIMIT_MAX = int(os.environ.get('RATE_LIMIT_MAX', '5'))
 RATE_LIMIT_WINDOW = int(os.environ.get('RATE_LIMIT_WINDOW', str(60 * 60)))  # seconds
-
-# Simple in-memory admin session store: { token: expiry_timestamp }
-_admin_sessions = {}
-_admin_lock = Lock()
+ADMIN_LOGIN_RATE_LIMIT_MAX = int(os.environ.get('ADMIN_LOGIN_RATE_LIMIT_MAX', '10'))
+ADMIN_LOGIN_RATE_LIMIT_WINDOW = int(os.environ.get('ADMIN_LOGIN_RATE_LIMIT_WINDOW', str(15 * 60)))  # seconds
 ADMIN_SESSION_TTL = int(os.environ.get('ADMIN_SESSION_TTL', str(60 * 60)))  # seconds
+rate_limiter = RateLimiter(
+    store_from_url(os.environ.get('RATE_LIMIT_BACKEND', 'memory')), RATE_LIMIT_MAX, RATE_LIMIT_WINDOW,
+    enabled=os.environ.get('RATE_LIMIT_ENABLED', '1') not in ('0', 'false', 'no'),
+)
+admin_sessions = SessionStore(store_from_url(os.environ.get('ADMIN_SESSION_BACKEND', 'memory')), ADMIN_SESSION_TTL)
+
+# Response cache for read endpoints; use RESPONSE_CACHE_BACKEND=sqlite:///path
+# to share entries and invalidations between gunicorn workers
+response_cache = ResponseCache.from_url(
+    os.environ.get('RESPONSE_CACHE_BACKEND', 'memory'),
+    ttl=int(os.environ.get('RESPONSE_CACHE_TTL', '300')),
+    max_entries=int(os.environ.get('RESPONSE_CACHE_SIZE', '256')),
+    enabled=os.environ.get('RESPONSE_CACHE_ENABLED', '1') not in ('0', 'false', 'no'),
+)
+
+# Scraper execution: (source, city) jobs run in parallel, each bounded by its
+# own deadline; SCRAPER_SOURCE_CONCURRENCY caps concurrent jobs per host
+SCRAPER_MAX_WORKERS = int(os.environ.get('SCRAPER_MAX_WORKERS', '8'))
+SCRAPER_SOURCE_CONCURRENCY = int(os.environ.get('SCRAPER_SOURCE_CONCURRENCY', '1'))
+SCRAPER_SOURCE_DEADLINE = float(os.environ.get('SCRAPER_SOURCE_DEADLINE', '60'))
+
+
+def _parse_overrides(value, cast):
+    # "scrape_skiddle=30,scrape_allevents=45" -> {"scrape_skiddle": 30, ...}
+    out = {}
+    for part in (value or '').split(','):
+        if '=' not in part:
+            continue
+        k, v = part.split('=', 1)
+        try:
+            out[k.strip()] = cast(v.strip())
+        except ValueError:
+            print(f"Ignoring invalid scraper override: {part}")
+    return out
+
+
+def _parse_list(value):
+    # "allevents, skiddle" -> ["allevents", "skiddle"]; unset -> None
+    if value is None:
+        return None
+    return [part.strip() for part in value.split(',') if part.strip()]
+
+
+# Scraper sources: SCRAPER_SOURCES limits the run to the named sources and
+# SCRAPER_SOURCES_FILE (JSON) tunes, disables or adds sources
+SCRAPER_SOURCES_FILE = os.environ.get('SCRAPER_SOURCES_FILE')
+if SCRAPER_SOURCES_FILE:
+    source_registry.load(SCRAPER_SOURCES_FILE, enabled=_parse_list(os.environ.get('SCRAPER_SOURCES')))
+else:
+    source_registry.configure(enabled=_parse_list(os.environ.get('SCRAPER_SOURCES')))
+
+# Cities scraped every run; scheduled runs spread job starts over
+# SCRAPER_SPREAD seconds (default: half the interval)
+SCRAPER_CITIES = _parse_list(os.environ.get('SCRAPER_CITIES')) or ['Sydney']
+SCRAPER_INTERVAL_MINUTES = float(os.environ.get('SCRAPER_INTERVAL_MINUTES', '30'))
+SCRAPER_SPREAD = float(os.environ.get('SCRAPER_SPREAD', str(SCRAPER_INTERVAL_MINUTES * 60 / 2)))
+
+city_fanout = CityFanout(
+    source_registry,
+    max_workers=SCRAPER_MAX_WORKERS,
+    concurrency=SCRAPER_SOURCE_CONCURRENCY,
+    limits=_parse_overrides(os.environ.get('SCRAPER_SOURCE_LIMITS'), int),
+    deadline=SCRAPER_SOURCE_DEADLINE,
+    deadlines=_parse_overrides(os.environ.get('SCRAPER_SOURCE_DEADLINES'), float),
+)
 
 
 def require_admin(func):
@@ -186,17 +333,9 @@ def require_admin(func):
         if admin_token_env and header and header == admin_token_env:
             return func(*args, **kwargs)
 
-        # otherwise check in-memory admin sessions
-        if header:
-            now_ts = time.time()
-            with _admin_lock:
-                exp = _admin_sessions.get(header)
-                if exp and exp > now_ts:
-                    return func(*args, **kwargs)
-                else:
-                    # expired or missing
-                    if header in _admin_sessions:
-                        del _admin_sessions[header]
+        # otherwise check admin sessions
+        if admin_sessions.valid(header):
+            return func(*args, **kwargs)
         return jsonify({'error': 'unauthorized'}), 401
     return wrapper
 
@@ -208,9 +347,12 @@ def normalize_event(d):
         "title": d.get("title") or "",
         "start_time": d.get("start_time"),
         "end_time": d.get("end_time"),
+        "start_at": d.get("start_at"),
+        "end_at": d.get("end_at"),
         "venue": d.get("venue"),
         "address": d.get("address"),
         "city": d.get("city") or "Sydney",
+        "city_key": normalize_city(d.get("city") or "Sydney"),
         "description": d.get("description"),
         "category": d.get("category"),
         "image_url": d.get("image_url"),
@@ -220,84 +362,425 @@ def normalize_event(d):
     }
 
 
-def run_scrapers():
-    print("Running scrapers...")
-    scrapers = [
-        scrape_allevents,
-        scrape_eventfinda,
-        scrape_skiddle,
-        scrape_sydney_com,
-        scrape_cityofsydney,
-    ]
-    all_events = []
-    for s in scrapers:
-        try:
-            items = s(city="Sydney")
-            if items:
-                all_events.extend(items)
-        except Exception as e:
-            print(f"Scraper {s.__name__} failed: {e}")
+# fields compared when reconciling a scraped item against its stored row;
+# Event.content_hash is a fingerprint over them
+EVENT_UPDATE_FIELDS = ["title", "start_time", "end_time", "start_at", "end_at", "venue", "address", "description", "category", "image_url"]
+INGEST_CHUNK_SIZE = int(os.environ.get('INGEST_CHUNK_SIZE', '500'))
+INACTIVE_AFTER_DAYS = int(os.environ.get('INACTIVE_AFTER_DAYS', '3'))
+CHANGE_LOG_DAYS = int(os.environ.get('CHANGE_LOG_DAYS', '30'))
+# Jaccard similarity of title/venue shingles above which two events on the
+# same day are the same event listed twice
+DEDUP_THRESHOLD = float(os.environ.get('DEDUP_THRESHOLD', '0.6'))
 
-    db = SessionLocal()
-    seen_urls = set()
-    now = datetime.now(timezone.utc)
 
-    for raw in all_events:
-        ev = normalize_event(raw)
-        url = ev.get("original_url")
-        if not url:
+def _comparable(value):
+    if isinstance(value, datetime):
+        return as_utc(value)
+    return value
+
+
+def event_fingerprint(ev):
+    """sha1 over the normalized update fields of an event dict."""
+    values = []
+    for field in EVENT_UPDATE_FIELDS:
+        value = _comparable(ev.get(field))
+        values.append(value.isoformat() if isinstance(value, datetime) else value)
+    payload = json.dumps(values, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def _log_changes_from(db, query, run_id, change, now):
+    # INSERT INTO event_changes SELECT ... FROM events: no rows pass through Python
+    db.execute(insert(EventChange).from_select(
+        ["run_id", "event_id", "original_url", "change", "changed_at"],
+        query.with_only_columns(literal(run_id), Event.id, Event.original_url, literal(change), literal(now)),
+    ))
+
+
+def dedup_blocks(city_key, *starts):
+    """``(city_key, local start date)`` blocks of an event's start times (see ``cluster_events``)."""
+    if not city_key:
+        return set()
+    tz = ZoneInfo(timezone_for_city(city_key))
+    return {(city_key, dedup.event_block(start_at, tz)) for start_at in starts}
+
+
+def cluster_events(db, blocks):
+    """Recompute ``cluster_id`` for the active events of ``blocks``.
+
+    A block is a ``(city_key, local start date)`` pair: only events of a city
+    starting on the same local day can be duplicates (see ``dedup.cluster``),
+    so an ingest or edit re-clusters just the days whose events it changed.
+    Events from every source are clustered together and only rows whose
+    cluster changed are written; undated events (date None) are clusters of
+    their own. Returns the number of active events in ``blocks`` that are
+    duplicates of another one.
+    """
+    duplicates = 0
+    for key, day in blocks:
+        if day is None:
+            db.execute(update(Event)
+                       .where(Event.active == True, Event.city_key == key, Event.start_at.is_(None),
+                              Event.cluster_id != Event.id)
+                       .values(cluster_id=Event.id)
+                       .execution_options(synchronize_session=False))
             continue
-        seen_urls.add(url)
-        existing = db.query(Event).filter(Event.original_url == url).first()
-        if existing:
-            # detect updates
-            changed = False
-            for field in ["title", "start_time", "end_time", "venue", "address", "description", "category", "image_url"]:
-                if getattr(existing, field) != ev.get(field):
-                    setattr(existing, field, ev.get(field))
-                    changed = True
-            if not existing.active:
-                existing.active = True
-                changed = True
-            existing.last_scraped_time = now
-            if changed:
-                print(f"Updated event: {existing.original_url}")
-        else:
-            new = Event(
-                title=ev.get("title"),
-                start_time=ev.get("start_time"),
-                end_time=ev.get("end_time"),
-                venue=ev.get("venue"),
-                address=ev.get("address"),
-                city=ev.get("city"),
-                description=ev.get("description"),
-                category=ev.get("category"),
-                image_url=ev.get("image_url"),
-                source=ev.get("source"),
-                original_url=ev.get("original_url"),
-                last_scraped_time=now,
-                active=True,
+        tz = ZoneInfo(timezone_for_city(key))
+        start = datetime(day.year, day.month, day.day, tzinfo=tz)
+        end = start + timedelta(days=1)
+        rows = db.execute(select(Event.id, Event.title, Event.venue, Event.start_at, Event.cluster_id)
+                          .where(Event.active == True, Event.city_key == key,
+                                 Event.start_at >= start.astimezone(timezone.utc),
+                                 Event.start_at < end.astimezone(timezone.utc))).all()
+        clusters = dedup.cluster(((r.id, dedup.event_block(r.start_at, tz), dedup.event_shingles(r.title, r.venue))
+                                  for r in rows), threshold=DEDUP_THRESHOLD)
+        changes = [{"id": r.id, "cluster_id": clusters[r.id]} for r in rows if r.cluster_id != clusters[r.id]]
+        if changes:
+            db.execute(update(Event), changes)
+        duplicates += sum(1 for event_id, canonical in clusters.items() if event_id != canonical)
+    return duplicates
+
+
+def ingest_events(raw_items, now=None, unchanged=(), run_id=None):
+    """Reconcile scraped items with the events table using set-based queries.
+
+    Each item's ``content_hash`` fingerprint is compared with the stored one
+    (prefetched per chunk with one ``IN`` query), so only new and changed
+    rows are written in full; rows whose content did not change are just
+    re-stamped with one ``UPDATE ... WHERE id IN`` per chunk. Stale events
+    are deactivated with a single ``UPDATE``. ``unchanged`` lists
+    ``(source, city)`` pairs whose pages did not change: their active rows are
+    only re-stamped so they are not deactivated. Inserts, updates and
+    deactivations are recorded in ``event_changes`` under ``run_id``.
+    Afterwards the days with an inserted, changed or deactivated event are
+    re-clustered into near-duplicates (``cluster_events``).
+    """
+    now = now or datetime.now(timezone.utc)
+    run_id = run_id or uuid.uuid4().hex
+    batch = {}
+    for raw in raw_items:
+        ev = normalize_event(annotate_event_times(dict(raw)))
+        url = ev.get("original_url")
+        if url:
+            # the same URL may be listed by several pages; last one wins
+            ev["content_hash"] = event_fingerprint(ev)
+            batch[url] = ev
+
+    counts = {"run_id": run_id, "seen": len(batch), "inserted": 0, "updated": 0, "unchanged": 0, "deactivated": 0}
+    blocks = set()  # dedup blocks to re-cluster
+    db = SessionLocal()
+    try:
+        urls = list(batch)
+        for i in range(0, len(urls), INGEST_CHUNK_SIZE):
+            chunk = urls[i:i + INGEST_CHUNK_SIZE]
+            existing = {row.original_url: row for row in db.execute(
+                select(Event.id, Event.original_url, Event.active, Event.content_hash)
+                .where(Event.original_url.in_(chunk)))}
+            inserts = []
+            stamp = []
+            mismatched = {}
+            for url in chunk:
+                ev = batch[url]
+                row = existing.get(url)
+                if row is None:
+                    inserts.append({
+                        "title": ev.get("title"),
+                        "start_time": ev.get("start_time"),
+                        "end_time": ev.get("end_time"),
+                        "start_at": ev.get("start_at"),
+                        "end_at": ev.get("end_at"),
+                        "venue": ev.get("venue"),
+                        "address": ev.get("address"),
+                        "city": ev.get("city"),
+                        "city_key": ev.get("city_key"),
+                        "description": ev.get("description"),
+                        "category": ev.get("category"),
+                        "image_url": ev.get("image_url"),
+                        "source": ev.get("source"),
+                        "original_url": url,
+                        "content_hash": ev["content_hash"],
+                        "last_scraped_time": now,
+                        "active": True,
+                        "featured": False,
+                    })
+                elif row.content_hash == ev["content_hash"] and row.active:
+                    stamp.append(row.id)
+                else:
+                    mismatched[row.id] = (row, ev)
+
+            if stamp:
+                db.execute(update(Event).where(Event.id.in_(stamp)).values(last_scraped_time=now)
+                           .execution_options(synchronize_session=False))
+                counts["unchanged"] += len(stamp)
+
+            # only rows whose fingerprint differs are loaded in full. Rows
+            # stored before fingerprints existed have none: their fields are
+            # compared once and the hash backfilled without counting a change.
+            updates = []
+            changes = []
+            if mismatched:
+                full = db.execute(select(Event.id, *[getattr(Event, f) for f in EVENT_UPDATE_FIELDS])
+                                  .where(Event.id.in_(list(mismatched))))
+                for stored in full:
+                    row, ev = mismatched[stored.id]
+                    change = {"id": row.id, "last_scraped_time": now, "active": True, "content_hash": ev["content_hash"]}
+                    changed_fields = [] if row.active else ["active"]
+                    for field in EVENT_UPDATE_FIELDS:
+                        if _comparable(getattr(stored, field)) != _comparable(ev.get(field)):
+                            change[field] = ev.get(field)
+                            changed_fields.append(field)
+                    updates.append(change)
+                    if changed_fields:
+                        # the event may have moved from one day to another
+                        blocks |= dedup_blocks(ev.get("city_key"), stored.start_at, ev.get("start_at"))
+                        counts["updated"] += 1
+                        changes.append({"run_id": run_id, "event_id": row.id, "original_url": row.original_url,
+                                        "change": "updated", "fields": json.dumps(changed_fields), "changed_at": now})
+                    else:
+                        counts["unchanged"] += 1
+            if inserts:
+                for ev in inserts:
+                    blocks |= dedup_blocks(ev["city_key"], ev["start_at"])
+                db.execute(insert(Event), inserts)
+                counts["inserted"] += len(inserts)
+                _log_changes_from(db, select(Event.id).where(Event.original_url.in_([e["original_url"] for e in inserts])),
+                                  run_id, "inserted", now)
+            if updates:
+                db.execute(update(Event), updates)
+            if changes:
+                db.execute(insert(EventChange), changes)
+
+        for source, city in unchanged:
+            db.execute(
+                update(Event)
+                .where(Event.source == source, Event.city_key == normalize_city(city), Event.active == True)
+                .values(last_scraped_time=now)
+                .execution_options(synchronize_session=False)
             )
-            db.add(new)
-            print(f"Added event: {new.original_url}")
-
-    # mark events not seen in this run as inactive if their last_scraped_time is older than 3 days
-    cutoff = now
-    existing_events = db.query(Event).all()
-    for e in existing_events:
-        if e.original_url not in seen_urls:
-            # if last scraped more than 3 days ago, mark inactive
-            if e.last_scraped_time and (now - e.last_scraped_time).days >= 3:
-                if e.active:
-                    e.active = False
-                    print(f"Marked inactive: {e.original_url}")
 
-    db.commit()
-    db.close()
-    print("Scrape complete")
+        # mark events not seen recently as inactive. Every row seen in this run
+        # was stamped with ``now`` above, so the cutoff alone excludes them
+        # (this avoids binding a huge NOT IN list).
+        cutoff = now - timedelta(days=INACTIVE_AFTER_DAYS)
+        stale = (Event.active == True, Event.last_scraped_time < cutoff)
+        _log_changes_from(db, select(Event.id).where(*stale), run_id, "deactivated", now)
+        # a deactivated canonical event hands its cluster to another member
+        for key, start_at in db.execute(select(Event.city_key, Event.start_at).where(*stale).distinct()):
+            blocks |= dedup_blocks(key, start_at)
+        res = db.execute(
+            update(Event)
+            .where(*stale)
+            .values(active=False)
+            .execution_options(synchronize_session=False)
+        )
+        counts["deactivated"] = res.rowcount or 0
+        duplicates = cluster_events(db, blocks)
+        db.execute(delete(EventChange).where(EventChange.changed_at < now - timedelta(days=CHANGE_LOG_DAYS)))
+        db.commit()
+        response_cache.invalidate("events")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    if counts["updated"]:
+        print(f"Updated {counts['updated']} events")
+    if duplicates:
+        print(f"{duplicates} active events on the days this ingest changed are duplicates listed by another source")
+    return counts
+
+
+def ingest_city_run(run, run_id=None):
+    """Store one city's scrape results as soon as all its sources finished."""
+    for st in run.stats.values():
+        print(f"Scraper {st.name} ({run.city}): {st.status}, {st.items} items in {st.duration:.2f}s")
+    unchanged = {(e.source, e.city) for e in run.unchanged}
+    try:
+        counts = ingest_events(run.items, unchanged=unchanged, run_id=run_id)
+    except Exception:
+        validator_store().discard(city=run.city)
+        raise
+    # remember page validators only once their content is stored
+    validator_store().commit(sources=run.sources, city=run.city)
+    print(f"Ingested {counts['seen']} events for {run.city}: {counts['inserted']} added, {counts['updated']} updated, {counts['unchanged']} unchanged, {counts['deactivated']} marked inactive")
+    return counts
+
+
+def _update_scrape_job(job_id, **values):
+    db = SessionLocal()
+    try:
+        db.execute(update(ScrapeJob).where(ScrapeJob.id == job_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _finish_scrape_job(job_id, status, **values):
+    _update_scrape_job(job_id, status=status, inflight=None, finished_at=datetime.now(timezone.utc), **values)
+
+
+def _abandon_running_jobs(db, exclude=None):
+    # a job left "running" by a process that died (nobody holds the lock any more)
+    query = update(ScrapeJob).where(ScrapeJob.status == "running")
+    if exclude:
+        query = query.where(ScrapeJob.id != exclude)
+    db.execute(query.values(status="failed", inflight=None, finished_at=datetime.now(timezone.utc),
+                            error="abandoned: the process running it stopped"))
+
+
+def claim_scrape_job(job_id=None, trigger="schedule", cities=None):
+    """Mark ``job_id`` (else the oldest queued job, else a new job) as running; return its id.
+
+    Called with the scrape lock held, so any other running job is abandoned.
+    """
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        _abandon_running_jobs(db)
+        for _ in range(3):
+            candidate = job_id or db.execute(
+                select(ScrapeJob.id).where(ScrapeJob.status == "queued").order_by(ScrapeJob.requested_at).limit(1)
+            ).scalar()
+            if candidate:
+                res = db.execute(update(ScrapeJob)
+                                 .where(ScrapeJob.id == candidate, ScrapeJob.status == "queued")
+                                 .values(status="running", started_at=now))
+                if res.rowcount:
+                    db.commit()
+                    return candidate
+            job = ScrapeJob(trigger=trigger, status="running", cities=json.dumps(cities), requested_at=now,
+                            started_at=now)
+            db.add(job)
+            try:
+                db.commit()
+                return job.id
+            except IntegrityError:
+                # a job was queued meanwhile; claim that one instead
+                db.rollback()
+                job_id = None
+        raise RuntimeError("could not claim a scrape job")
+    finally:
+        db.close()
+
+
+def submit_scrape_job(trigger="api"):
+    """Queue a scrape unless one is already in flight; returns ``(job, created)``."""
+    db = SessionLocal()
+    try:
+        for _ in range(3):
+            job = db.execute(select(ScrapeJob).where(ScrapeJob.inflight == 1)).scalar()
+            if job is not None and job.status == "running" and not scrape_runner.lock.held():
+                _abandon_running_jobs(db)
+                db.commit()
+                job = None
+            if job is not None:
+                return job.to_dict(), False
+            job = ScrapeJob(trigger=trigger, status="queued", cities=json.dumps(SCRAPER_CITIES),
+                            requested_at=datetime.now(timezone.utc))
+            db.add(job)
+            try:
+                db.commit()
+                return job.to_dict(), True
+            except IntegrityError:
+                # another request queued one at the same time
+                db.rollback()
+        raise RuntimeError("could not submit a scrape job")
+    finally:
+        db.close()
+
+
+def run_scrapers(cities=None, spread=0.0, job_id=None, trigger="schedule"):
+    cities = cities or SCRAPER_CITIES
+    job_id = claim_scrape_job(job_id, trigger, cities)
+    print(f"Running scrapers (job {job_id})...")
+
+    def progress(result):
+        _update_scrape_job(job_id, progress=json.dumps(result.to_dict()))
+
+    try:
+        result = city_fanout.run(cities, on_city=lambda run: ingest_city_run(run, run_id=job_id), spread=spread,
+                                 on_progress=progress)
+    except Exception as e:
+        _finish_scrape_job(job_id, "failed", error=str(e))
+        raise
+    _finish_scrape_job(job_id, "finished", progress=json.dumps(result.to_dict()))
+    for run in result.cities.values():
+        print(f"City {run.city}: {len(run.items)} items from {run.jobs} jobs in {run.duration:.2f}s ({run.throughput:.1f} items/s)")
+    for host, st in session_registry().stats().items():
+        print(f"HTTP pool {host}: {st['requests']} requests, {st['new_connections']} new connections, {st['reused']} reused")
+    print(f"Scrape complete in {result.duration:.2f}s")
+    return result
+
+
+def run_queued_scrapes():
+    """Start a run if a scrape job is waiting (submitted while no process could start it)."""
+    db = SessionLocal()
+    try:
+        waiting = db.execute(select(ScrapeJob.id).where(ScrapeJob.status == "queued").limit(1)).scalar()
+    finally:
+        db.close()
+    if waiting:
+        scrape_runner.run(job_id=waiting, trigger="api")
+
+
+def confirmation_email(token, event_title=None):
+    """``(subject, body, confirm_url)`` of the email confirming a ticket request."""
+    confirm_url = os.environ.get('BASE_URL', 'http://localhost:5000') + f"/api/ticket-request/confirm?token={token}"
+    subject = f"Confirm your email for event{(' - ' + event_title) if event_title else ''}"
+    body = f"Please confirm your email by clicking the link below:\n\n{confirm_url}\n\nIf you didn't request this, ignore this message."
+    return subject, body, confirm_url
+
+
+def mark_confirmations_sent(ticket_ids):
+    """Stamp ``confirm_sent_at`` for a batch of delivered confirmation emails."""
+    if not ticket_ids:
+        return
+    with engine.begin() as conn:
+        conn.execute(update(TicketRequest).where(TicketRequest.id.in_(ticket_ids))
+                     .values(confirm_sent_at=datetime.now(timezone.utc)))
+    response_cache.invalidate("tickets")
+
+
+# Confirmation emails go through a DB-backed queue drained by MAIL_WORKERS
+# threads over pooled SMTP connections (mailer.py). MAIL_SENDER=off leaves
+# draining it to `python worker.py`.
+SMTP_HOST = os.environ.get('SMTP_HOST')
+SMTP_USER = os.environ.get('SMTP_USER')
+SMTP_PASS = os.environ.get('SMTP_PASS')
+MAIL_SENDER = os.environ.get('MAIL_SENDER', 'embedded')
+mail_queue = MailQueue(
+    engine,
+    SMTPPool(
+        SMTP_HOST, int(os.environ.get('SMTP_PORT', '587')), SMTP_USER, SMTP_PASS,
+        max_messages=int(os.environ.get('SMTP_MAX_MESSAGES', '100')),
+    ) if SMTP_HOST and SMTP_USER and SMTP_PASS else None,
+    os.environ.get('FROM_EMAIL', 'no-reply@example.com'),
+    workers=int(os.environ.get('MAIL_WORKERS', '2')),
+    batch_size=int(os.environ.get('MAIL_BATCH_SIZE', '20')),
+    max_attempts=int(os.environ.get('MAIL_MAX_ATTEMPTS', '5')),
+    retry_base=float(os.environ.get('MAIL_RETRY_BASE', '30')),
+    poll=float(os.environ.get('MAIL_POLL', '10')),
+    on_sent=mark_confirmations_sent,
+)
+if MAIL_SENDER == 'embedded':
+    mail_queue.start()
+
+
+# MX validation of ticket request emails (mxcache.py): cached per domain,
+# looked up off the request path with a bounded resolver lifetime
+MX_CHECK_WAIT = float(os.environ.get('MX_CHECK_WAIT', '0.5'))  # seconds
+mx_cache = MXCache(
+    dns_resolver(timeout=float(os.environ.get('MX_TIMEOUT', '2'))),
+    positive_ttl=float(os.environ.get('MX_POSITIVE_TTL', '86400')),
+    negative_ttl=float(os.environ.get('MX_NEGATIVE_TTL', '3600')),
+    error_ttl=float(os.environ.get('MX_ERROR_TTL', '60')),
+    max_entries=int(os.environ.get('MX_CACHE_SIZE', '10000')),
+    workers=int(os.environ.get('MX_WORKERS', '4')),
+)
 
 
 @app.route("/api/ticket-request", methods=["POST"])
+@rate_limiter.limit()
 def ticket_request():
     data = request.get_json() or {}
     email = (data.get("email") or "").strip()
@@ -312,35 +795,15 @@ def ticket_request():
     if not email_re.match(email):
         return jsonify({"error": "invalid email format"}), 400
 
-    # optional MX lookup (best-effort)
-    mx_ok = None
-    domain = email.split('@')[-1]
-    if dns:
-        try:
-            answers = dns.resolver.resolve(domain, 'MX')
-            mx_ok = len(answers) > 0
-        except Exception:
-            mx_ok = False
-    else:
-        # dns library not available; leave as None
-        mx_ok = None
+    # MX check (best-effort): answered from the cache or looked up while the
+    # request is stored, waiting at most MX_CHECK_WAIT for it
+    mx_pending = mx_cache.lookup(email.split('@')[-1])
 
     token = uuid.uuid4().hex
     now = datetime.now(timezone.utc)
-    ip = request.headers.get('X-Forwarded-For', request.remote_addr)
+    ip = client_ip()
     ua = request.headers.get('User-Agent')
 
-    # rate limiting per IP
-    with _rate_lock:
-        ts = _rate_limiter.get(ip, [])
-        now_ts = time.time()
-        # remove old timestamps
-        ts = [t for t in ts if now_ts - t < RATE_LIMIT_WINDOW]
-        if len(ts) >= RATE_LIMIT_MAX:
-            return jsonify({'error': 'rate_limited'}), 429
-        ts.append(now_ts)
-        _rate_limiter[ip] = ts
-
     db = SessionLocal()
     tr = TicketRequest(
         email=email,
@@ -356,97 +819,125 @@ def ticket_request():
         user_agent=ua,
     )
     db.add(tr)
+    db.flush()
+    # the confirmation email is queued in the same transaction and sent by the mail workers
+    subject, body, confirm_url = confirmation_email(token)
+    if mail_queue.pool is not None:
+        mail_queue.enqueue(db, email, subject, body, ref_id=tr.id)
+    else:
+        # no smtp configured; just log
+        print(f"Confirmation link for {email}: {confirm_url}")
     db.commit()
-    tr_id = tr.id
-
-    # send confirmation email (best-effort)
-    def _send_and_update(email_to, token, tr_id, event_title=None):
-        smtp_host = os.environ.get('SMTP_HOST')
-        smtp_port = int(os.environ.get('SMTP_PORT', '587'))
-        smtp_user = os.environ.get('SMTP_USER')
-        smtp_pass = os.environ.get('SMTP_PASS')
-        from_email = os.environ.get('FROM_EMAIL', 'no-reply@example.com')
-        confirm_url = os.environ.get('BASE_URL', f'http://localhost:5000') + f"/api/ticket-request/confirm?token={token}"
-        subj = f"Confirm your email for event{(' - ' + event_title) if event_title else ''}"
-        body = f"Please confirm your email by clicking the link below:\n\n{confirm_url}\n\nIf you didn't request this, ignore this message."
-        sent = False
-        try:
-            if smtp_host and smtp_user and smtp_pass:
-                msg = EmailMessage()
-                msg['Subject'] = subj
-                msg['From'] = from_email
-                msg['To'] = email_to
-                msg.set_content(body)
-                with smtplib.SMTP(smtp_host, smtp_port, timeout=10) as s:
-                    s.starttls()
-                    s.login(smtp_user, smtp_pass)
-                    s.send_message(msg)
-                sent = True
-            else:
-                # no smtp configured; just log
-                print(f"Confirmation link for {email_to}: {confirm_url}")
-                sent = False
-        except Exception as e:
-            print(f"Failed to send confirmation email: {e}")
-            sent = False
-
-        # update DB
-        try:
-            db2 = SessionLocal()
-            tr2 = db2.query(TicketRequest).filter(TicketRequest.id == tr_id).first()
-            if tr2:
-                if sent:
-                    tr2.confirm_sent_at = datetime.now(timezone.utc)
-                db2.add(tr2)
-                db2.commit()
-        except Exception as e:
-            print(f"Failed to update TicketRequest after sending: {e}")
-        finally:
-            try:
-                db2.close()
-            except Exception:
-                pass
-
-    # send confirmation asynchronously
-    t = threading.Thread(target=_send_and_update, args=(email, token, tr_id, None), daemon=True)
-    t.start()
-
     db.close()
+    response_cache.invalidate("tickets")
+    mail_queue.notify()
+    mx_ok = mx_cache.result(mx_pending, MX_CHECK_WAIT)
+
     # note: confirmation sending happens asynchronously; return redirect for UX
     return jsonify({"ok": True, "redirect": event_url, "mx_ok": mx_ok, "confirmation_sent": False})
 
 
+TICKETS_DEFAULT_LIMIT = int(os.environ.get('TICKETS_DEFAULT_LIMIT', '1000'))
+TICKETS_MAX_LIMIT = int(os.environ.get('TICKETS_MAX_LIMIT', '1000'))
+
+# ticket request columns plus the event title, fetched with one outer join
+TICKET_COLUMNS = [
+    TicketRequest.id, TicketRequest.email, TicketRequest.consent, TicketRequest.confirmed,
+    TicketRequest.event_id, TicketRequest.event_url, Event.title.label("event_title"),
+    TicketRequest.created_at, TicketRequest.confirm_sent_at, TicketRequest.confirmed_at,
+    TicketRequest.ip_address, TicketRequest.user_agent,
+]
+
+
+def _naive_utc(dt):
+    # ticket timestamps are stored as naive UTC
+    return as_utc(dt).replace(tzinfo=None)
+
+
+def ticket_requests_query(args):
+    """Joined ticket request query (newest first) filtered by ``args``.
+
+    Filters: ``event_id`` (comma separated), ``confirmed``, and a
+    ``from``/``to`` range on ``created_at`` (ISO dates or datetimes, UTC
+    unless they carry an offset; a bare ``to`` date includes the whole day).
+    """
+    q = select(*TICKET_COLUMNS).outerjoin(Event, Event.id == TicketRequest.event_id)
+    if args.get("event_id"):
+        try:
+            ids = [int(v) for v in args["event_id"].split(",") if v.strip()]
+        except ValueError:
+            raise InvalidQuery("event_id must be a comma separated list of integers")
+        q = q.where(TicketRequest.event_id.in_(ids))
+    confirmed = parse_bool(args.get("confirmed"))
+    if confirmed is not None:
+        q = q.where(TicketRequest.confirmed == confirmed)
+    if args.get("from"):
+        q = q.where(TicketRequest.created_at >= _naive_utc(parse_range_arg(args["from"], "UTC", "from")))
+    if args.get("to"):
+        to = _naive_utc(parse_range_arg(args["to"], "UTC", "to"))
+        if _DATE_ONLY_RE.match(args["to"].strip()):
+            q = q.where(TicketRequest.created_at < to + timedelta(days=1))
+        else:
+            q = q.where(TicketRequest.created_at <= to)
+    return q.order_by(TicketRequest.created_at.desc().nulls_last(), TicketRequest.id.desc())
+
+
+def ticket_row_dict(row):
+    return {
+        'id': row.id,
+        'email': row.email,
+        'consent': bool(row.consent),
+        'confirmed': bool(row.confirmed),
+        'event_id': row.event_id,
+        'event_url': row.event_url,
+        'event_title': row.event_title,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'confirm_sent_at': row.confirm_sent_at.isoformat() if row.confirm_sent_at else None,
+        'confirmed_at': row.confirmed_at.isoformat() if row.confirmed_at else None,
+        'ip_address': row.ip_address,
+        'user_agent': row.user_agent,
+    }
+
+
 @app.route('/api/ticket-requests')
+@response_cache.cached("tickets", "events")
 def list_ticket_requests():
-    """Return JSON list of recent ticket requests, include event title when available."""
+    """Ticket requests with their event title, newest first, one keyset page at a time.
+
+    Query args: ``limit``, ``cursor`` (from the ``X-Next-Cursor`` header of the
+    previous page) and the filters of ``ticket_requests_query``.
+    """
+    args = request.args
+    limit = parse_limit(args.get("limit"), TICKETS_DEFAULT_LIMIT, TICKETS_MAX_LIMIT)
+    q = ticket_requests_query(args)
+    if args.get("cursor"):
+        values = decode_cursor(args["cursor"])
+        if len(values) != 2:
+            raise InvalidQuery("invalid cursor")
+        try:
+            created = datetime.fromisoformat(values[0]) if values[0] else None
+            last_id = int(values[1])
+        except (TypeError, ValueError):
+            raise InvalidQuery("invalid cursor")
+        q = q.where(keyset_before(TicketRequest.created_at, TicketRequest.id, created, last_id))
     db = SessionLocal()
-    items = db.query(TicketRequest).order_by(TicketRequest.created_at.desc()).limit(1000).all()
-    out = []
-    for t in items:
-        ev_title = None
-        if t.event_id:
-            ev = db.query(Event).filter(Event.id == t.event_id).first()
-            if ev:
-                ev_title = ev.title
-        out.append({
-            'id': t.id,
-            'email': t.email,
-            'consent': bool(t.consent),
-            'confirmed': bool(t.confirmed),
-            'event_id': t.event_id,
-            'event_url': t.event_url,
-            'event_title': ev_title,
-            'created_at': t.created_at.isoformat() if t.created_at else None,
-            'confirm_sent_at': t.confirm_sent_at.isoformat() if t.confirm_sent_at else None,
-            'confirmed_at': t.confirmed_at.isoformat() if t.confirmed_at else None,
-            'ip_address': t.ip_address,
-            'user_agent': t.user_agent,
-        })
-    db.close()
-    return jsonify(out)
+    try:
+        rows = db.execute(q.limit(limit + 1)).all()
+    finally:
+        db.close()
+    resp = serializers.json_response([ticket_row_dict(r) for r in rows[:limit]])
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        cursor = encode_cursor([last.created_at.isoformat() if last.created_at else None, last.id])
+        resp.headers["X-Next-Cursor"] = cursor
+        next_args = args.to_dict()
+        next_args["cursor"] = cursor
+        resp.headers["Link"] = f'<{request.path}?{urlencode(next_args)}>; rel="next"'
+    return resp
 
 
 @app.route('/api/admin/login', methods=['POST'])
+@rate_limiter.limit(max_requests=ADMIN_LOGIN_RATE_LIMIT_MAX, window=ADMIN_LOGIN_RATE_LIMIT_WINDOW)
 def admin_login():
     data = request.get_json() or {}
     username = (data.get('username') or '').strip()
@@ -457,11 +948,7 @@ def admin_login():
         return jsonify({'error': 'admin not configured'}), 503
     if username != env_user or password != env_pass:
         return jsonify({'error': 'invalid credentials'}), 401
-    # generate session token
-    token = uuid.uuid4().hex
-    expiry = time.time() + ADMIN_SESSION_TTL
-    with _admin_lock:
-        _admin_sessions[token] = expiry
+    token = admin_sessions.create()
     return jsonify({'ok': True, 'token': token, 'expires_in': ADMIN_SESSION_TTL})
 
 
@@ -471,33 +958,10 @@ def admin_logout():
     token = (data.get('token') or request.headers.get('X-Admin-Token'))
     if not token:
         return jsonify({'ok': True})
-    with _admin_lock:
-        if token in _admin_sessions:
-            del _admin_sessions[token]
+    admin_sessions.revoke(token)
     return jsonify({'ok': True})
 
 
-@app.route('/api/ticket-requests.csv')
-def ticket_requests_csv():
-    import csv
-    from io import StringIO
-    db = SessionLocal()
-    items = db.query(TicketRequest).order_by(TicketRequest.created_at.desc()).all()
-    si = StringIO()
-    writer = csv.writer(si)
-    writer.writerow(['id','email','consent','event_id','event_title','event_url','created_at'])
-    for t in items:
-        ev_title = ''
-        if t.event_id:
-            ev = db.query(Event).filter(Event.id == t.event_id).first()
-            if ev:
-                ev_title = ev.title
-        writer.writerow([t.id, t.email, int(bool(t.consent)), t.event_id or '', ev_title, t.event_url or '', t.created_at.isoformat() if t.created_at else ''])
-    db.close()
-    output = si.getvalue()
-    return app.response_class(output, mimetype='text/csv', headers={"Content-Disposition": "attachment; filename=ticket_requests.csv"})
-
-
 @app.route('/api/ticket-request/confirm')
 def confirm_ticket_request():
     token = request.args.get('token')
@@ -513,6 +977,7 @@ def confirm_ticket_request():
         tr.confirmed_at = datetime.now(timezone.utc)
         db.add(tr)
         db.commit()
+        response_cache.invalidate("tickets")
 
     # resolve redirect target while session still open
     target = tr.event_url if tr.event_url else None
@@ -539,25 +1004,323 @@ def confirm_ticket_request():
     return resp
 
 
-scheduler = BackgroundScheduler()
-scheduler.add_job(func=run_scrapers, trigger="interval", minutes=30)
-scheduler.start()
+# One scrape at a time across all processes: overlapping requests in this
+# process are coalesced, other processes skip while the lock is held.
+scrape_runner = JobRunner(
+    run_scrapers,
+    lock_from_url(os.environ.get('SCRAPER_LOCK', 'db'), engine, 'scrape',
+                  ttl=float(os.environ.get('SCRAPER_LOCK_TTL', '120'))),
+    name="scrape",
+)
+
+# "embedded" runs the schedule inside the web process; "off" leaves it to a
+# separate `python worker.py` so web workers only serve requests.
+SCRAPER_SCHEDULER = os.environ.get('SCRAPER_SCHEDULER', 'embedded')
+
+
+SCRAPER_QUEUE_POLL = float(os.environ.get('SCRAPER_QUEUE_POLL', '5'))
+
+
+def create_scheduler(scheduler_cls=BackgroundScheduler, run_now=False):
+    scheduler = scheduler_cls()
+    options = {"next_run_time": datetime.now(timezone.utc)} if run_now else {}
+    scheduler.add_job(func=scrape_runner.run, kwargs={"spread": SCRAPER_SPREAD}, trigger="interval",
+                      minutes=SCRAPER_INTERVAL_MINUTES, id="scrape", coalesce=True, max_instances=1,
+                      **options)
+    # picks up jobs submitted through POST /api/scrape
+    scheduler.add_job(func=run_queued_scrapes, trigger="interval", seconds=SCRAPER_QUEUE_POLL,
+                      id="scrape-queue", coalesce=True, max_instances=1)
+    return scheduler
+
+
+scheduler = None
+if SCRAPER_SCHEDULER == 'embedded':
+    scheduler = create_scheduler()
+    scheduler.start()
+
+
+EVENTS_DEFAULT_LIMIT = int(os.environ.get('EVENTS_DEFAULT_LIMIT', '200'))
+EVENTS_MAX_LIMIT = int(os.environ.get('EVENTS_MAX_LIMIT', '1000'))
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except Exception:
+        raise InvalidQuery("invalid cursor")
+    if not isinstance(values, list):
+        raise InvalidQuery("invalid cursor")
+    return values
+
+
+def keyset_after(col, id_col, value, last_id):
+    """Rows strictly after ``(value, last_id)`` in ``col NULLS LAST, id`` order."""
+    if value is None:
+        return and_(col.is_(None), id_col > last_id)
+    return or_(col > value, and_(col == value, id_col > last_id), col.is_(None))
+
+
+def keyset_before(col, id_col, value, last_id):
+    """Rows strictly after ``(value, last_id)`` in ``col DESC NULLS LAST, id DESC`` order."""
+    if value is None:
+        return and_(col.is_(None), id_col < last_id)
+    return or_(col < value, and_(col == value, id_col < last_id), col.is_(None))
+
+
+def parse_limit(value, default, maximum):
+    if value in (None, ""):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise InvalidQuery("limit must be an integer")
+    if limit < 1:
+        raise InvalidQuery("limit must be positive")
+    return min(limit, maximum)
+
+
+_DATE_ONLY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def parse_range_arg(value, tz, name):
+    dt = parse_datetime(value, tz=tz)
+    if dt is None:
+        raise InvalidQuery(f"{name} must be an ISO date or datetime")
+    return dt
+
+
+def parse_bool(value):
+    if value is None:
+        return None
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@app.errorhandler(InvalidQuery)
+def handle_bad_request(e):
+    return jsonify({"error": str(e)}), 400
+
+
+@app.errorhandler(search.FeatureUnavailable)
+def handle_unavailable(e):
+    return jsonify({"error": str(e)}), 501
+
+
+# fields of an event in list responses, in Event.to_dict() order
+EVENT_FIELDS = [
+    "id", "title", "start_time", "end_time", "start_at", "end_at", "venue", "address", "city", "description",
+    "category", "image_url", "source", "original_url", "last_scraped_time", "active", "featured", "cluster_id",
+]
+# fields serializers.dumps cannot write as they come from the database;
+# last_scraped_time has always been written without an offset
+EVENT_FORMATTERS = {"last_scraped_time": lambda dt: dt.isoformat() if dt else None}
+
+
+def parse_fields(value):
+    """Event fields named by a ``fields`` argument (comma separated), or all of them."""
+    if not value:
+        return EVENT_FIELDS
+    fields = list(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in EVENT_FIELDS]
+    if unknown or not fields:
+        raise InvalidQuery(f"unknown fields: {', '.join(unknown)}; expected some of {', '.join(EVENT_FIELDS)}")
+    return fields
+
+
+def event_columns(fields, cursor=False):
+    """Columns to select for ``fields``; with ``cursor``, followed by the keyset
+    values as ``cursor_start_at`` and ``cursor_id``."""
+    columns = [getattr(Event, f) for f in fields]
+    if cursor:
+        columns += [Event.start_at.label("cursor_start_at"), Event.id.label("cursor_id")]
+    return columns
+
+
+def event_dicts(rows, fields):
+    return serializers.row_dicts(rows, fields, EVENT_FORMATTERS)
+
+
+def events_query(args, *columns, default_city="Sydney"):
+    """Active events filtered by ``args``, ordered by start time.
+
+    Filters: ``city`` (``default_city`` when absent; ``None`` means every
+    city), ``source`` and ``category`` (comma separated), ``featured``, a
+    ``from``/``to`` start time range (ISO dates or datetimes; values without
+    an offset are local to the city) and ``dedupe`` (only the canonical event
+    of each near-duplicate cluster). Selects ``columns`` or the ``Event``
+    entity.
+    """
+    q = select(*(columns or (Event,))).where(Event.active == True)
+    city = args.get("city", default_city)
+    if city:
+        q = q.where(Event.city_key == normalize_city(city))
+    if args.get("source"):
+        q = q.where(Event.source.in_([v.strip() for v in args["source"].split(",") if v.strip()]))
+    if args.get("category"):
+        q = q.where(Event.category.in_([v.strip() for v in args["category"].split(",") if v.strip()]))
+    featured = parse_bool(args.get("featured"))
+    if featured is not None:
+        q = q.where(Event.featured == featured)
+    if parse_bool(args.get("dedupe")):
+        # rows not clustered yet count as their own cluster
+        q = q.where(or_(Event.cluster_id == None, Event.cluster_id == Event.id))
+    tz = timezone_for_city(city)
+    if args.get("from"):
+        q = q.where(Event.start_at >= parse_range_arg(args["from"], tz, "from"))
+    if args.get("to"):
+        to = parse_range_arg(args["to"], tz, "to")
+        if _DATE_ONLY_RE.match(args["to"].strip()):
+            # a bare date is inclusive of the whole day
+            q = q.where(Event.start_at < to + timedelta(days=1))
+        else:
+            q = q.where(Event.start_at <= to)
+    return q.order_by(Event.start_at.asc().nulls_last(), Event.id)
 
 
 @app.route("/api/events")
+@response_cache.cached("events")
 def list_events():
-    city = request.args.get("city", "Sydney")
-    db = SessionLocal()
-    items = db.query(Event).filter(Event.city.ilike(f"%{city}%"), Event.active == True).order_by(Event.start_time).all()
-    out = [i.to_dict() for i in items]
-    db.close()
-    return jsonify(out)
+    """Active events for a city, ordered by start time, one keyset page at a time.
+
+    Query args: ``limit``, ``cursor`` (from the ``X-Next-Cursor`` header of the
+    previous page), ``fields`` (comma separated, e.g. to leave out
+    ``description``) and the filters of ``events_query``. Only the requested
+    columns are read, as plain rows rather than ORM objects.
+    """
+    args = request.args
+    limit = parse_limit(args.get("limit"), EVENTS_DEFAULT_LIMIT, EVENTS_MAX_LIMIT)
+    fields = parse_fields(args.get("fields"))
+    q = events_query(args, *event_columns(fields, cursor=True))
+    if args.get("cursor"):
+        values = decode_cursor(args["cursor"])
+        if len(values) != 2:
+            raise InvalidQuery("invalid cursor")
+        try:
+            last_id = int(values[1])
+        except (TypeError, ValueError):
+            raise InvalidQuery("invalid cursor")
+        tz = timezone_for_city(args.get("city", "Sydney"))
+        after = parse_range_arg(values[0], tz, "cursor") if values[0] else None
+        q = q.where(keyset_after(Event.start_at, Event.id, after, last_id))
+    q = q.limit(limit + 1)
+
+    with engine.connect() as conn:
+        rows = conn.execute(q).all()
+    resp = serializers.json_response(event_dicts(rows[:limit], fields))
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        cursor = encode_cursor([utc_isoformat(last.cursor_start_at), last.cursor_id])
+        resp.headers["X-Next-Cursor"] = cursor
+        next_args = args.to_dict()
+        next_args["cursor"] = cursor
+        resp.headers["Link"] = f'<{request.path}?{urlencode(next_args)}>; rel="next"'
+    return resp
+
+
+SEARCH_DEFAULT_LIMIT = int(os.environ.get('SEARCH_DEFAULT_LIMIT', '20'))
+SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', '100'))
 
 
-@app.route("/api/scrape", methods=["POST", "GET"])
+@app.route("/api/events/search")
+@response_cache.cached("events")
+def search_events():
+    """Active events matching ``q`` (full text over title, venue, description
+    and category), most relevant first.
+
+    Query args: ``q``, ``prefix`` (default true: the last word matches as a
+    prefix, for typeahead), ``limit``, ``fields`` and the filters of
+    ``events_query`` (every city unless ``city`` is given).
+    """
+    args = request.args
+    limit = parse_limit(args.get("limit"), SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT)
+    prefix = parse_bool(args.get("prefix"))
+    fields = parse_fields(args.get("fields"))
+    q = search.apply_search(events_query(args, *event_columns(fields), default_city=None), Event.id,
+                            engine.dialect.name, args.get("q"), prefix=prefix is not False)
+    if q is None:
+        raise InvalidQuery("q must contain at least one word")
+    with engine.connect() as conn:
+        rows = conn.execute(q.limit(limit)).all()
+    return serializers.json_response(event_dicts(rows, fields))
+
+
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', '1000'))
+
+# (name, kind) of the exported columns; the first ticket request columns are
+# the ones the CSV export always had
+TICKET_EXPORT_FIELDS = [
+    ("id", "int"), ("email", "str"), ("consent", "bool"), ("event_id", "int"), ("event_title", "str"),
+    ("event_url", "str"), ("created_at", "datetime"), ("confirmed", "bool"), ("confirmed_at", "datetime"),
+]
+EVENT_EXPORT_FIELDS = [
+    ("id", "int"), ("title", "str"), ("start_time", "str"), ("end_time", "str"), ("start_at", "datetime"),
+    ("end_at", "datetime"), ("venue", "str"), ("address", "str"), ("city", "str"), ("description", "str"),
+    ("category", "str"), ("image_url", "str"), ("source", "str"), ("original_url", "str"),
+    ("last_scraped_time", "datetime"), ("featured", "bool"), ("cluster_id", "int"),
+]
+
+
+def export_response(fmt, query, fields, filename):
+    """Stream ``query`` as a ``fmt`` download, ``EXPORT_CHUNK_SIZE`` rows at a time."""
+    try:
+        exports.check_format(fmt)
+    except exports.ExportUnavailable as e:
+        return jsonify({"error": str(e)}), 404 if fmt not in exports.EXPORT_FORMATS else 501
+    chunks = exports.iter_chunks(SessionLocal, query, EXPORT_CHUNK_SIZE)
+    return app.response_class(
+        stream_with_context(exports.export_stream(fmt, fields, chunks)),
+        mimetype=exports.EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{fmt}"},
+    )
+
+
+@app.route('/api/ticket-requests.<fmt>')
+def export_ticket_requests(fmt):
+    """All ticket requests matching the filters of ``ticket_requests_query`` as csv, ndjson or parquet."""
+    return export_response(fmt, ticket_requests_query(request.args), TICKET_EXPORT_FIELDS, "ticket_requests")
+
+
+@app.route('/api/events.<fmt>')
+def export_events(fmt):
+    """All active events matching the filters of ``events_query`` (every city unless ``city`` is given)."""
+    columns = [getattr(Event, name) for name, _ in EVENT_EXPORT_FIELDS]
+    return export_response(fmt, events_query(request.args, *columns, default_city=None), EVENT_EXPORT_FIELDS, "events")
+
+
+@app.route("/api/scrape", methods=["POST"])
+@require_admin
 def trigger_scrape():
-    run_scrapers()
-    return jsonify({"status": "ok"})
+    """Submit a scrape and return at once; concurrent submissions share one job."""
+    job, created = submit_scrape_job()
+    if created and scheduler is not None:
+        # this process runs the schedule: start now instead of at the next poll
+        scrape_runner.start(job_id=job["id"], trigger="api")
+    resp = jsonify({**job, "deduplicated": not created})
+    resp.status_code = 202
+    resp.headers["Location"] = f"/api/scrape/{job['id']}"
+    return resp
+
+
+@app.route("/api/scrape/<job_id>")
+@require_admin
+def scrape_status(job_id):
+    db = SessionLocal()
+    try:
+        job = db.get(ScrapeJob, job_id)
+        if job is None:
+            return jsonify({"error": "not found"}), 404
+        return jsonify(job.to_dict())
+    finally:
+        db.close()
 
 
 @app.route("/api/events/<int:event_id>", methods=["PATCH"])
@@ -577,13 +1340,18 @@ def update_event(event_id):
     if changed:
         ev.last_scraped_time = datetime.now(timezone.utc)
         db.add(ev)
+        db.flush()
+        if "active" in data:
+            cluster_events(db, dedup_blocks(ev.city_key, ev.start_at))
         db.commit()
+        response_cache.invalidate("events")
     out = ev.to_dict()
     db.close()
     return jsonify(out)
 
 
 if __name__ == "__main__":
-    # initial run
-    run_scrapers()
+    # initial run in the background; the API is served meanwhile
+    if scheduler is not None:
+        scrape_runner.start()
     app.run(host="0.0.0.0", port=5000)
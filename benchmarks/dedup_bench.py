@@ -0,0 +1,71 @@
+"""
+Scaling benchmark for near-duplicate event clustering.
+
+Generates a city's worth of synthetic events spread over ``--days`` days,
+re-lists a share of them as another source would (one title word swapped,
+punctuation and case changed), and times ``dedup.cluster`` at growing sizes.
+Reports the candidate pairs checked against the all-pairs count on the same
+days, and how many of the re-listings were clustered with their original.
+
+    python benchmarks/dedup_bench.py --sizes 5000 20000 80000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import dedup  # noqa: E402
+
+
+def make_records(n, days, relist, rng):
+    words = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(4, 9)))
+             for _ in range(5000)]
+    start = date(2026, 3, 1)
+    records, pairs = [], []
+    for i in range(n):
+        title = rng.sample(words, 5)
+        venue = f"{rng.choice(words)} hall"
+        day = start + timedelta(days=i % days)
+        records.append((i, day, dedup.event_shingles(" ".join(title), venue)))
+        if rng.random() < relist:
+            copy = " ".join(title[:4] + ["live"]).upper() + "!"
+            records.append((n + i, day, dedup.event_shingles(copy, venue)))
+            pairs.append((i, n + i))
+    return records, pairs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5000, 20000, 80000])
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--relist", type=float, default=0.2, help="share of events listed twice")
+    args = parser.parse_args()
+
+    checked = []
+    jaccard = dedup.jaccard
+
+    def counting_jaccard(a, b):
+        checked.append(1)
+        return jaccard(a, b)
+
+    dedup.jaccard = counting_jaccard
+    print(f"{'events':>8}{'seconds':>10}{'us/event':>10}{'checked':>10}{'all pairs':>14}{'recall':>8}")
+    for n in args.sizes:
+        records, pairs = make_records(n, args.days, args.relist, random.Random(n))
+        checked.clear()
+        started = time.perf_counter()
+        clusters = dedup.cluster(records)
+        elapsed = time.perf_counter() - started
+        per_day = len(records) / args.days
+        all_pairs = int(args.days * per_day * (per_day - 1) / 2)
+        found = sum(1 for a, b in pairs if clusters[a] == clusters[b])
+        print(f"{len(records):>8}{elapsed:>10.2f}{elapsed / len(records) * 1e6:>10.0f}{len(checked):>10}"
+              f"{all_pairs:>14}{found / max(1, len(pairs)):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Parse-time and peak-memory benchmark for the listing parsers.
+
+Compares, per source, the original path (``html.parser`` over the whole page)
+with the lxml tree builder and with lxml plus the source's card strainer.
+
+By default each source gets a synthetic listing page shaped like the real
+one (cards matching the scraper's selectors, surrounded by navigation,
+inline scripts and footer markup). Pass ``--fixtures DIR`` to benchmark saved
+pages instead; files are looked up as ``DIR/<source>.html``.
+
+    python benchmarks/parse_bench.py --cards 300 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from scrapers import allevents, eventfinda, skiddle, sydney_com, cityofsydney  # noqa: E402
+from scrapers.parsing import make_soup, HAVE_LXML  # noqa: E402
+
+CARD_TEMPLATES = {
+    "allevents": '<div class="event-card"><a href="/sydney/e-{i}">Event {i}</a><img data-src="/i/{i}.jpg">'
+                 '<span class="date">Sat {d} Mar 2026</span><span class="venue">Venue {i}</span>'
+                 '<p class="desc">Description for event {i} with some more words in it.</p></div>',
+    "eventfinda": '<div class="ef-event"><a href="/event/{i}"><span class="ef-title">Event {i}</span></a>'
+                  '<span class="ef-date">{d} March 2026</span><span class="ef-venue">Venue {i}</span>'
+                  '<img src="/i/{i}.jpg"><p class="ef-desc">Description {i}</p></div>',
+    "skiddle": '<div class="card"><a href="/whats-on/e-{i}"><h3 class="title">Event {i}</h3></a>'
+               '<span class="date">{d}/03/2026</span><span class="venue">Venue {i}</span>'
+               '<img src="/i/{i}.jpg"><p class="description">Description {i}</p></div>',
+    "sydney_com": '<article class="tile"><a href="/events/e-{i}">Event {i}</a>'
+                  '<div class="meta"><time datetime="2026-03-{d:02d}">{d} Mar</time></div>'
+                  '<span class="location">Venue {i}</span><p>Description {i}</p><img src="/i/{i}.jpg"></article>',
+    "cityofsydney": '<div class="listing"><a href="/events/e-{i}"><h3>Event {i}</h3></a>'
+                    '<div class="date">{d} March 2026</div><span class="venue">Venue {i}</span>'
+                    '<p class="summary">Description {i}</p></div>',
+}
+
+MODULES = {
+    "allevents": allevents,
+    "eventfinda": eventfinda,
+    "skiddle": skiddle,
+    "sydney_com": sydney_com,
+    "cityofsydney": cityofsydney,
+}
+
+
+def synthetic_page(source, cards):
+    nav = "".join(f'<li><a href="/nav/{i}">Section {i}</a></li>' for i in range(300))
+    script = "<script>var data = [" + ",".join(f'{{"k": {i}, "v": "value {i}"}}' for i in range(3000)) + "];</script>"
+    body = "".join(CARD_TEMPLATES[source].format(i=i, d=i % 28 + 1) for i in range(cards))
+    promos = "".join(f'<div class="promo"><p>Promo {i}</p><img src="/p/{i}.png"></div>' for i in range(200))
+    footer = "".join(f'<a href="/footer/{i}">Footer link {i}</a>' for i in range(300))
+    return (f"<html><head><title>{source}</title>{script}</head><body><header><ul>{nav}</ul></header>"
+            f"<main>{body}<ul class=\"pagination\"><li><a class=\"next\" href=\"?page=2\">Next</a></li></ul></main>"
+            f"<aside>{promos}</aside><footer>{footer}</footer></body></html>")
+
+
+def measure(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return statistics.median(times), peak, result
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--cards", type=int, default=300)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--fixtures", help="directory of saved <source>.html pages")
+    args = ap.parse_args()
+
+    if not HAVE_LXML:
+        print("lxml is not installed; only html.parser can be measured")
+    print(f"{'source':<14}{'mode':<22}{'items':>6}{'ms':>10}{'peak KiB':>11}{'speedup':>9}")
+    for source, module in MODULES.items():
+        if args.fixtures:
+            path = os.path.join(args.fixtures, f"{source}.html")
+            if not os.path.exists(path):
+                continue
+            with open(path, encoding="utf-8", errors="replace") as fh:
+                html = fh.read()
+        else:
+            html = synthetic_page(source, args.cards)
+        url = f"{module.BASE}/listing"
+
+        modes = [("html.parser (full)", lambda: module.parse_listing(BeautifulSoup(html, "html.parser"), url, "Sydney"))]
+        if HAVE_LXML:
+            modes.append(("lxml (full)", lambda: module.parse_listing(make_soup(html, parser="lxml"), url, "Sydney")))
+        strainer = getattr(module, "CARDS", None)
+        if strainer is not None:
+            modes.append(("html.parser + strainer", lambda: module.parse_listing(make_soup(html, strainer, parser="html.parser"), url, "Sydney")))
+            if HAVE_LXML:
+                modes.append(("lxml + strainer", lambda: module.parse_listing(make_soup(html, strainer, parser="lxml"), url, "Sydney")))
+
+        baseline = None
+        for name, fn in modes:
+            secs, peak, items = measure(fn, args.repeat)
+            if baseline is None:
+                baseline = (secs, items)
+            elif items != baseline[1]:
+                print(f"  warning: {name} extracted different items than the baseline")
+            print(f"{source:<14}{name:<22}{len(items):>6}{secs * 1000:>10.1f}{peak / 1024:>11.0f}{baseline[0] / secs:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Latency benchmark for the full-text event search.
+
+Builds a SQLite database of synthetic events in a temporary directory (the
+schema, FTS index and triggers come from the app's migrations), then times
+``/api/events/search``-style queries: whole words, rare words, typeahead
+prefixes and multi-word queries, each with a city filter. Every match is
+ranked, so the ``matches`` column (events matching the words, before
+filters) is what latency follows. The synthetic descriptions reuse a small
+vocabulary, so common words match most events: a worst case.
+
+    python benchmarks/search_bench.py --events 1000000 --repeat 50
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+WORDS = ("jazz blues rock festival market food wine comedy theatre opera art gallery night "
+         "family kids outdoor cinema harbour park beach music dance workshop tour garden").split()
+CITIES = ["Sydney", "Melbourne", "Brisbane", "Perth", "Adelaide"]
+QUERIES = ["jazz", "harbour festival", "wor", "opera house", "ga", "zyzzyva", "kids art workshop"]
+
+
+def populate(engine, n, batch=20000):
+    rng = random.Random(1)
+    rows = []
+    sql = ("INSERT INTO events (title, venue, description, category, city, city_key, original_url, active) "
+           "VALUES (?, ?, ?, ?, ?, ?, ?, 1)")
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        for i in range(n):
+            city = CITIES[i % len(CITIES)]
+            title = " ".join(rng.sample(WORDS, 3)).title()
+            description = " ".join(rng.choice(WORDS) for _ in range(25))
+            if i % 50000 == 0:
+                description += " zyzzyva"
+            rows.append((title, f"{rng.choice(WORDS).title()} Hall {i % 997}", description,
+                         rng.choice(WORDS), city, city.lower(), f"https://example.com/e/{i}"))
+            if len(rows) >= batch:
+                cur.executemany(sql, rows)
+                rows = []
+        if rows:
+            cur.executemany(sql, rows)
+        raw.commit()
+    finally:
+        raw.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="search-bench-")
+    os.environ["DB_PATH"] = f"sqlite:///{os.path.join(tmp, 'events.db')}"
+    os.environ["SCRAPER_SCHEDULER"] = "off"
+    os.environ["MAIL_SENDER"] = "off"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+    import app  # noqa: E402
+
+    started = time.perf_counter()
+    populate(app.engine, args.events)
+    print(f"Indexed {args.events} events in {time.perf_counter() - started:.1f}s ({tmp})")
+
+    client = app.app.test_client()
+    print(f"{'query':<22}{'matches':>9}{'hits':>6}{'median ms':>12}{'p95 ms':>10}")
+    for q in QUERIES:
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            resp = client.get("/api/events/search", query_string={"q": q, "city": "Sydney", "limit": args.limit})
+            timings.append((time.perf_counter() - t0) * 1000)
+        hits = len(resp.get_json())
+        with app.engine.connect() as conn:
+            matches = conn.exec_driver_sql("SELECT count(*) FROM events_fts WHERE events_fts MATCH ?",
+                                           (app.search.fts5_query(q),)).scalar()
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{q:<22}{matches:>9}{hits:>6}{statistics.median(timings):>12.2f}{p95:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
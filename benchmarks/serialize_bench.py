@@ -0,0 +1,115 @@
+"""
+Throughput benchmark for event list serialization.
+
+Builds a SQLite database of synthetic events in a temporary directory and
+compares, in rows per second:
+
+* ``orm``: the previous path, ``Event`` entities, ``to_dict()`` and
+  ``jsonify``;
+* ``rows``: selected columns as plain rows, ``serializers.row_dicts`` and
+  ``serializers.dumps`` (orjson when installed, else the standard library),
+  with every field and without ``description``;
+
+both for the whole table and for ``/api/events`` pages through the test
+client (response cache off).
+
+    python benchmarks/serialize_bench.py --events 50000 --repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+
+def populate(app, n):
+    now = datetime.now(timezone.utc)
+    rows = [{
+        "title": f"Synthetic event {i}", "start_time": "Sat 7 Mar 2026, 7pm", "start_at": now + timedelta(hours=i),
+        "venue": f"Hall {i % 97}", "address": f"{i} George St", "city": "Sydney", "city_key": "sydney",
+        "description": "An evening of music and conversation. " * 20, "category": "music",
+        "image_url": f"https://example.com/i/{i}.jpg", "source": "Bench", "original_url": f"https://example.com/e/{i}",
+        "last_scraped_time": now, "active": True, "featured": i % 50 == 0,
+    } for i in range(n)]
+    with app.engine.begin() as conn:
+        conn.execute(app.insert(app.Event), rows)
+
+
+def rate(func, rows, repeat):
+    func()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return rows / statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--events", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="serialize-bench-")
+    os.environ["DB_PATH"] = f"sqlite:///{os.path.join(tmp, 'events.db')}"
+    os.environ["SCRAPER_SCHEDULER"] = "off"
+    os.environ["MAIL_SENDER"] = "off"
+    os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+    import app  # noqa: E402
+    import serializers  # noqa: E402
+    from flask import jsonify  # noqa: E402
+
+    populate(app, args.events)
+    encoder = "orjson" if serializers.orjson is not None else "json"
+    print(f"{args.events} events, encoder: {encoder}")
+
+    def orm():
+        db = app.SessionLocal()
+        try:
+            items = db.execute(app.events_query({})).scalars().all()
+            return jsonify([i.to_dict() for i in items]).get_data()
+        finally:
+            db.close()
+
+    def rows(fields):
+        def run():
+            with app.engine.connect() as conn:
+                result = conn.execute(app.events_query({}, *app.event_columns(fields, cursor=True))).all()
+            return serializers.dumps(app.event_dicts(result, fields))
+        return run
+
+    lean = [f for f in app.EVENT_FIELDS if f != "description"]
+    client = app.app.test_client()
+
+    def pages(query):
+        def run():
+            url = f"/api/events?limit=1000{query}"
+            while url:
+                r = client.get(url)
+                assert r.status_code == 200
+                url = r.headers.get("Link", "").partition(">")[0][1:] or None
+        return run
+
+    with app.app.app_context():
+        results = [
+            ("orm + to_dict + jsonify", rate(orm, args.events, args.repeat)),
+            ("rows, all fields", rate(rows(app.EVENT_FIELDS), args.events, args.repeat)),
+            ("rows, without description", rate(rows(lean), args.events, args.repeat)),
+        ]
+    results += [
+        ("/api/events pages", rate(pages(""), args.events, args.repeat)),
+        ("/api/events pages, fields", rate(pages("&fields=" + ",".join(lean)), args.events, args.repeat)),
+    ]
+    base = results[0][1]
+    print(f"{'path':<30}{'rows/s':>12}{'speedup':>10}")
+    for name, value in results:
+        print(f"{name:<30}{value:>12.0f}{value / base:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
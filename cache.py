@@ -0,0 +1,217 @@
+"""
+Response cache for read-only API endpoints.
+
+Responses are cached per route and query string under a per-namespace
+generation counter. Writers (the scraper, PATCH /api/events/<id>, ticket
+requests) bump the generation, which makes every older entry unreachable
+without having to enumerate or delete keys. Entries also expire after a TTL.
+
+Two backends are available: an in-process LRU (the default for a single
+process such as ``flask run``; its invalidations only reach the current
+process) and a SQLite file shared by every process on a host, which the
+Docker image uses: there the scraper runs in the gunicorn master or in
+``worker.py``, not in the web workers, and only a shared generation lets
+its invalidations reach them. With the shared backend the in-process LRU
+still sits in front of it, so repeat reads of a hot page are served from
+memory once the generation has been checked.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request, make_response
+
+
+class MemoryBackend:
+    """Thread-safe LRU with per-entry TTL and in-process generation counters."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max(1, int(max_entries))
+        self._data = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= now:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def generation(self, namespace):
+        with self._lock:
+            return self._generations.get(namespace, 0)
+
+    def bump(self, namespace):
+        with self._lock:
+            gen = self._generations.get(namespace, 0) + 1
+            self._generations[namespace] = gen
+            return gen
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SqliteBackend:
+    """Cache stored in a SQLite file so every worker process shares it."""
+
+    def __init__(self, path, max_entries=1024):
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS response_cache (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache_generations (namespace TEXT PRIMARY KEY, generation INTEGER)")
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # connections opened before a fork (gunicorn --preload imports the
+        # app in the master) must not be used by the forked workers
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute("SELECT value, expires FROM response_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._conn()
+        now = time.time()
+        conn.execute("INSERT OR REPLACE INTO response_cache (key, value, expires) VALUES (?, ?, ?)",
+                     (key, json.dumps(value), now + ttl))
+        # keep the file bounded: drop expired rows, then the soonest-expiring
+        conn.execute("DELETE FROM response_cache WHERE expires <= ?", (now,))
+        conn.execute("DELETE FROM response_cache WHERE key NOT IN "
+                     "(SELECT key FROM response_cache ORDER BY expires DESC LIMIT ?)", (self.max_entries,))
+
+    def generation(self, namespace):
+        row = self._conn().execute("SELECT generation FROM cache_generations WHERE namespace = ?", (namespace,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, namespace):
+        conn = self._conn()
+        conn.execute("INSERT INTO cache_generations (namespace, generation) VALUES (?, 1) "
+                     "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1", (namespace,))
+        return self.generation(namespace)
+
+    def clear(self):
+        self._conn().execute("DELETE FROM response_cache")
+
+
+class ResponseCache:
+    """Caches Flask JSON responses keyed by namespace generation, path and args."""
+
+    # response headers worth replaying from the cache
+    PASSTHROUGH_HEADERS = ("X-Next-Cursor", "Link")
+
+    def __init__(self, ttl=300, max_entries=256, shared=None, enabled=True):
+        self.ttl = ttl
+        self.local = MemoryBackend(max_entries)
+        self.shared = shared
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        """``memory`` (default) or ``sqlite:///path/to/cache.db``."""
+        shared = None
+        if url and url.startswith("sqlite:///"):
+            shared = SqliteBackend(url[len("sqlite:///"):], max_entries=kwargs.get("max_entries", 256) * 4)
+        elif url and url != "memory":
+            raise ValueError(f"unsupported cache backend: {url}")
+        return cls(shared=shared, **kwargs)
+
+    def generation(self, namespace):
+        backend = self.shared or self.local
+        return backend.generation(namespace)
+
+    def invalidate(self, namespace):
+        """Bump the namespace generation so every cached response is stale."""
+        if self.shared is not None:
+            self.shared.bump(namespace)
+        return self.local.bump(namespace)
+
+    def _key(self, namespaces):
+        gens = ",".join(f"{ns}={self.generation(ns)}" for ns in namespaces)
+        args = sorted(request.args.items(multi=True))
+        return f"{gens}:{request.path}?{json.dumps(args)}"
+
+    def _lookup(self, key):
+        entry = self.local.get(key)
+        if entry is None and self.shared is not None:
+            entry = self.shared.get(key)
+            if entry is not None:
+                self.local.set(key, entry, self.ttl)
+        return entry
+
+    def _store(self, key, entry):
+        self.local.set(key, entry, self.ttl)
+        if self.shared is not None:
+            self.shared.set(key, entry, self.ttl)
+
+    def cached(self, *namespaces):
+        """Decorator for GET views; adds ETag/If-None-Match support.
+
+        The entry is stale as soon as any of ``namespaces`` is invalidated.
+        """
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method != "GET":
+                    return func(*args, **kwargs)
+                key = self._key(namespaces)
+                entry = self._lookup(key)
+                if entry is None:
+                    self.misses += 1
+                    resp = make_response(func(*args, **kwargs))
+                    if resp.status_code != 200:
+                        return resp
+                    body = resp.get_data(as_text=True)
+                    entry = {
+                        "body": body,
+                        "mimetype": resp.mimetype,
+                        "etag": hashlib.sha1(body.encode("utf-8")).hexdigest(),
+                        "headers": {h: resp.headers[h] for h in self.PASSTHROUGH_HEADERS if h in resp.headers},
+                    }
+                    self._store(key, entry)
+                else:
+                    self.hits += 1
+                if request.if_none_match.contains(entry["etag"]):
+                    out = make_response("", 304)
+                else:
+                    out = make_response(entry["body"], 200)
+                    out.mimetype = entry["mimetype"]
+                    for h, v in entry["headers"].items():
+                        out.headers[h] = v
+                out.set_etag(entry["etag"])
+                out.headers["Cache-Control"] = "no-cache"
+                return out
+            return wrapper
+        return decorator
@@ -0,0 +1,82 @@
+"""
+Engine configuration for the application database.
+
+SQLite (the default) is switched to WAL journaling on every new connection:
+readers work from a snapshot while the scraper's ingest transaction writes,
+instead of waiting for it, and a writer that finds the database locked waits
+up to ``busy_timeout`` ms rather than failing at once. ``synchronous=NORMAL``
+is durable across application crashes in WAL mode and avoids an fsync per
+commit; ``mmap_size`` lets reads come straight from the page cache.
+
+Server databases (PostgreSQL) get a bounded connection pool sized for the
+web threads plus the scheduler and email threads, with pre-ping so
+connections dropped by the server or a proxy are replaced transparently.
+Their sessions run in UTC, so timestamps come back as UTC datetimes.
+"""
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,  # ms
+    "mmap_size": 256 * 1024 * 1024,  # bytes
+}
+
+POOL_DEFAULTS = {
+    "pool_size": 5,
+    "max_overflow": 10,
+    "pool_timeout": 30,
+    "pool_recycle": 1800,  # seconds; below typical server/proxy idle timeouts
+    "pool_pre_ping": True,
+}
+
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def _is_memory(url):
+    return make_url(url).database in (None, "", ":memory:")
+
+
+def sqlite_pragmas(url, overrides=None):
+    """Pragmas to run on each new connection to ``url``."""
+    pragmas = {**SQLITE_PRAGMAS, **(overrides or {})}
+    if _is_memory(url):
+        # an in-memory database has no journal file to put in WAL mode
+        pragmas.pop("journal_mode", None)
+    return pragmas
+
+
+def apply_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_conn, _record):
+        cursor = dbapi_conn.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def make_engine(url, pragmas=None, pool=None, **kwargs):
+    """``create_engine`` for ``url`` with the settings above.
+
+    ``pragmas`` overrides ``SQLITE_PRAGMAS`` and ``pool`` overrides
+    ``POOL_DEFAULTS``; other keyword arguments go to ``create_engine``.
+    """
+    if is_sqlite(url):
+        pragmas = sqlite_pragmas(url, pragmas)
+        connect_args = {"check_same_thread": False}
+        if "busy_timeout" in pragmas:
+            # pysqlite's own lock wait, which also covers BEGIN and COMMIT
+            connect_args["timeout"] = int(pragmas["busy_timeout"]) / 1000
+        engine = create_engine(url, connect_args={**connect_args, **kwargs.pop("connect_args", {})}, **kwargs)
+        apply_pragmas(engine, pragmas)
+        return engine
+    connect_args = {}
+    if make_url(url).get_backend_name() == "postgresql":
+        connect_args["options"] = "-c timezone=UTC"
+    connect_args.update(kwargs.pop("connect_args", {}))
+    return create_engine(url, connect_args=connect_args, **{**POOL_DEFAULTS, **(pool or {}), **kwargs})
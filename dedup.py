@@ -0,0 +1,148 @@
+"""
+Near-duplicate detection for events listed by several sources.
+
+The same event is often scraped from more than one site under different
+URLs, with slightly different titles ("Jazz at the Opera House" vs "JAZZ @
+Opera House – Live") and venue spellings. ``cluster`` groups such rows:
+
+* every event is reduced to a set of shingles (character n-grams of its
+  normalized title and venue) and blocked by its local start date, so only
+  events on the same day can match and events without a parsed date are
+  never merged;
+* a MinHash signature of the shingles is split into LSH bands; events
+  sharing a band (and a date) become candidate pairs, so the work grows
+  with the number of events rather than the number of pairs;
+* candidates are confirmed with the exact Jaccard similarity of their
+  shingles and joined with union-find. Each cluster is identified by its
+  smallest event id, the canonical event.
+"""
+import re
+import unicodedata
+import zlib
+from collections import defaultdict
+from datetime import timezone
+
+SHINGLE_SIZE = 3
+# words that sources add or drop freely
+STOP_WORDS = frozenset("a an and at by for in of on the to with".split())
+
+# larger than any bin value (32-bit hashes), so borrowed values never collide with own ones
+_ROTATION = 1 << 32
+_NON_WORD_RE = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def normalize_text(value):
+    """Lower-cased words of ``value`` without accents, punctuation or stop words."""
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(c for c in value if not unicodedata.combining(c)).lower().replace("&", " and ")
+    return " ".join(w for w in _NON_WORD_RE.sub(" ", value).replace("_", " ").split() if w not in STOP_WORDS)
+
+
+def _ngrams(text, prefix):
+    if not text:
+        return set()
+    if len(text) <= SHINGLE_SIZE:
+        return {prefix + text}
+    return {prefix + text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def event_shingles(title, venue=None):
+    """Shingles for an event; venue n-grams are kept apart from title n-grams."""
+    return frozenset(_ngrams(normalize_text(title), "t") | _ngrams(normalize_text(venue), "v"))
+
+
+def event_block(start_at, tz):
+    """Local start date of an event (``start_at`` in UTC), or None without one."""
+    if start_at is None:
+        return None
+    if start_at.tzinfo is None:
+        start_at = start_at.replace(tzinfo=timezone.utc)
+    return start_at.astimezone(tz).date()
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash signatures of ``num_perm`` values from one hash per shingle.
+
+    One-permutation hashing: each shingle's hash picks one of ``num_perm``
+    bins and each bin keeps its smallest value, instead of applying
+    ``num_perm`` hash functions to every shingle. Empty bins borrow the
+    value of the next non-empty bin, offset by the distance to it
+    ("rotation"), so two sets agree on a bin with probability close to
+    their Jaccard similarity. A signature costs one pass over the
+    shingles, which keeps re-clustering the days an ingest touched cheap.
+    """
+
+    def __init__(self, num_perm=64, seed=1):
+        self.num_perm = num_perm
+        self.seed = seed
+
+    def signature(self, shingles):
+        k = self.num_perm
+        bins = [None] * k
+        for s in shingles:
+            h = zlib.crc32(s.encode("utf-8"), self.seed)
+            i, value = h % k, h // k
+            if bins[i] is None or value < bins[i]:
+                bins[i] = value
+        filled = [i for i in range(k) if bins[i] is not None]
+        if not filled:
+            return tuple(bins)
+        sig = list(bins)
+        # each empty bin takes the next filled bin to its right, wrapping around
+        nxt = filled[0] + k
+        for i in range(k - 1, -1, -1):
+            if bins[i] is not None:
+                nxt = i
+            else:
+                sig[i] = bins[nxt % k] + (nxt - i) * _ROTATION
+        return tuple(sig)
+
+
+def cluster(records, threshold=0.6, num_perm=64, bands=16):
+    """Map every id in ``records`` to the id of its cluster's canonical event.
+
+    ``records`` yields ``(id, block, shingles)``; records without a block or
+    shingles are clusters of their own. Two records are joined when they
+    share a block and the Jaccard similarity of their shingles is at least
+    ``threshold``. With 16 bands of 4 rows, pairs at a similarity of 0.6
+    become candidates with a probability of about 0.9 (0.7: 0.99), while
+    unrelated events (0.2) rarely do; the exact check keeps precision.
+    """
+    hasher = MinHasher(num_perm)
+    parent = {}
+    shingles = {}
+    buckets = defaultdict(list)
+    for event_id, block, sh in records:
+        parent[event_id] = event_id
+        if block is None or not sh:
+            continue
+        shingles[event_id] = sh
+        sig = hasher.signature(sh)
+        for band in range(bands):
+            # strided rows: neighbouring bins can share a borrowed value
+            buckets[(block, band, sig[band::bands])].append(event_id)
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for members in buckets.values():
+        for i, a in enumerate(members):
+            for b in members[i + 1:]:
+                # pairs already joined (directly or through others) are skipped;
+                # a dissimilar pair sharing several bands is just checked again
+                ra, rb = find(a), find(b)
+                if ra == rb:
+                    continue
+                if jaccard(shingles[a], shingles[b]) >= threshold:
+                    # the smaller id becomes the root, so roots are canonical
+                    parent[max(ra, rb)] = min(ra, rb)
+    return {event_id: find(event_id) for event_id in parent}
@@ -0,0 +1,165 @@
+"""
+Streaming exports for API tables.
+
+Rows are read with ``yield_per`` (a server-side cursor on drivers that have
+one, e.g. psycopg2) and encoded one chunk at a time, so an export of any
+size runs in constant memory and the download starts with the first chunk.
+
+Formats: CSV, NDJSON and, when pyarrow is installed, Parquet (one row group
+per chunk).
+"""
+import csv
+import io
+import json
+from datetime import datetime, timezone
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional dependency
+    pyarrow = None
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_CHUNK_SIZE = 1000
+
+
+class ExportUnavailable(Exception):
+    pass
+
+
+def check_format(fmt):
+    if fmt not in EXPORT_FORMATS:
+        raise ExportUnavailable(f"unsupported export format {fmt!r}")
+    if fmt == "parquet" and pyarrow is None:
+        raise ExportUnavailable("parquet exports need pyarrow")
+
+
+def iter_chunks(session_factory, query, chunk_size=EXPORT_CHUNK_SIZE):
+    """Result rows of ``query`` in lists of at most ``chunk_size``.
+
+    The session stays open until the generator is exhausted or closed.
+    """
+    db = session_factory()
+    try:
+        result = db.execute(query.execution_options(yield_per=chunk_size))
+        for chunk in result.partitions():
+            yield chunk
+    finally:
+        db.close()
+
+
+def _iso(value):
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # stored as naive UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def _value(row, name, kind):
+    value = getattr(row, name)
+    if kind == "bool":
+        # NULL flags export as false, like the model defaults
+        return bool(value)
+    return value
+
+
+def _cell(value):
+    # CSV cells: empty for NULL, 0/1 for booleans
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, datetime):
+        return _iso(value)
+    return value
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return _iso(value)
+    return str(value)
+
+
+def csv_stream(fields, chunks):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow([name for name, _ in fields])
+    yield buf.getvalue()
+    for chunk in chunks:
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([[_cell(_value(row, name, kind)) for name, kind in fields] for row in chunk])
+        yield buf.getvalue()
+
+
+def ndjson_stream(fields, chunks):
+    for chunk in chunks:
+        yield "".join(
+            json.dumps({name: _value(row, name, kind) for name, kind in fields}, default=_json_default, ensure_ascii=False) + "\n"
+            for row in chunk
+        )
+
+
+def _arrow_type(kind):
+    return {
+        "int": pyarrow.int64(),
+        "str": pyarrow.string(),
+        "bool": pyarrow.bool_(),
+        "datetime": pyarrow.timestamp("us", tz="UTC"),
+    }[kind]
+
+
+class _Sink(io.RawIOBase):
+    # file object for ParquetWriter whose written bytes are drained per chunk
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.size
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def parquet_stream(fields, chunks):
+    schema = pyarrow.schema([(name, _arrow_type(kind)) for name, kind in fields])
+    sink = _Sink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema)
+    try:
+        for chunk in chunks:
+            columns = {}
+            for name, kind in fields:
+                values = [_value(row, name, kind) for row in chunk]
+                if kind == "datetime":
+                    values = [v.replace(tzinfo=timezone.utc) if v is not None and v.tzinfo is None else v for v in values]
+                columns[name] = values
+            writer.write_table(pyarrow.Table.from_pydict(columns, schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+STREAMS = {"csv": csv_stream, "ndjson": ndjson_stream, "parquet": parquet_stream}
+
+
+def export_stream(fmt, fields, chunks):
+    """Encoded output of ``chunks`` (row lists) for ``fields``: ``[(name, kind), ...]``."""
+    check_format(fmt)
+    return STREAMS[fmt](fields, chunks)
@@ -35,15 +35,31 @@ export default function Admin() {
     const [requests, setRequests] = useState([])
     const [q, setQ] = useState('')
 
+    // both lists are keyset paged; follow X-Next-Cursor until exhausted
+    async function fetchAllPages(path, token) {
+        let all = []
+        let cursor = null
+        do {
+            const sep = path.includes('?') ? '&' : '?'
+            const qs = cursor ? `${sep}cursor=${encodeURIComponent(cursor)}` : ''
+            const r = await fetch(`${API_BASE}${path}${qs}`, { headers: { 'X-Admin-Token': token } })
+            if (!r.ok) throw new Error(`${path} returned ${r.status}`)
+            const data = await r.json()
+            all = all.concat(Array.isArray(data) ? data : [])
+            cursor = r.headers.get('X-Next-Cursor')
+        } while (cursor)
+        return all
+    }
+
     async function loadProtected(token) {
         setLoading(true)
         try {
             const [er, rr] = await Promise.all([
-                fetch(`${API_BASE}/api/events`, { headers: { 'X-Admin-Token': token } }).then(r => r.json()),
-                fetch(`${API_BASE}/api/ticket-requests`, { headers: { 'X-Admin-Token': token } }).then(r => r.json())
+                fetchAllPages('/api/events?limit=1000', token),
+                fetchAllPages('/api/ticket-requests', token)
             ])
-            setEvents(Array.isArray(er) ? er : (er.events || []))
-            setRequests(Array.isArray(rr) ? rr : (rr.requests || []))
+            setEvents(er)
+            setRequests(rr)
         } catch (err) {
             console.error('loadProtected', err)
             setAuthError('Failed to load admin data')
@@ -39,10 +39,22 @@ export default function Home() {
     }
 
     useEffect(() => {
-        fetch(`${API_BASE}/api/events`)
-            .then(r => r.json())
+        // the API pages results with a keyset cursor; follow it until exhausted
+        const loadAll = async () => {
+            let all = []
+            let cursor = null
+            do {
+                const qs = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
+                const r = await fetch(`${API_BASE}/api/events${qs}`)
+                const data = await r.json()
+                all = all.concat(data || [])
+                cursor = r.headers.get('X-Next-Cursor')
+            } while (cursor)
+            return all
+        }
+        loadAll()
             .then(data => {
-                setEvents(data || [])
+                setEvents(data)
                 setLoading(false)
             })
             .catch(err => {
@@ -81,7 +93,7 @@ export default function Home() {
 
         // timeframe filter
         if (timeframe && timeframe !== 'any') {
-            const s = e.start_time || e.start || e.date || e.datetime
+            const s = e.start_at || e.start_time || e.start || e.date || e.datetime
             if (!s) return false
 
             const parseDate = (str) => {
@@ -257,7 +269,7 @@ export default function Home() {
                                     <div style={{ padding: 12, display: 'flex', flexDirection: 'column', minHeight: 140, flex: '1 1 auto' }}>
                                         <div style={{ color: '#6b46c1', fontSize: 13 }}>{ev.category || ''}</div>
                                         <h3 style={{ margin: '6px 0' }}>{ev.title}</h3>
-                                        <div style={{ color: '#666', fontSize: 13, marginBottom: 8 }}>{formatDate(ev.start_time)}</div>
+                                        <div style={{ color: '#666', fontSize: 13, marginBottom: 8 }}>{formatDate(ev.start_at || ev.start_time)}</div>
                                         <div style={{ color: '#444', fontSize: 14, marginBottom: 8 }}>{truncate(ev.description, 80)}</div>
                                         <div style={{ display: 'flex', gap: 8, alignItems: 'center', marginTop: 'auto' }}>
                                             <button onClick={() => openModal(ev)} style={{ background: '#2b6ef6', color: 'white', border: 'none', padding: '8px 10px', borderRadius: 6 }}>GET TICKETS</button>
@@ -281,7 +293,7 @@ export default function Home() {
                 <div style={{ position: 'fixed', inset: 0, background: 'rgba(0,0,0,0.4)', display: 'flex', alignItems: 'center', justifyContent: 'center' }}>
                     <div style={{ background: '#fff', padding: 20, borderRadius: 8, width: 480, maxWidth: '92%' }}>
                         <h3>Get tickets — {modalEvent.title}</h3>
-                        <p style={{ color: '#666' }}>{modalEvent.venue} — {formatDate(modalEvent.start_time)}</p>
+                        <p style={{ color: '#666' }}>{modalEvent.venue} — {formatDate(modalEvent.start_at || modalEvent.start_time)}</p>
                         <label style={{ display: 'block', marginTop: 8 }}>Email address</label>
                         <input value={email} onChange={e => setEmail(e.target.value)} style={{ width: '100%', padding: 8 }} placeholder="you@example.com" />
                         <label style={{ display: 'block', marginTop: 8 }}><input type="checkbox" checked={consent} onChange={e => setConsent(e.target.checked)} /> I agree to receive event information by email</label>
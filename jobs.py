@@ -0,0 +1,232 @@
+"""
+Single-runner background jobs.
+
+Every gunicorn worker imports ``app``, so anything scheduled at import time
+exists once per process. ``JobRunner`` makes sure a job (the scrape) runs at
+most once at a time across all of them:
+
+* within a process, a run requested while one is in progress is coalesced:
+  however many requests arrive, exactly one follow-up run happens after the
+  current one finishes;
+* across processes (and hosts sharing the database) a lock must be held for
+  the whole run. ``DatabaseLock`` is a lease row in the application database,
+  renewed while the job runs and taken over once it expires if its holder
+  died; ``FileLock`` is an ``flock`` on a local file, released by the kernel
+  when the holder exits. A process that cannot take the lock skips the run,
+  since another one is already doing it.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+
+from sqlalchemy import Column, Float, MetaData, String, Table, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+
+def _owner_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class FileLock:
+    """Non-blocking exclusive ``flock`` on ``path``."""
+
+    def __init__(self, path):
+        if fcntl is None:
+            raise RuntimeError("file locks need fcntl; use the database lock instead")
+        self.path = path
+        self._fh = None
+
+    def acquire(self):
+        fh = open(self.path, "a+")
+        try:
+            fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            fh.close()
+            return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(f"{os.getpid()}\n")
+        fh.flush()
+        self._fh = fh
+        return True
+
+    def release(self):
+        if self._fh is not None:
+            fcntl.flock(self._fh, fcntl.LOCK_UN)
+            self._fh.close()
+            self._fh = None
+
+    def held(self):
+        """Whether any process (this one included) holds the lock."""
+        if self._fh is not None:
+            return True
+        with open(self.path, "a+") as fh:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                return True
+            fcntl.flock(fh, fcntl.LOCK_UN)
+        return False
+
+
+_metadata = MetaData()
+job_locks = Table(
+    "job_locks", _metadata,
+    Column("name", String(64), primary_key=True),
+    Column("owner", String(128), nullable=False),
+    Column("expires_at", Float, nullable=False),
+)
+
+
+class DatabaseLock:
+    """Lease on a ``job_locks`` row, renewed every ``ttl / 3`` seconds while held."""
+
+    def __init__(self, engine, name, ttl=120.0):
+        self.engine = engine
+        self.name = name
+        self.ttl = float(ttl)
+        self.owner = _owner_id()
+        self._stop = None
+        job_locks.create(engine, checkfirst=True)
+
+    def _claim(self):
+        now = time.time()
+        with self.engine.begin() as conn:
+            res = conn.execute(
+                update(job_locks)
+                .where(job_locks.c.name == self.name)
+                .where((job_locks.c.expires_at < now) | (job_locks.c.owner == self.owner))
+                .values(owner=self.owner, expires_at=now + self.ttl)
+            )
+            if res.rowcount:
+                return True
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(insert(job_locks).values(name=self.name, owner=self.owner, expires_at=now + self.ttl))
+            return True
+        except IntegrityError:
+            return False
+
+    def acquire(self):
+        if not self._claim():
+            return False
+        self._stop = threading.Event()
+        threading.Thread(target=self._renew, args=(self._stop,), name=f"lease-{self.name}", daemon=True).start()
+        return True
+
+    def _renew(self, stop):
+        while not stop.wait(self.ttl / 3):
+            try:
+                if not self._claim():
+                    print(f"Lost lock {self.name}; another process took it over")
+                    return
+            except Exception as e:
+                print(f"Could not renew lock {self.name}: {e}")
+
+    def release(self):
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+        with self.engine.begin() as conn:
+            conn.execute(delete(job_locks).where(job_locks.c.name == self.name, job_locks.c.owner == self.owner))
+
+    def held(self):
+        """Whether any process holds an unexpired lease."""
+        with self.engine.connect() as conn:
+            expires = conn.execute(select(job_locks.c.expires_at).where(job_locks.c.name == self.name)).scalar()
+        return expires is not None and expires >= time.time()
+
+
+def lock_from_url(url, engine, name, ttl=120.0):
+    """``db`` (the default) or ``file:///path/to.lock``."""
+    if url and url.startswith("file://"):
+        return FileLock(url[len("file://"):])
+    if url and url != "db":
+        raise ValueError(f"unsupported job lock {url!r}")
+    return DatabaseLock(engine, name, ttl=ttl)
+
+
+class JobRunner:
+    """Run ``func`` at most once at a time, coalescing overlapping requests."""
+
+    def __init__(self, func, lock, name="job"):
+        self.func = func
+        self.lock = lock
+        self.name = name
+        self._cond = threading.Condition()
+        self._running = False
+        self._pending = None  # kwargs of the coalesced follow-up run
+        self.runs = 0
+        self.coalesced = 0
+        self.skipped = 0
+        self.last_result = None
+        self.last_error = None
+
+    @property
+    def running(self):
+        with self._cond:
+            return self._running
+
+    def run(self, **kwargs):
+        """Run now, or coalesce into the follow-up of the run in progress.
+
+        Returns "finished", "coalesced" (a run in this process will pick the
+        request up) or "skipped" (another process holds the lock).
+        """
+        with self._cond:
+            if self._running:
+                self._pending = kwargs
+                self.coalesced += 1
+                return "coalesced"
+            self._running = True
+        status = "finished"
+        try:
+            while True:
+                if not self.lock.acquire():
+                    self.skipped += 1
+                    print(f"{self.name} is already running in another process; skipping")
+                    status = "skipped"
+                    break
+                try:
+                    self.runs += 1
+                    self.last_result = self.func(**kwargs)
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = str(e)
+                    print(f"{self.name} failed: {e}")
+                finally:
+                    try:
+                        self.lock.release()
+                    except Exception as e:
+                        print(f"Could not release lock for {self.name}: {e}")
+                with self._cond:
+                    if self._pending is None:
+                        break
+                    kwargs, self._pending = self._pending, None
+        finally:
+            with self._cond:
+                self._running = False
+                self._pending = None
+                self._cond.notify_all()
+        return status
+
+    def start(self, **kwargs):
+        """Like ``run`` but in a background thread; returns immediately."""
+        with self._cond:
+            if self._running:
+                self._pending = kwargs
+                self.coalesced += 1
+                return "coalesced"
+        threading.Thread(target=self.run, kwargs=kwargs, name=f"{self.name}-run", daemon=True).start()
+        return "started"
+
+    def wait(self, timeout=None):
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._running, timeout)
@@ -0,0 +1,276 @@
+"""
+Rate limiting and admin sessions shared across worker processes.
+
+State lives in a pluggable store: ``MemoryStore`` (per process, the default)
+or ``SqliteStore``, a SQLite file every gunicorn worker on a host shares, so
+a limit of N means N for the whole deployment and an admin token issued by
+one worker is accepted by all of them.
+
+Limits are token buckets: a key holds ``limit`` tokens that refill evenly
+over ``window`` seconds and each request takes one. That is two numbers per
+key whatever the request rate, and a bucket that has refilled completely
+carries no information, so it expires then. Expired buckets and sessions
+are removed by a background sweep, started in each process on first use (a
+thread started at import would only run in the gunicorn ``--preload`` master).
+
+Limits are keyed by ``request.remote_addr``; behind reverse proxies, wrap the
+app in werkzeug's ``ProxyFix`` so it is the address the nearest trusted proxy
+saw, not a client-supplied ``X-Forwarded-For`` entry.
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, make_response, request
+
+
+def _bucket(tokens, updated, now, limit, window):
+    """Tokens available at ``now`` for a bucket last left at ``tokens``."""
+    if tokens is None:
+        return float(limit)
+    return min(float(limit), tokens + (now - updated) * limit / window)
+
+
+def _full_at(tokens, now, limit, window):
+    # time at which the bucket is full again; it can be forgotten after that
+    return now + (limit - tokens) * window / limit
+
+
+class _Store:
+    sweep_interval = 0.0  # seconds between purges; 0 disables the sweep
+    _sweep_pid = None
+    _sweep_lock = threading.Lock()
+
+    def _ensure_sweeper(self):
+        # one sweep thread per process: threads do not survive a fork
+        if not self.sweep_interval or self._sweep_pid == os.getpid():
+            return
+        with self._sweep_lock:
+            if self._sweep_pid != os.getpid():
+                self._sweep_pid = os.getpid()
+                threading.Thread(target=_sweep, args=(self, self.sweep_interval), name="state-sweep",
+                                 daemon=True).start()
+
+
+class MemoryStore(_Store):
+    """Thread-safe in-process store."""
+
+    def __init__(self):
+        self._buckets = {}  # key -> (tokens, updated, expires)
+        self._values = {}  # key -> (value, expires)
+        self._lock = threading.Lock()
+
+    def take(self, key, limit, window, now=None):
+        """Take a token from ``key``'s bucket; returns ``(allowed, retry_after)``."""
+        self._ensure_sweeper()
+        now = time.time() if now is None else now
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (None, now, 0))
+            tokens = _bucket(tokens, updated, now, limit, window)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, _full_at(tokens, now, limit, window))
+        return allowed, 0.0 if allowed else (1 - tokens) * window / limit
+
+    def get(self, key, now=None):
+        self._ensure_sweeper()
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None or entry[1] <= now:
+                return None
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        self._ensure_sweeper()
+        with self._lock:
+            self._values[key] = (value, time.time() + ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._values.pop(key, None)
+
+    def purge(self, now=None):
+        """Drop expired buckets and values; returns how many were dropped."""
+        now = time.time() if now is None else now
+        with self._lock:
+            buckets = [k for k, (_, _, expires) in self._buckets.items() if expires <= now]
+            values = [k for k, (_, expires) in self._values.items() if expires <= now]
+            for k in buckets:
+                del self._buckets[k]
+            for k in values:
+                del self._values[k]
+        return len(buckets) + len(values)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._buckets) + len(self._values)
+
+
+class SqliteStore(_Store):
+    """Store in a SQLite file shared by every process on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_buckets "
+                     "(key TEXT PRIMARY KEY, tokens REAL, updated REAL, expires REAL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS shared_values (key TEXT PRIMARY KEY, value TEXT, expires REAL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_rate_buckets_expires ON rate_buckets (expires)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_shared_values_expires ON shared_values (expires)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        # connections opened before a fork must not be used by the forked workers
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key, limit, window, now=None):
+        self._ensure_sweeper()
+        now = time.time() if now is None else now
+        conn = self._conn()
+        # IMMEDIATE takes the write lock up front, so read-modify-write is atomic across processes
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _bucket(row[0] if row else None, row[1] if row else now, now, limit, window)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute("INSERT OR REPLACE INTO rate_buckets (key, tokens, updated, expires) VALUES (?, ?, ?, ?)",
+                         (key, tokens, now, _full_at(tokens, now, limit, window)))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return allowed, 0.0 if allowed else (1 - tokens) * window / limit
+
+    def get(self, key, now=None):
+        self._ensure_sweeper()
+        now = time.time() if now is None else now
+        row = self._conn().execute("SELECT value FROM shared_values WHERE key = ? AND expires > ?", (key, now)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        self._ensure_sweeper()
+        self._conn().execute("INSERT OR REPLACE INTO shared_values (key, value, expires) VALUES (?, ?, ?)",
+                             (key, json.dumps(value), time.time() + ttl))
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM shared_values WHERE key = ?", (key,))
+
+    def purge(self, now=None):
+        now = time.time() if now is None else now
+        conn = self._conn()
+        dropped = conn.execute("DELETE FROM rate_buckets WHERE expires <= ?", (now,)).rowcount
+        dropped += conn.execute("DELETE FROM shared_values WHERE expires <= ?", (now,)).rowcount
+        return dropped
+
+    def __len__(self):
+        conn = self._conn()
+        return (conn.execute("SELECT count(*) FROM rate_buckets").fetchone()[0]
+                + conn.execute("SELECT count(*) FROM shared_values").fetchone()[0])
+
+
+def store_from_url(url, sweep=60.0):
+    """``memory`` (default) or ``sqlite:///path/to/state.db``.
+
+    Each process using the store gets a daemon thread purging expired
+    entries every ``sweep`` seconds (0 disables it).
+    """
+    if url and url.startswith("sqlite:///"):
+        store = SqliteStore(url[len("sqlite:///"):])
+    elif not url or url == "memory":
+        store = MemoryStore()
+    else:
+        raise ValueError(f"unsupported state backend: {url}")
+    store.sweep_interval = float(sweep or 0)
+    return store
+
+
+def _sweep(store, interval):
+    while True:
+        time.sleep(interval)
+        try:
+            store.purge()
+        except Exception as e:
+            print(f"Could not purge expired rate limits and sessions: {e}")
+
+
+def client_ip():
+    # X-Forwarded-For is only honoured through ProxyFix (see TRUSTED_PROXIES in app.py)
+    return request.remote_addr
+
+
+class RateLimiter:
+    """Token-bucket limits for Flask views, keyed by client IP by default."""
+
+    def __init__(self, store, max_requests=5, window=3600, key_func=client_ip, enabled=True):
+        self.store = store
+        self.max_requests = int(max_requests)
+        self.window = float(window)
+        self.key_func = key_func
+        self.enabled = enabled
+
+    def hit(self, scope, key, max_requests=None, window=None):
+        """Count one request for ``key`` in ``scope``; returns ``(allowed, retry_after)``."""
+        return self.store.take(f"{scope}:{key}", max_requests or self.max_requests, window or self.window)
+
+    def limit(self, scope=None, max_requests=None, window=None, key_func=None):
+        """Decorator answering 429 with ``Retry-After`` once the bucket is empty.
+
+        Allows ``max_requests`` per ``window`` seconds (the limiter's defaults
+        unless given); each ``scope`` (the view name by default) has its own
+        buckets.
+        """
+        def decorator(func):
+            name = scope or func.__name__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                allowed, retry_after = self.hit(name, (key_func or self.key_func)(), max_requests, window)
+                if not allowed:
+                    resp = make_response(jsonify({"error": "rate_limited"}), 429)
+                    resp.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+                    return resp
+                return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+
+class SessionStore:
+    """Opaque bearer tokens that expire ``ttl`` seconds after they are issued."""
+
+    PREFIX = "session:"
+
+    def __init__(self, store, ttl=3600):
+        self.store = store
+        self.ttl = int(ttl)
+
+    def create(self, data=None):
+        token = secrets.token_hex(16)
+        self.store.set(self.PREFIX + token, data or {}, self.ttl)
+        return token
+
+    def get(self, token):
+        return self.store.get(self.PREFIX + token) if token else None
+
+    def valid(self, token):
+        return self.get(token) is not None
+
+    def revoke(self, token):
+        if token:
+            self.store.delete(self.PREFIX + token)
@@ -0,0 +1,332 @@
+"""
+Outbound mail queue.
+
+Messages are rows in ``outbound_emails``, written in the same transaction as
+whatever they belong to, so a queued email survives restarts and is never
+sent for a row that was rolled back. A fixed pool of worker threads drains
+the queue:
+
+* a worker claims up to ``batch_size`` due rows with one UPDATE (a lease,
+  so several processes can drain the same table and rows claimed by a
+  worker that died are picked up again once the lease expires);
+* the batch goes out over one authenticated SMTP connection taken from
+  ``SMTPPool``, which keeps connections open between batches instead of
+  doing a TCP, STARTTLS and AUTH handshake per email;
+* outcomes are written back in bulk: one UPDATE for the sent rows, one
+  executemany for the rest. Transient failures are retried with exponential
+  backoff up to ``max_attempts``; permanent (5xx) rejections fail at once.
+"""
+import os
+import smtplib
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+
+from sqlalchemy import (Column, DateTime, Index, Integer, MetaData, String, Table, Text, and_, bindparam, insert,
+                        or_, select, update)
+
+_metadata = MetaData()
+outbound_emails = Table(
+    "outbound_emails", _metadata,
+    Column("id", Integer, primary_key=True),
+    Column("ref_id", Integer),  # the row the email is about, e.g. a ticket request
+    Column("to_addr", String(320), nullable=False),
+    Column("subject", String(512), nullable=False),
+    Column("body", Text, nullable=False),
+    Column("status", String(16), nullable=False, default="queued"),  # queued, sending, sent, failed
+    Column("attempts", Integer, nullable=False, default=0),
+    Column("next_attempt_at", DateTime(timezone=True)),
+    Column("claimed_by", String(64)),
+    Column("lease_until", DateTime(timezone=True)),
+    Column("last_error", Text),
+    Column("created_at", DateTime(timezone=True)),
+    Column("sent_at", DateTime(timezone=True)),
+    Index("ix_outbound_emails_status_next_attempt_at", "status", "next_attempt_at"),
+    Index("ix_outbound_emails_claimed_by", "claimed_by"),
+)
+
+
+def _permanent(exc):
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in exc.recipients.values())
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code >= 500
+
+
+class SMTPPool:
+    """Authenticated SMTP connections kept open and handed out one per batch.
+
+    A connection idle for longer than ``max_idle`` seconds is checked with
+    NOOP before reuse; one that has sent ``max_messages`` is closed, since
+    many servers cap messages per session.
+    """
+
+    def __init__(self, host, port=587, user=None, password=None, starttls=True, timeout=10.0,
+                 max_idle=60.0, max_messages=100, factory=smtplib.SMTP):
+        self.host = host
+        self.port = int(port)
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.timeout = float(timeout)
+        self.max_idle = float(max_idle)
+        self.max_messages = int(max_messages)
+        self.factory = factory
+        self._idle = []  # [(conn, sent, released_at)]
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _connect(self):
+        conn = self.factory(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.user and self.password:
+            conn.login(self.user, self.password)
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+
+    def acquire(self):
+        """``(conn, sent)``: an open connection and the messages it has sent so far."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                conn, sent, released_at = self._idle.pop()
+            if time.monotonic() - released_at <= self.max_idle:
+                return conn, sent
+            try:
+                if conn.noop()[0] == 250:
+                    return conn, sent
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._quit(conn)
+        return self._connect(), 0
+
+    def release(self, conn, sent, broken=False):
+        if broken or sent >= self.max_messages:
+            self._quit(conn)
+            return
+        with self._lock:
+            self._idle.append((conn, sent, time.monotonic()))
+
+    @staticmethod
+    def _quit(conn):
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn, _, _ in idle:
+            self._quit(conn)
+
+
+class MailQueue:
+    """DB-backed outbox drained by ``workers`` threads through ``pool``.
+
+    ``on_sent(ref_ids)`` is called once per batch with the ``ref_id`` of the
+    messages that went out.
+    """
+
+    def __init__(self, engine, pool, from_addr, workers=2, batch_size=20, max_attempts=5,
+                 retry_base=30.0, retry_max=3600.0, lease=300.0, poll=10.0, on_sent=None):
+        self.engine = engine
+        self.pool = pool
+        self.from_addr = from_addr
+        self.workers = int(workers)
+        self.batch_size = max(1, int(batch_size))
+        self.max_attempts = max(1, int(max_attempts))
+        self.retry_base = float(retry_base)
+        self.retry_max = float(retry_max)
+        self.lease = float(lease)
+        self.poll = float(poll)
+        self.on_sent = on_sent
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def enqueue(self, conn, to_addr, subject, body, ref_id=None):
+        """Queue a message on ``conn`` (a Connection or Session); it is sent once that commits."""
+        now = datetime.now(timezone.utc)
+        conn.execute(insert(outbound_emails).values(
+            ref_id=ref_id, to_addr=to_addr, subject=subject, body=body, status="queued",
+            attempts=0, next_attempt_at=now, created_at=now,
+        ))
+
+    def notify(self):
+        """Wake an idle worker, e.g. after committing new messages."""
+        self._wake.set()
+
+    def backoff(self, attempts):
+        return min(self.retry_max, self.retry_base * 2 ** (attempts - 1))
+
+    def claim(self, now=None):
+        """Lease up to ``batch_size`` due messages to a new claim; returns the rows."""
+        now = now or datetime.now(timezone.utc)
+        claim_id = f"{self.owner}:{uuid.uuid4().hex[:8]}"
+        t = outbound_emails
+        due = or_(
+            and_(t.c.status == "queued", t.c.next_attempt_at <= now),
+            # claimed by a worker that died
+            and_(t.c.status == "sending", t.c.lease_until < now),
+        )
+        with self.engine.begin() as conn:
+            ids = list(conn.execute(
+                select(t.c.id).where(due).order_by(t.c.next_attempt_at, t.c.id).limit(self.batch_size)
+            ).scalars())
+            if not ids:
+                return []
+            # re-checking ``due`` drops rows another worker claimed in the meantime
+            conn.execute(
+                update(t).where(t.c.id.in_(ids), due)
+                .values(status="sending", claimed_by=claim_id, lease_until=now + timedelta(seconds=self.lease))
+            )
+            return conn.execute(select(t).where(t.c.claimed_by == claim_id, t.c.status == "sending")
+                                .order_by(t.c.id)).all()
+
+    def _message(self, row):
+        msg = EmailMessage()
+        msg["Subject"] = row.subject
+        msg["From"] = self.from_addr
+        msg["To"] = row.to_addr
+        msg.set_content(row.body)
+        return msg
+
+    def send_batch(self, rows):
+        """Send ``rows`` over one pooled connection; returns ``(sent, failed)``.
+
+        ``failed`` maps row id to ``(error, permanent)``.
+        """
+        sent, failed = [], {}
+        conn, count = None, 0
+        try:
+            for i, row in enumerate(rows):
+                msg = self._message(row)
+                for attempt in (1, 2):
+                    if conn is None:
+                        try:
+                            conn, count = self.pool.acquire()
+                        except (smtplib.SMTPException, OSError) as e:
+                            # cannot connect or log in: retry the rest of the batch later
+                            for r in rows[i:]:
+                                failed[r.id] = (f"connect: {e}", False)
+                            return sent, failed
+                    try:
+                        conn.send_message(msg)
+                    except smtplib.SMTPServerDisconnected as e:
+                        # a pooled connection the server closed; retry once on a new one
+                        self.pool.release(conn, count, broken=True)
+                        conn = None
+                        if attempt == 1:
+                            continue
+                        failed[row.id] = (str(e), False)
+                    except (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError) as e:
+                        # this message was refused; the connection stays usable
+                        failed[row.id] = (str(e), _permanent(e))
+                    except (smtplib.SMTPException, OSError) as e:
+                        failed[row.id] = (str(e), _permanent(e))
+                        self.pool.release(conn, count, broken=True)
+                        conn = None
+                    else:
+                        count += 1
+                        sent.append(row)
+                    break
+        finally:
+            if conn is not None:
+                self.pool.release(conn, count)
+        return sent, failed
+
+    def record(self, rows, sent, failed, now=None):
+        """Write batch outcomes back with one statement per kind of outcome."""
+        now = now or datetime.now(timezone.utc)
+        t = outbound_emails
+        retry = []
+        for row in rows:
+            if row.id not in failed:
+                continue
+            error, permanent = failed[row.id]
+            attempts = row.attempts + 1
+            done = permanent or attempts >= self.max_attempts
+            retry.append({
+                "row_id": row.id, "attempts": attempts, "last_error": error[:1000],
+                "status": "failed" if done else "queued",
+                "next_attempt_at": now + timedelta(seconds=self.backoff(attempts)),
+            })
+        with self.engine.begin() as conn:
+            if sent:
+                conn.execute(
+                    update(t).where(t.c.id.in_([r.id for r in sent]))
+                    .values(status="sent", sent_at=now, attempts=t.c.attempts + 1,
+                            claimed_by=None, lease_until=None, last_error=None)
+                )
+            if retry:
+                conn.execute(
+                    update(t).where(t.c.id == bindparam("row_id"))
+                    .values(status=bindparam("status"), attempts=bindparam("attempts"),
+                            last_error=bindparam("last_error"), next_attempt_at=bindparam("next_attempt_at"),
+                            claimed_by=None, lease_until=None),
+                    retry,
+                )
+        for r in retry:
+            if r["status"] == "failed":
+                print(f"Giving up on email {r['row_id']} after {r['attempts']} attempts: {r['last_error']}")
+        if sent and self.on_sent is not None:
+            try:
+                self.on_sent([r.ref_id for r in sent if r.ref_id is not None])
+            except Exception as e:
+                print(f"Mail on_sent callback failed: {e}")
+
+    def process_batch(self):
+        """Claim, send and record one batch; returns the number of rows claimed."""
+        rows = self.claim()
+        if rows:
+            sent, failed = self.send_batch(rows)
+            self.record(rows, sent, failed)
+        return len(rows)
+
+    def drain(self):
+        """Process batches until nothing is due (used by tests and one-off runs)."""
+        total = 0
+        while True:
+            n = self.process_batch()
+            if not n:
+                return total
+            total += n
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                if self.process_batch() == self.batch_size:
+                    continue  # more may be waiting
+            except Exception as e:
+                print(f"Mail worker error: {e}")
+            self._wake.wait(self.poll)
+            self._wake.clear()
+
+    def start(self):
+        """Start the worker threads (no-op if already running, without a pool or with no workers)."""
+        if self._threads or self.pool is None or self.workers < 1:
+            return
+        self._stop.clear()
+        for i in range(self.workers):
+            th = threading.Thread(target=self._work, name=f"mail-{i}", daemon=True)
+            th.start()
+            self._threads.append(th)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        for th in self._threads:
+            th.join(timeout)
+        self._threads = []
+        if self.pool is not None:
+            self.pool.close()
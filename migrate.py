@@ -0,0 +1,41 @@
+"""
+Apply pending schema migrations.
+
+Run before starting (or restarting) the web workers when they run with
+``DB_MIGRATE=off``, e.g. as a deploy step, so long index builds never delay
+worker boot:
+
+    python migrate.py           # apply pending migrations
+    python migrate.py --status  # list applied and pending migrations
+"""
+import argparse
+import os
+
+# apply migrations here, not as a side effect of importing app
+os.environ["DB_MIGRATE"] = "manual"
+os.environ.setdefault("SCRAPER_SCHEDULER", "off")
+os.environ.setdefault("MAIL_SENDER", "off")
+
+import app  # noqa: E402
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--status", action="store_true", help="show migration status and exit")
+    args = parser.parse_args(argv)
+
+    migrator = app.migrator
+    if args.status:
+        applied = migrator.applied()
+        for m in migrator.migrations:
+            print(f"{m.version:>4}  {'applied' if m.version in applied else 'pending':<8} {m.name}")
+        return
+    versions = migrator.upgrade()
+    if versions:
+        print(f"Schema upgraded to version {migrator.head}")
+    else:
+        print(f"Schema is current (version {migrator.current()})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Versioned schema migrations.
+
+Applied versions are recorded in ``schema_migrations``. ``Migrator.upgrade``
+first compares the newest recorded version with the newest migration, so a
+process starting against an up-to-date database costs one query; pending
+migrations run in order under a lock (``jobs.lock_from_url``), so only one of
+several gunicorn workers booting together applies them while the others wait.
+
+A migration is a function of a ``MigrationContext`` registered with
+``@migration(version)``. Helpers are idempotent (``add_column`` skips an
+existing column, ``create_index`` an existing index), since databases created
+before migrations existed already have part of the schema. Migrations
+registered with ``transactional=False`` run on an autocommit connection; that
+is what lets ``create_index`` build indexes with ``CREATE INDEX CONCURRENTLY``
+on PostgreSQL, without locking writes to large tables.
+"""
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, List
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, false, func, inspect, insert, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateIndex
+
+import search
+from mailer import outbound_emails
+
+_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(128), nullable=False),
+    Column("applied_at", DateTime(timezone=True)),
+)
+
+
+@dataclass
+class Migration:
+    version: int
+    name: str
+    upgrade: Callable[["MigrationContext"], None]
+    transactional: bool = True
+
+
+MIGRATIONS: List[Migration] = []
+
+
+def migration(version, transactional=True):
+    def register(func):
+        if any(m.version == version for m in MIGRATIONS):
+            raise ValueError(f"duplicate migration version {version}")
+        MIGRATIONS.append(Migration(version, func.__name__, func, transactional))
+        MIGRATIONS.sort(key=lambda m: m.version)
+        return func
+    return register
+
+
+class MigrationContext:
+    """Connection plus schema helpers for one migration; tables and indexes
+    are looked up by name in the application ``metadata``."""
+
+    def __init__(self, conn, metadata, transactional=True):
+        self.conn = conn
+        self.metadata = metadata
+        self.dialect = conn.dialect
+        self.transactional = transactional
+
+    def _quote(self, name):
+        return self.dialect.identifier_preparer.quote(name)
+
+    def execute(self, sql, params=None):
+        return self.conn.execute(text(sql), params or {})
+
+    def has_column(self, table, name):
+        return name in {c["name"] for c in inspect(self.conn).get_columns(table)}
+
+    def create_tables(self, *names):
+        """Create the named tables (every model table if none) that do not exist yet."""
+        tables = [self.metadata.tables[n] for n in names] if names else None
+        self.metadata.create_all(self.conn, tables=tables, checkfirst=True)
+
+    def add_column(self, table, name, default=None):
+        """Add model column ``table.name`` if missing; returns whether it was added.
+
+        ``default`` is a SQL expression for the server default, e.g. ``false()``.
+        """
+        if self.has_column(table, name):
+            return False
+        column = self.metadata.tables[table].c[name]
+        sql = f"ALTER TABLE {self._quote(table)} ADD COLUMN {self._quote(name)} {column.type.compile(dialect=self.dialect)}"
+        if default is not None:
+            sql += " DEFAULT " + str(default.compile(dialect=self.dialect, compile_kwargs={"literal_binds": True}))
+        self.conn.exec_driver_sql(sql)
+        print(f"Added '{name}' column to {table} table")
+        return True
+
+    def drop_index(self, name):
+        concurrently = " CONCURRENTLY" if self._concurrent else ""
+        self.conn.exec_driver_sql(f"DROP INDEX{concurrently} IF EXISTS {self._quote(name)}")
+
+    @property
+    def _concurrent(self):
+        # CONCURRENTLY cannot run inside a transaction block
+        return self.dialect.name == "postgresql" and not self.transactional
+
+    def create_index(self, table, name):
+        """Create model index ``name`` of ``table`` unless it exists."""
+        index = next(i for i in self.metadata.tables[table].indexes if i.name == name)
+        if self._concurrent:
+            # a failed concurrent build leaves an invalid index behind that
+            # IF NOT EXISTS would keep; drop it and build again
+            invalid = self.execute(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid", {"name": name}
+            ).first()
+            if invalid:
+                self.drop_index(name)
+        sql = str(CreateIndex(index, if_not_exists=True).compile(dialect=self.dialect))
+        if self._concurrent:
+            sql = sql.replace(" INDEX ", " INDEX CONCURRENTLY ", 1)
+        self.conn.exec_driver_sql(sql)
+
+
+class Migrator:
+    """Apply ``migrations`` to ``engine`` for the tables of ``metadata``.
+
+    ``lock`` is a callable returning a lock with ``acquire``/``release``
+    (created only when there is something to apply); processes that find it
+    taken wait up to ``wait`` seconds for the holder to finish.
+    """
+
+    def __init__(self, engine, metadata, migrations=None, lock=None, wait=300.0):
+        self.engine = engine
+        self.metadata = metadata
+        self.migrations = MIGRATIONS if migrations is None else sorted(migrations, key=lambda m: m.version)
+        self.lock = lock
+        self.wait = float(wait)
+
+    @property
+    def head(self):
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current(self):
+        """Newest applied version (0 for a database without migrations)."""
+        with self.engine.connect() as conn:
+            try:
+                return conn.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+            except (OperationalError, ProgrammingError):
+                # no schema_migrations table yet
+                return 0
+
+    def applied(self):
+        with self.engine.connect() as conn:
+            if not inspect(conn).has_table(schema_migrations.name):
+                return set()
+            return set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    def pending(self):
+        if self.current() >= self.head:
+            return []
+        done = self.applied()
+        return [m for m in self.migrations if m.version not in done]
+
+    def upgrade(self):
+        """Apply pending migrations; returns the versions applied by this call."""
+        if not self.pending():
+            return []
+        lock = self.lock() if self.lock is not None else None
+        if lock is not None:
+            deadline = time.monotonic() + self.wait
+            while not lock.acquire():
+                if time.monotonic() > deadline:
+                    raise RuntimeError("timed out waiting for another process to finish migrating")
+                time.sleep(0.5)
+        try:
+            # another process may have applied them while we waited
+            pending = self.pending()
+            schema_migrations.create(self.engine, checkfirst=True)
+            for m in pending:
+                self._apply(m)
+            return [m.version for m in pending]
+        finally:
+            if lock is not None:
+                lock.release()
+
+    def _apply(self, m):
+        started = time.monotonic()
+        if m.transactional:
+            with self.engine.begin() as conn:
+                m.upgrade(MigrationContext(conn, self.metadata))
+                self._record(conn, m)
+        else:
+            with self.engine.connect() as conn:
+                conn = conn.execution_options(isolation_level="AUTOCOMMIT")
+                m.upgrade(MigrationContext(conn, self.metadata, transactional=False))
+                self._record(conn, m)
+        print(f"Applied migration {m.version} ({m.name}) in {time.monotonic() - started:.2f}s")
+
+    @staticmethod
+    def _record(conn, m):
+        conn.execute(insert(schema_migrations).values(
+            version=m.version, name=m.name, applied_at=datetime.now(timezone.utc)))
+
+
+# -- application migrations ------------------------------------------------
+
+@migration(1)
+def create_tables(ctx):
+    # fresh databases get every table, with its indexes, from the models
+    ctx.create_tables()
+
+
+@migration(2)
+def event_columns(ctx):
+    ctx.add_column("events", "featured", default=false())
+    if ctx.add_column("events", "city_key"):
+        ctx.execute("UPDATE events SET city_key = lower(trim(city)) WHERE city IS NOT NULL")
+    ctx.add_column("events", "start_at")
+    ctx.add_column("events", "end_at")
+    ctx.add_column("events", "content_hash")
+
+
+@migration(3)
+def ticket_request_columns(ctx):
+    ctx.add_column("ticket_requests", "confirmed", default=false())
+    for name in ("confirm_token", "confirm_sent_at", "confirmed_at", "ip_address", "user_agent"):
+        ctx.add_column("ticket_requests", name)
+
+
+@migration(4, transactional=False)
+def event_and_ticket_indexes(ctx):
+    # superseded by ix_events_city_active_start_at
+    ctx.drop_index("ix_events_city_active_start")
+    for name in ("ix_events_original_url", "ix_events_city_active_start_at", "ix_events_start_at", "ix_events_source"):
+        ctx.create_index("events", name)
+    for name in ("ix_ticket_requests_event_id", "ix_ticket_requests_created_at_id", "ix_ticket_requests_confirm_token"):
+        ctx.create_index("ticket_requests", name)
+
+
+@migration(5)
+def outbound_emails_table(ctx):
+    outbound_emails.create(ctx.conn, checkfirst=True)
+
+
+@migration(6, transactional=False)
+def event_search_index(ctx):
+    search.create_index(ctx)
+
+
+@migration(7)
+def event_cluster_column(ctx):
+    # filled in for each day an ingest or edit changes; until then every row is its own cluster
+    ctx.add_column("events", "cluster_id")
+
+
+@migration(8)
+def event_search_rank(ctx):
+    search.set_rank(ctx)
@@ -0,0 +1,131 @@
+"""
+Cached, time-bounded MX lookups for email domains.
+
+Ticket requests report whether the email domain accepts mail. Looking that
+up inline ties a web worker to the resolver for as long as DNS takes, which
+is seconds when a server is slow or down. ``MXCache`` instead:
+
+* answers known mail providers and recently seen domains from memory
+  (positive results are kept for ``positive_ttl``, domains without MX
+  records for ``negative_ttl`` and failed lookups briefly for ``error_ttl``);
+* runs lookups on a small thread pool with a resolver ``lifetime`` bound,
+  sharing one lookup between concurrent requests for the same domain;
+* lets the caller start the lookup early and wait only a bounded time for
+  it; a lookup that has not finished by then answers "unknown" (``None``)
+  and still fills the cache for the next request.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+
+try:
+    import dns.resolver
+except Exception:
+    dns = None
+
+# big providers: accept mail, never worth a lookup
+KNOWN_MAIL_DOMAINS = frozenset([
+    "gmail.com", "googlemail.com", "outlook.com", "hotmail.com", "live.com", "msn.com", "yahoo.com",
+    "yahoo.com.au", "ymail.com", "icloud.com", "me.com", "mac.com", "aol.com", "protonmail.com", "proton.me",
+    "gmx.com", "gmx.net", "mail.com", "zoho.com", "fastmail.com", "bigpond.com", "bigpond.net.au",
+    "optusnet.com.au", "outlook.com.au", "hotmail.com.au", "live.com.au",
+])
+
+
+def dns_resolver(timeout=2.0):
+    """``resolve(domain) -> bool`` using dnspython, or None without it.
+
+    A domain that does not exist or has no MX records is False; timeouts and
+    server failures raise, so they are not mistaken for a bad domain.
+    """
+    if dns is None:
+        return None
+    local = threading.local()
+
+    def resolve(domain):
+        resolver = getattr(local, "resolver", None)
+        if resolver is None:
+            resolver = local.resolver = dns.resolver.Resolver()
+            resolver.lifetime = timeout
+        try:
+            return len(resolver.resolve(domain, "MX")) > 0
+        except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+            return False
+    return resolve
+
+
+class MXCache:
+    def __init__(self, resolve=None, positive_ttl=86400.0, negative_ttl=3600.0, error_ttl=60.0,
+                 max_entries=10000, workers=4, known=KNOWN_MAIL_DOMAINS):
+        self.resolve = resolve
+        self.positive_ttl = float(positive_ttl)
+        self.negative_ttl = float(negative_ttl)
+        self.error_ttl = float(error_ttl)
+        self.max_entries = max(1, int(max_entries))
+        self.known = frozenset(d.lower() for d in known)
+        self._entries = OrderedDict()  # domain -> (result, expires)
+        self._inflight = {}  # domain -> Future
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix="mx")
+        self.hits = 0
+        self.lookups = 0
+
+    def cached(self, domain):
+        """``(found, result)`` from the cache without looking anything up."""
+        domain = domain.strip().lower()
+        if domain in self.known:
+            return True, True
+        with self._lock:
+            entry = self._entries.get(domain)
+            if entry is None:
+                return False, None
+            result, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[domain]
+                return False, None
+            self._entries.move_to_end(domain)
+            return True, result
+
+    def lookup(self, domain):
+        """A Future for ``domain``'s result: True, False or None (unknown)."""
+        domain = domain.strip().lower()
+        found, result = self.cached(domain)
+        if found or self.resolve is None:
+            if found:
+                self.hits += 1
+            fut = Future()
+            fut.set_result(result)
+            return fut
+        with self._lock:
+            fut = self._inflight.get(domain)
+            if fut is None:
+                self.lookups += 1
+                fut = self._inflight[domain] = self._pool.submit(self._resolve, domain)
+        return fut
+
+    def _resolve(self, domain):
+        try:
+            result = bool(self.resolve(domain))
+            ttl = self.positive_ttl if result else self.negative_ttl
+        except Exception as e:
+            print(f"MX lookup for {domain} failed: {e}")
+            result, ttl = None, self.error_ttl
+        with self._lock:
+            self._entries[domain] = (result, time.monotonic() + ttl)
+            self._entries.move_to_end(domain)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(domain, None)
+        return result
+
+    @staticmethod
+    def result(fut, timeout):
+        """``fut``'s result if it is ready within ``timeout`` seconds, else None."""
+        try:
+            return fut.result(timeout=timeout)
+        except TimeoutError:
+            return None
+
+    def check(self, domain, timeout):
+        return self.result(self.lookup(domain), timeout)
@@ -4,6 +4,7 @@ from .eventfinda import scrape_eventfinda
 from .skiddle import scrape_skiddle
 from .sydney_com import scrape_sydney_com
 from .cityofsydney import scrape_cityofsydney
+from .registry import registry, SourceSpec
 
 __all__ = [
 	"scrape_allevents",
@@ -11,4 +12,6 @@ __all__ = [
 	"scrape_skiddle",
 	"scrape_sydney_com",
 	"scrape_cityofsydney",
+	"registry",
+	"SourceSpec",
 ]
@@ -0,0 +1,184 @@
+"""
+Parse the free-text event dates scraped from listing pages into UTC datetimes.
+
+Sources print dates in many shapes ("Sat 20 Feb 2026, 7:30pm", "Feb 20 - 22",
+"2026-02-20T19:00:00+11:00", "20/02/2026", "Tonight 8pm"...). The parser
+pulls out day, month, year and time tokens instead of trying a fixed list of
+formats, and treats a date without an offset as local time in the event's
+city. Results are memoized because the same strings repeat on every run.
+"""
+import re
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+DEFAULT_TIMEZONE = "Australia/Sydney"
+
+CITY_TIMEZONES = {
+    "sydney": "Australia/Sydney",
+    "melbourne": "Australia/Melbourne",
+    "canberra": "Australia/Sydney",
+    "brisbane": "Australia/Brisbane",
+    "gold coast": "Australia/Brisbane",
+    "adelaide": "Australia/Adelaide",
+    "perth": "Australia/Perth",
+    "hobart": "Australia/Hobart",
+    "darwin": "Australia/Darwin",
+    "auckland": "Pacific/Auckland",
+    "wellington": "Pacific/Auckland",
+    "london": "Europe/London",
+}
+
+MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+_ORDINAL_RE = re.compile(r"\b(\d{1,2})(st|nd|rd|th)\b")
+_DASH_RE = re.compile(r"\s*(?:[–—]|\s-\s|\bto\b|\buntil\b)\s*")
+_ISO_RE = re.compile(r"^\d{4}-\d{2}-\d{2}([ t]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?(z|[+-]\d{2}:?\d{2})?$")
+_NUMERIC_DATE_RE = re.compile(r"\b(\d{1,2})[/.](\d{1,2})[/.](\d{2,4})\b")
+_MONTH_RE = re.compile(r"\b(jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+                       r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)\b")
+_YEAR_RE = re.compile(r"\b(20\d{2})\b")
+_TIME_12_RE = re.compile(r"\b(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)\b")
+_TIME_24_RE = re.compile(r"\b([01]?\d|2[0-3]):([0-5]\d)\b")
+_DAY_RE = re.compile(r"\b(\d{1,2})\b")
+_RELATIVE = {"today": 0, "tonight": 0, "tomorrow": 1}
+
+
+def timezone_for_city(city):
+    return CITY_TIMEZONES.get((city or "").strip().lower(), DEFAULT_TIMEZONE)
+
+
+def _tokens(text):
+    """Extract {day, month, year, hour, minute, offset} from one side of a range."""
+    out = {}
+    for word, delta in _RELATIVE.items():
+        if re.search(rf"\b{word}\b", text):
+            out["offset"] = delta
+    m = _NUMERIC_DATE_RE.search(text)
+    if m:
+        # listings in this project are Australian/NZ: day first
+        year = int(m.group(3))
+        out.update(day=int(m.group(1)), month=int(m.group(2)), year=year + 2000 if year < 100 else year)
+        text = text[:m.start()] + " " + text[m.end():]
+    m = _TIME_12_RE.search(text)
+    if m:
+        hour = int(m.group(1)) % 12 + (12 if m.group(3) == "pm" else 0)
+        out.update(hour=hour, minute=int(m.group(2) or 0))
+        text = text[:m.start()] + " " + text[m.end():]
+    else:
+        m = _TIME_24_RE.search(text)
+        if m:
+            out.update(hour=int(m.group(1)), minute=int(m.group(2)))
+            text = text[:m.start()] + " " + text[m.end():]
+    m = _MONTH_RE.search(text)
+    if m:
+        out["month"] = MONTHS[m.group(1)[:3]]
+    m = _YEAR_RE.search(text)
+    if m:
+        out["year"] = int(m.group(1))
+        text = text[:m.start()] + " " + text[m.end():]
+    if "day" not in out:
+        m = _DAY_RE.search(text)
+        if m and 1 <= int(m.group(1)) <= 31:
+            out["day"] = int(m.group(1))
+    return out
+
+
+def _resolve(tok, today, tzname):
+    if "offset" in tok and "day" not in tok:
+        d = today + timedelta(days=tok["offset"])
+    else:
+        if "day" not in tok or "month" not in tok:
+            return None
+        year = tok.get("year")
+        if year is None:
+            # listings omit the year for upcoming dates; pick the next
+            # occurrence, allowing for events that started recently
+            year = today.year
+            try:
+                if date(year, tok["month"], tok["day"]) < today - timedelta(days=60):
+                    year += 1
+            except ValueError:
+                return None
+        try:
+            d = date(year, tok["month"], tok["day"])
+        except ValueError:
+            return None
+    local = datetime.combine(d, time(tok.get("hour", 0), tok.get("minute", 0)), tzinfo=ZoneInfo(tzname))
+    return local.astimezone(timezone.utc)
+
+
+def _parse_iso(text, tzname):
+    try:
+        dt = datetime.fromisoformat(text.upper().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=ZoneInfo(tzname))
+    return dt.astimezone(timezone.utc)
+
+
+@lru_cache(maxsize=8192)
+def _parse_cached(text, tzname, today):
+    cleaned = _ORDINAL_RE.sub(r"\1", text.strip().lower())
+    if not cleaned:
+        return None, None
+    if _ISO_RE.match(cleaned):
+        return _parse_iso(cleaned, tzname), None
+
+    parts = [p for p in _DASH_RE.split(cleaned, maxsplit=1) if p.strip()]
+    if len(parts) == 2 and all(_ISO_RE.match(p.strip()) for p in parts):
+        return _parse_iso(parts[0].strip(), tzname), _parse_iso(parts[1].strip(), tzname)
+    first = _tokens(parts[0])
+    second = _tokens(parts[1]) if len(parts) > 1 else {}
+    if second:
+        # "20 - 22 Feb 2026", "Feb 20 - 22, 2026", "7pm - 10pm": each side
+        # borrows what it is missing from the other
+        for k in ("month", "year"):
+            if k not in first and k in second:
+                first[k] = second[k]
+        for k in ("day", "month", "year", "offset"):
+            if k not in second and k in first:
+                second[k] = first[k]
+    start = _resolve(first, today, tzname)
+    end = _resolve(second, today, tzname) if second else None
+    if start and end and end < start:
+        end = None
+    return start, end
+
+
+def parse_event_times(text, attr=None, tz=DEFAULT_TIMEZONE, today=None):
+    """Return ``(start, end)`` as aware UTC datetimes (either may be None).
+
+    ``attr`` is the machine-readable ``datetime`` attribute of a ``<time>``
+    element when the page has one; it wins over the display text.
+    """
+    today = today or datetime.now(ZoneInfo(tz)).date()
+    if attr:
+        start, end = _parse_cached(str(attr), tz, today)
+        if start:
+            if end is None and text:
+                end = _parse_cached(str(text), tz, today)[1]
+            return start, end
+    if not text:
+        return None, None
+    return _parse_cached(str(text), tz, today)
+
+
+def parse_datetime(text, tz=DEFAULT_TIMEZONE):
+    """Parse a single date/time (e.g. a query argument) to an aware UTC datetime."""
+    return parse_event_times(text, tz=tz)[0]
+
+
+def annotate_event_times(item):
+    """Normalization stage: add ``start_at``/``end_at`` to a scraped item."""
+    tz = timezone_for_city(item.get("city"))
+    start, end = parse_event_times(item.get("start_time"), item.get("start_datetime"), tz=tz)
+    if item.get("end_time"):
+        end = parse_event_times(item.get("end_time"), item.get("end_datetime"), tz=tz)[0] or end
+    item["start_at"] = start
+    item["end_at"] = end
+    return item
@@ -2,49 +2,32 @@
 Simple scraper for eventfinda.com.au search results for Sydney.
 Very lightweight; adapt selectors if site changes.
 """
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-from .session import create_session, allowed_by_robots
+from .registry import registry, SourceSpec
 
 BASE = "https://www.eventfinda.com.au"
+SPEC = registry.register(SourceSpec(
+    name="eventfinda",
+    source="Eventfinda",
+    base=BASE,
+    url="{base}/search?q={city}",
+    items=".ef-event, .searchResult, .card",
+    title=".ef-title, .title",
+    fields={
+        "start_time": ".ef-date, .date",
+        "start_datetime": {"selector": ".ef-date, .date", "attr": "datetime"},
+        "venue": ".ef-venue, .venue",
+        "description": ".ef-desc, .excerpt",
+        "image_url": {"selector": "img", "attr": "src"},
+    },
+))
+# only card containers (and pagination) are built into the tree
+CARDS = SPEC.strainer
+
+
+def parse_listing(soup, page_url, city="Sydney"):
+    """Events on one listing page."""
+    return registry.get("eventfinda").parse_listing(soup, page_url, city)
 
 
 def scrape_eventfinda(city="Sydney"):
-    results = []
-    try:
-        url = f"{BASE}/search?q={city}"
-        if not allowed_by_robots(url):
-            print(f"Skipping eventfinda due to robots.txt: {url}")
-            return results
-        s = create_session()
-        resp = s.get(url, timeout=10)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        cards = soup.select(".ef-event, .searchResult, .card")
-        for c in cards[:80]:
-            a = c.find("a", href=True)
-            if not a:
-                continue
-            link = urljoin(BASE, a["href"])
-            title_el = c.select_one(".ef-title, .title")
-            title = title_el.get_text(strip=True) if title_el else a.get_text(strip=True)
-            time_el = c.select_one(".ef-date, .date")
-            venue_el = c.select_one(".ef-venue, .venue")
-            img = c.find("img")
-            image_url = img.get("src") if img and img.has_attr("src") else None
-            desc = c.select_one(".ef-desc, .excerpt")
-            results.append({
-                "title": title,
-                "start_time": time_el.get_text(strip=True) if time_el else None,
-                "venue": venue_el.get_text(strip=True) if venue_el else None,
-                "address": None,
-                "city": city,
-                "description": desc.get_text(strip=True) if desc else None,
-                "category": None,
-                "image_url": image_url,
-                "source": "Eventfinda",
-                "original_url": link,
-            })
-    except Exception as e:
-        print(f"eventfinda scraper error: {e}")
-    return results
+    return registry.get("eventfinda").scrape(city)
@@ -0,0 +1,161 @@
+"""
+Shared extraction engine for listing pages.
+
+Sources describe what to read declaratively (see ``registry.SourceSpec``);
+``ListingExtractor`` turns that description into compiled soupsieve patterns
+once and reuses them for every page, card and field. Selectors shared between
+fields (e.g. a date element read for both its text and its ``datetime``
+attribute) are looked up once per card.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+from urllib.parse import urljoin
+
+import soupsieve
+
+# item keys every source produces (missing fields are None)
+ITEM_FIELDS = (
+    "title", "start_time", "start_datetime", "venue", "address",
+    "description", "category", "image_url",
+)
+MODES = ("cards", "anchors")
+
+_SIMPLE_CLASS_RE = re.compile(r"^\.([\w-]+)$")
+_MISSING = object()
+
+
+@lru_cache(maxsize=None)
+def compile_selector(selector):
+    """Compiled soupsieve pattern, shared by every source using ``selector``."""
+    return soupsieve.compile(selector)
+
+
+def simple_classes(selector):
+    """``{"a", "b"}`` for a selector like ``.a, .b``; None for anything richer."""
+    classes = set()
+    for part in selector.split(","):
+        m = _SIMPLE_CLASS_RE.match(part.strip())
+        if not m:
+            return None
+        classes.add(m.group(1))
+    return classes
+
+
+@dataclass(frozen=True)
+class Field:
+    """Where a field lives: the first element matching ``selector``.
+
+    The value is the element's stripped text, or with ``attrs`` the first
+    non-empty attribute among them.
+    """
+    selector: str
+    attrs: Tuple[str, ...] = ()
+
+    @classmethod
+    def coerce(cls, value):
+        # ".venue" | {"selector": "img", "attr": ["data-src", "src"]} | Field
+        if isinstance(value, Field):
+            return value
+        if isinstance(value, str):
+            return cls(value)
+        attrs = value.get("attr") or value.get("attrs") or ()
+        if isinstance(attrs, str):
+            attrs = (attrs,)
+        return cls(value["selector"], tuple(attrs))
+
+
+class ListingExtractor:
+    """Extract event items from a parsed listing page.
+
+    ``cards`` mode selects one container per event (``items``) and reads the
+    first link and the fields inside it. ``anchors`` mode selects event links
+    directly and reads fields from the closest ancestor (at most
+    ``parent_depth`` levels up) containing ``parent_marker``.
+    """
+
+    def __init__(self, source: str, base: str, items: str, mode: str = "cards", link: str = "a[href]",
+                 title: Optional[str] = None, fields: Optional[Dict[str, object]] = None, limit: int = 80,
+                 parent_depth: int = 3, parent_marker: Optional[str] = None):
+        if mode not in MODES:
+            raise ValueError(f"unknown extraction mode {mode!r} for {source}")
+        self.source = source
+        self.base = base
+        self.mode = mode
+        self.limit = limit
+        self.parent_depth = parent_depth
+        self.fields = {name: Field.coerce(f) for name, f in (fields or {}).items()}
+        unknown = set(self.fields) - set(ITEM_FIELDS[1:])
+        if unknown:
+            raise ValueError(f"unknown fields for {source}: {', '.join(sorted(unknown))}")
+        self._items = compile_selector(items)
+        self._link = compile_selector(link)
+        self._title = compile_selector(title) if title else None
+        self._marker = compile_selector(parent_marker) if parent_marker else None
+        self._field_patterns = {f.selector: compile_selector(f.selector) for f in self.fields.values()}
+
+    def extract(self, soup, page_url, city):
+        if self.mode == "cards":
+            return list(self._cards(soup, city))
+        return list(self._anchors(soup, city))
+
+    def _cards(self, soup, city):
+        for card in self._items.select(soup, limit=self.limit):
+            a = self._link.select_one(card)
+            if a is None:
+                continue
+            title_el = self._title.select_one(card) if self._title else None
+            title = title_el.get_text(strip=True) if title_el else a.get_text(strip=True)
+            yield self._item(card, urljoin(self.base, a["href"]), title, city)
+
+    def _anchors(self, soup, city):
+        seen = set()
+        for a in self._items.select(soup, limit=self.limit):
+            href = a.get("href")
+            if not href:
+                continue
+            link = urljoin(self.base, href)
+            if link in seen:
+                continue
+            seen.add(link)
+            title = (a.get_text(strip=True) or a.get("title") or "").strip()
+            if not title and self._title:
+                title_el = self._title.select_one(a)
+                title = title_el.get_text(strip=True) if title_el else ""
+            yield self._item(self._scope(a), link, title or None, city)
+
+    def _scope(self, a):
+        parent = a
+        for _ in range(self.parent_depth):
+            if parent is None:
+                break
+            if self._marker is None or self._marker.select_one(parent):
+                break
+            parent = parent.parent
+        return parent
+
+    def _item(self, scope, link, title, city):
+        found = {}
+        item = {"title": title}
+        for name in ITEM_FIELDS[1:]:
+            field = self.fields.get(name)
+            item[name] = self._value(scope, field, found) if field and scope is not None else None
+        item["city"] = city
+        item["source"] = self.source
+        item["original_url"] = link
+        return item
+
+    def _value(self, scope, field, found):
+        el = found.get(field.selector, _MISSING)
+        if el is _MISSING:
+            el = found[field.selector] = self._field_patterns[field.selector].select_one(scope)
+        if el is None:
+            return None
+        if not field.attrs:
+            return el.get_text(strip=True)
+        for attr in field.attrs:
+            value = el.get(attr)
+            if value:
+                return value
+        return None
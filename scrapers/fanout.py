@@ -0,0 +1,299 @@
+"""
+City fan-out scheduler.
+
+Expands the enabled sources over a list of cities into ``(source, city)``
+jobs and runs them on one worker pool under a global worker limit and a
+per-host concurrency limit. Job starts are spread evenly over ``spread``
+seconds, so a run with dozens of cities loads the database and the target
+sites steadily instead of in one burst per interval. Jobs are ordered city by
+city (consecutive starts hit different hosts) and every city is handed to
+``on_city`` as soon as its last job finishes, on its own thread, so ingestion
+is staggered too and never delays the next job starts.
+"""
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from .registry import SourceSpec
+from .session import NotModified
+
+
+@dataclass
+class SourceStats:
+    name: str
+    status: str = "pending"  # pending, running, ok, unchanged, failed, timeout
+    items: int = 0
+    duration: float = 0.0
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "status": self.status,
+            "items": self.items,
+            "duration": round(self.duration, 3),
+            "error": self.error,
+        }
+
+
+@dataclass
+class FanoutJob:
+    spec: SourceSpec
+    city: str
+    offset: float = 0.0  # seconds after the run starts
+
+    @property
+    def name(self):
+        return f"{self.spec.job_name}:{self.city}"
+
+    @property
+    def host(self):
+        return urlparse(self.spec.listing_url(self.city)).netloc
+
+
+@dataclass
+class CityRun:
+    city: str
+    jobs: int = 0
+    items: List[dict] = field(default_factory=list)
+    stats: Dict[str, SourceStats] = field(default_factory=dict)
+    unchanged: List[NotModified] = field(default_factory=list)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    counts: Optional[dict] = None  # whatever ``on_city`` returned, e.g. ingest counts
+
+    @property
+    def duration(self):
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    @property
+    def throughput(self):
+        """Items per second from the city's first job start to its last job end."""
+        return len(self.items) / self.duration if self.duration > 0 else 0.0
+
+    @property
+    def sources(self):
+        return {i.get("source") for i in self.items} | {e.source for e in self.unchanged}
+
+    def to_dict(self):
+        return {
+            "city": self.city,
+            "jobs": self.jobs,
+            "items": len(self.items),
+            "duration": round(self.duration, 3),
+            "items_per_second": round(self.throughput, 2),
+            "counts": self.counts,
+            "error": self.error,
+            "sources": [s.to_dict() for s in self.stats.values()],
+        }
+
+
+@dataclass
+class FanoutResult:
+    cities: Dict[str, CityRun] = field(default_factory=dict)
+    duration: float = 0.0
+
+    @property
+    def items(self):
+        return [i for run in self.cities.values() for i in run.items]
+
+    def to_dict(self):
+        return {
+            "items": sum(len(run.items) for run in self.cities.values()),
+            "duration": round(self.duration, 3),
+            "cities": [run.to_dict() for run in self.cities.values()],
+        }
+
+
+class CityFanout:
+    """Run every enabled source of ``registry`` for many cities.
+
+    ``max_workers`` bounds concurrent jobs overall and ``concurrency`` bounds
+    concurrent jobs against one host (``limits`` overrides it per source job
+    name, e.g. ``scrape_skiddle``). ``deadline``/``deadlines`` bound each job
+    from the moment its thread starts it (per source job name); a job past its
+    deadline is reported as ``timeout`` and its late result is discarded, but
+    it keeps counting against its host and ``max_workers`` until it returns.
+    """
+
+    def __init__(self, registry, max_workers: int = 8, concurrency: int = 1, limits: Optional[Dict[str, int]] = None,
+                 deadline: float = 60.0, deadlines: Optional[Dict[str, float]] = None, spread: float = 0.0):
+        self.registry = registry
+        self.max_workers = max(1, int(max_workers))
+        self.concurrency = max(1, int(concurrency))
+        self.limits = dict(limits or {})
+        self.deadline = float(deadline)
+        self.deadlines = dict(deadlines or {})
+        self.spread = float(spread)
+
+    def host_limit(self, job: FanoutJob) -> int:
+        return max(1, int(self.limits.get(job.spec.job_name, self.concurrency)))
+
+    def deadline_for(self, job: FanoutJob) -> float:
+        return float(self.deadlines.get(job.spec.job_name, self.deadline))
+
+    def plan(self, cities, spread: Optional[float] = None) -> List[FanoutJob]:
+        """Jobs in start order, with start offsets spread evenly over ``spread`` seconds."""
+        spread = self.spread if spread is None else float(spread)
+        specs = self.registry.enabled()
+        jobs = [FanoutJob(spec, city) for city in dict.fromkeys(cities) for spec in specs if spec.serves(city)]
+        for i, job in enumerate(jobs):
+            job.offset = spread * i / len(jobs)
+        return jobs
+
+    def run(self, cities, on_city: Optional[Callable[[CityRun], object]] = None,
+            spread: Optional[float] = None,
+            on_progress: Optional[Callable[[FanoutResult], None]] = None) -> FanoutResult:
+        """Run all jobs for ``cities``.
+
+        ``on_city(run)`` is called once per city when its last job is done
+        (its return value is kept as ``run.counts``), on a separate thread so
+        ingesting one city does not hold up dispatch for the others; cities
+        are processed one at a time and ``run`` returns once all of them are.
+        ``on_progress(result)`` is called whenever jobs have started or
+        finished.
+        """
+        jobs = self.plan(cities, spread)
+        result = FanoutResult(cities={city: CityRun(city) for city in dict.fromkeys(cities)})
+        remaining = Counter(job.city for job in jobs)
+        for job in jobs:
+            run = result.cities[job.city]
+            run.jobs += 1
+            run.stats[job.spec.job_name] = SourceStats(name=job.spec.job_name)
+        started = time.monotonic()
+        if not jobs:
+            return result
+
+        queue = deque(jobs)
+        busy_hosts = defaultdict(int)
+        running = {}  # future -> (job, stats)
+        # timed-out jobs whose thread is still fetching: they keep their host
+        # slot and pool thread until they really finish
+        stragglers = {}  # future -> job
+        pool = ThreadPoolExecutor(max_workers=min(self.max_workers, len(jobs)), thread_name_prefix="fanout")
+        city_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fanout-city")
+        processing = []
+
+        def process_city(run):
+            try:
+                run.counts = on_city(run)
+            except Exception as e:
+                run.error = str(e)
+                print(f"Processing results for {run.city} failed: {e}")
+
+        def city_done(job):
+            remaining[job.city] -= 1
+            run = result.cities[job.city]
+            if remaining[job.city] == 0:
+                run.finished_at = time.monotonic()
+                if on_city is not None:
+                    processing.append(city_pool.submit(process_city, run))
+
+        def progress():
+            if on_progress is not None:
+                try:
+                    on_progress(result)
+                except Exception as e:
+                    print(f"Progress callback failed: {e}")
+
+        try:
+            while queue or running:
+                now = time.monotonic()
+                dispatched = False
+                # start every due job whose host has a free slot; a busy host
+                # does not hold up jobs for other hosts queued behind it
+                for job in list(queue):
+                    if len(running) + len(stragglers) >= self.max_workers or started + job.offset > now:
+                        break
+                    if busy_hosts[job.host] >= self.host_limit(job):
+                        continue
+                    queue.remove(job)
+                    busy_hosts[job.host] += 1
+                    run = result.cities[job.city]
+                    run.started_at = run.started_at or now
+                    stats = run.stats[job.spec.job_name]
+                    stats.status = "running"
+                    running[pool.submit(self._invoke, job, stats)] = (job, stats)
+                    dispatched = True
+                if dispatched:
+                    progress()
+
+                # a job's deadline runs from when its thread started it; one
+                # not started yet is looked at again a deadline from now
+                wake = [(stats.started_at or now) + self.deadline_for(job) for job, stats in running.values()]
+                not_due = [started + job.offset for job in queue if started + job.offset > now]
+                if not_due:
+                    wake.append(not_due[0])
+                timeout = max(0.0, min(wake) - now) if wake else None
+                if running or stragglers:
+                    done, _ = wait([*running, *stragglers], timeout=timeout, return_when=FIRST_COMPLETED)
+                else:
+                    done = ()
+                    time.sleep(timeout or 0.0)
+                finished = False
+                for fut in done:
+                    if fut in stragglers:
+                        # late result of a timed-out job: discarded, slot freed
+                        busy_hosts[stragglers.pop(fut).host] -= 1
+                        continue
+                    job, stats = running.pop(fut)
+                    busy_hosts[job.host] -= 1
+                    self._collect(fut, job, stats, result.cities[job.city])
+                    city_done(job)
+                    finished = True
+                now = time.monotonic()
+                for fut, (job, stats) in list(running.items()):
+                    if stats.started_at is None or stats.started_at + self.deadline_for(job) > now:
+                        continue
+                    del running[fut]
+                    stragglers[fut] = job
+                    stats.status = "timeout"
+                    stats.duration = now - stats.started_at
+                    stats.error = f"exceeded deadline of {self.deadline_for(job)}s"
+                    print(f"Scraper {job.name} timed out after {stats.duration:.1f}s")
+                    city_done(job)
+                    finished = True
+                if finished:
+                    progress()
+            for fut in processing:
+                fut.result()
+        finally:
+            # never block on stragglers; their late results are discarded
+            pool.shutdown(wait=False, cancel_futures=True)
+            city_pool.shutdown(wait=True)
+        result.duration = time.monotonic() - started
+        if processing:
+            progress()
+        return result
+
+    def _invoke(self, job: FanoutJob, stats: SourceStats):
+        stats.started_at = time.monotonic()
+        try:
+            return job.spec.scrape(job.city) or []
+        finally:
+            stats.finished_at = time.monotonic()
+
+    def _collect(self, fut, job: FanoutJob, stats: SourceStats, run: CityRun):
+        stats.duration = (stats.finished_at or time.monotonic()) - (stats.started_at or time.monotonic())
+        try:
+            items = fut.result()
+        except NotModified as e:
+            stats.status = "unchanged"
+            run.unchanged.append(e)
+            return
+        except Exception as e:
+            stats.status = "failed"
+            stats.error = str(e)
+            print(f"Scraper {job.name} failed: {e}")
+            return
+        stats.status = "ok"
+        stats.items = len(items)
+        run.items.extend(items)
@@ -0,0 +1,439 @@
+"""
+Bounded crawl frontier used by the scrapers to follow listing pagination and
+event detail pages.
+
+The frontier is a deduplicating URL queue drained by a few worker threads.
+Requests to the same host are spaced by a politeness delay (the larger of the
+configured delay and the host's robots.txt Crawl-delay), and a crawl stops
+growing once its page, depth or time budget is spent. Every listing page is
+fetched conditionally: an unchanged page contributes the items and next-page
+link parsed from it last time, so later pages are still checked. Detail pages
+are only fetched when an event's listing data changed since the last crawl;
+otherwise the detail fields extracted last time are reused from the state
+database.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import urljoin, urlparse
+
+from .parsing import make_soup, DETAIL_STRAINER
+from .session import (
+    get_session, allowed_by_robots, conditional_get, robots_cache, state_db, NotModified, StateDB,
+)
+
+NEXT_PAGE_SELECTOR = (
+    "a[rel~=next], link[rel~=next], .pagination a.next, .pagination .next a, "
+    "a.next, li.next a, a[aria-label*='Next'], a[aria-label*='next']"
+)
+
+# fields copied from a detail page only when the listing did not provide them
+DETAIL_FIELDS = ("address", "category", "description", "start_datetime", "end_datetime", "image_url", "venue")
+# listing fields whose change triggers a detail refetch
+LISTING_FINGERPRINT_FIELDS = ("title", "start_time", "venue", "description", "image_url")
+
+
+@dataclass
+class CrawlTask:
+    url: str
+    handler: Callable
+    depth: int = 0
+    data: Optional[dict] = None
+    fetch: Optional[Callable] = None  # overrides the frontier's fetch for this URL
+
+
+@dataclass
+class CrawlStats:
+    fetched: int = 0
+    failed: int = 0
+    duplicates: int = 0
+    over_budget: int = 0
+    detail_cache_hits: int = 0
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+
+class CrawlFrontier:
+    """Deduplicating work queue with per-host politeness and crawl budgets.
+
+    ``handler(frontier, task, response)`` is called for every fetched URL and
+    may ``add()`` further URLs. Failures are counted and never stop the crawl.
+    """
+
+    def __init__(self, fetch: Callable = None, workers: int = 4, max_pages: int = 50, max_depth: int = 3,
+                 host_delay: float = 0.25, time_budget: Optional[float] = None, max_host_delay: float = 10.0):
+        self.fetch = fetch or _default_fetch
+        self.workers = max(1, int(workers))
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.host_delay = host_delay
+        self.max_host_delay = max_host_delay
+        self.time_budget = time_budget
+        self.stats = CrawlStats()
+        self._queue = deque()
+        self._seen = set()
+        self._scheduled = 0
+        self._in_flight = 0
+        self._next_slot = {}
+        self._cv = threading.Condition()
+        self._deadline = None
+
+    def mark_seen(self, url):
+        """Record a URL fetched outside the frontier (e.g. the first listing page)."""
+        with self._cv:
+            self._seen.add(url)
+            host = urlparse(url).netloc
+            self._next_slot[host] = time.monotonic() + self.host_delay
+
+    def count(self, name, n=1):
+        with self._cv:
+            setattr(self.stats, name, getattr(self.stats, name) + n)
+
+    def add(self, url, handler, depth=0, data=None, fetch=None) -> bool:
+        """Queue ``url`` unless it was seen before or a budget is exhausted."""
+        with self._cv:
+            if url in self._seen:
+                self.stats.duplicates += 1
+                return False
+            if depth > self.max_depth or self._scheduled >= self.max_pages or self._out_of_time():
+                self.stats.over_budget += 1
+                return False
+            self._seen.add(url)
+            self._scheduled += 1
+            self._queue.append(CrawlTask(url, handler, depth, data, fetch))
+            self._cv.notify()
+            return True
+
+    def _out_of_time(self):
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def _host_delay(self, url):
+        try:
+            robots_delay = robots_cache().delay(url)
+        except Exception:
+            robots_delay = 0.0
+        return min(max(self.host_delay, robots_delay), self.max_host_delay)
+
+    def _wait_for_host(self, url):
+        host = urlparse(url).netloc
+        delay = self._host_delay(url)
+        with self._cv:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _next_task(self):
+        with self._cv:
+            while True:
+                if self._queue and not self._out_of_time():
+                    self._in_flight += 1
+                    return self._queue.popleft()
+                if self._out_of_time():
+                    self.stats.over_budget += len(self._queue)
+                    self._queue.clear()
+                if not self._queue and self._in_flight == 0:
+                    self._cv.notify_all()
+                    return None
+                self._cv.wait(0.1)
+
+    def _task_done(self):
+        with self._cv:
+            self._in_flight -= 1
+            self._cv.notify_all()
+
+    def _worker(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            try:
+                self._wait_for_host(task.url)
+                if not self._out_of_time():
+                    resp = (task.fetch or self.fetch)(task.url)
+                    self.count("fetched")
+                    task.handler(self, task, resp)
+            except Exception as e:
+                self.count("failed")
+                print(f"crawl of {task.url} failed: {e}")
+            finally:
+                self._task_done()
+
+    def run(self):
+        if self.time_budget:
+            self._deadline = time.monotonic() + self.time_budget
+        threads = [threading.Thread(target=self._worker, name=f"crawl-{i}", daemon=True) for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return self.stats
+
+
+def _default_fetch(url):
+    if not allowed_by_robots(url):
+        raise PermissionError(f"disallowed by robots.txt: {url}")
+    resp = get_session(url).get(url, timeout=10)
+    resp.raise_for_status()
+    return resp
+
+
+class DetailCache:
+    """Detail-page fields per event URL, keyed by a hash of its listing data."""
+
+    def __init__(self, db: StateDB):
+        self.db = db
+        self.db.execute("CREATE TABLE IF NOT EXISTS detail_cache ("
+                        "url TEXT PRIMARY KEY, listing_hash TEXT, detail TEXT, fetched_at REAL)")
+
+    @staticmethod
+    def fingerprint(item):
+        payload = json.dumps([item.get(f) for f in LISTING_FINGERPRINT_FIELDS], default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, url, listing_hash):
+        rows = self.db.execute("SELECT listing_hash, detail FROM detail_cache WHERE url = ?", (url,))
+        if rows and rows[0][0] == listing_hash:
+            return json.loads(rows[0][1])
+        return None
+
+    def put(self, url, listing_hash, detail):
+        self.db.execute("INSERT OR REPLACE INTO detail_cache (url, listing_hash, detail, fetched_at) VALUES (?, ?, ?, ?)",
+                        (url, listing_hash, json.dumps(detail), time.time()))
+
+
+class ListingCache:
+    """Items and next-page link parsed from each listing page last time it changed."""
+
+    def __init__(self, db: StateDB):
+        self.db = db
+        self.db.execute("CREATE TABLE IF NOT EXISTS listing_cache ("
+                        "url TEXT PRIMARY KEY, items TEXT, next_url TEXT, fetched_at REAL)")
+
+    def get(self, url):
+        """``(items, next_url)`` or None."""
+        rows = self.db.execute("SELECT items, next_url FROM listing_cache WHERE url = ?", (url,))
+        if not rows:
+            return None
+        return json.loads(rows[0][0]), rows[0][1]
+
+    def put(self, url, items, next_url):
+        self.db.execute("INSERT OR REPLACE INTO listing_cache (url, items, next_url, fetched_at) VALUES (?, ?, ?, ?)",
+                        (url, json.dumps(items, default=str), next_url, time.time()))
+
+
+_detail_cache_lock = threading.Lock()
+_detail_cache = {}
+
+
+def detail_cache() -> DetailCache:
+    db = state_db()
+    with _detail_cache_lock:
+        if _detail_cache.get("db") is not db:
+            _detail_cache.update(db=db, cache=DetailCache(db))
+        return _detail_cache["cache"]
+
+
+def listing_cache() -> ListingCache:
+    db = state_db()
+    with _detail_cache_lock:
+        if _detail_cache.get("listing_db") is not db:
+            _detail_cache.update(listing_db=db, listings=ListingCache(db))
+        return _detail_cache["listings"]
+
+
+def find_next_page(soup, base_url):
+    """URL of the next listing page on the same host, if the page links one."""
+    el = soup.select_one(NEXT_PAGE_SELECTOR)
+    if not el or not el.get("href"):
+        return None
+    nxt = urljoin(base_url, el["href"])
+    if urlparse(nxt).netloc != urlparse(base_url).netloc or nxt == base_url:
+        return None
+    return nxt
+
+
+def _text(el):
+    return el.get_text(" ", strip=True) if el else None
+
+
+def _jsonld_events(soup):
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except (ValueError, TypeError):
+            continue
+        stack = data if isinstance(data, list) else [data]
+        while stack:
+            node = stack.pop()
+            if not isinstance(node, dict):
+                continue
+            if "@graph" in node:
+                stack.extend(node["@graph"] if isinstance(node["@graph"], list) else [node["@graph"]])
+            kind = node.get("@type")
+            kinds = kind if isinstance(kind, list) else [kind]
+            if any(isinstance(k, str) and k.endswith("Event") for k in kinds):
+                yield node
+
+
+def _jsonld_address(location):
+    if isinstance(location, list):
+        location = location[0] if location else None
+    if not isinstance(location, dict):
+        return None, None
+    venue = location.get("name")
+    address = location.get("address")
+    if isinstance(address, dict):
+        parts = [address.get(k) for k in ("streetAddress", "addressLocality", "addressRegion", "postalCode")]
+        address = ", ".join(p for p in parts if p)
+    return venue, address or None
+
+
+def extract_detail(soup):
+    """Pull address, category, description and times from an event page.
+
+    schema.org Event JSON-LD is preferred; common markup is the fallback.
+    """
+    out = {}
+    for node in _jsonld_events(soup):
+        venue, address = _jsonld_address(node.get("location"))
+        image = node.get("image")
+        if isinstance(image, list):
+            image = image[0] if image else None
+        if isinstance(image, dict):
+            image = image.get("url")
+        category = node.get("eventType") or node.get("genre") or node.get("keywords")
+        if isinstance(category, list):
+            category = ", ".join(str(c) for c in category)
+        out.update({k: v for k, v in {
+            "venue": venue,
+            "address": address,
+            "description": node.get("description"),
+            "start_datetime": node.get("startDate"),
+            "end_datetime": node.get("endDate"),
+            "image_url": image,
+            "category": category,
+        }.items() if v})
+        break
+    if "address" not in out:
+        address = _text(soup.select_one("[itemprop=address], address, .address, .event-address, .venue-address"))
+        if address:
+            out["address"] = address
+    if "category" not in out:
+        category = _text(soup.select_one("[itemprop=eventType], .category, .event-category, .tags a"))
+        if category:
+            out["category"] = category
+    if "description" not in out:
+        meta = soup.select_one("meta[property='og:description'], meta[name=description]")
+        desc = meta.get("content") if meta else None
+        desc = desc or _text(soup.select_one("[itemprop=description], .event-description, .description"))
+        if desc:
+            out["description"] = desc
+    return out
+
+
+def _merge_detail(item, detail):
+    for k in DETAIL_FIELDS:
+        if detail.get(k) and not item.get(k):
+            item[k] = detail[k]
+
+
+def crawl_source(url, source, city, parse_listing, details=True, frontier=None, parse_only=None):
+    """Crawl a source's listing pages (following pagination) and its detail pages.
+
+    ``parse_listing(soup, page_url, city)`` returns the items on one listing
+    page; ``parse_only`` optionally limits the listing tree to the elements it
+    reads (see ``parsing.card_strainer``). Each listing page is fetched
+    conditionally; an unchanged one is replaced by the items and next-page
+    link parsed from it last time. ``NotModified`` propagates to the caller
+    only when every listing page reached was unchanged.
+    """
+    frontier = frontier or CrawlFrontier(
+        workers=int(os.environ.get("CRAWL_WORKERS", "4")),
+        max_pages=int(os.environ.get("CRAWL_MAX_PAGES", "120")),
+        max_depth=int(os.environ.get("CRAWL_MAX_LISTING_PAGES", "5")) - 1,
+        host_delay=float(os.environ.get("CRAWL_HOST_DELAY", "0.25")),
+        time_budget=float(os.environ.get("CRAWL_TIME_BUDGET", "40")),
+    )
+    cache = detail_cache()
+    listings = listing_cache()
+    items = []
+    items_lock = threading.Lock()
+    changed_pages = []
+
+    def fetch_listing(page_url):
+        """The listing response, or ``(items, next_url)`` of an unchanged page."""
+        if page_url != url and not allowed_by_robots(page_url):
+            raise PermissionError(f"disallowed by robots.txt: {page_url}")
+        try:
+            return conditional_get(get_session(page_url), page_url, source=source, city=city)
+        except NotModified:
+            cached = listings.get(page_url)
+            if cached is not None:
+                return cached
+            # validators stored without the page's items: fetch it in full
+            resp = get_session(page_url).get(page_url, timeout=10)
+            resp.raise_for_status()
+            return resp
+
+    def on_detail(frontier, task, resp):
+        soup = make_soup(resp.text, parse_only=DETAIL_STRAINER)
+        detail = extract_detail(soup)
+        cache.put(task.url, task.data["_listing_hash"], detail)
+        _merge_detail(task.data["item"], detail)
+
+    def on_listing(frontier, task, resp):
+        if isinstance(resp, tuple):
+            page_items, nxt = resp
+        else:
+            soup = make_soup(resp.text, parse_only=parse_only)
+            page_items = parse_listing(soup, task.url, city)
+            nxt = find_next_page(soup, task.url)
+            listings.put(task.url, page_items, nxt)
+            with items_lock:
+                changed_pages.append(task.url)
+        with items_lock:
+            items.extend(page_items)
+        if nxt:
+            frontier.add(nxt, on_listing, depth=task.depth + 1, fetch=fetch_listing)
+        if not details:
+            return
+        for item in page_items:
+            link = item.get("original_url")
+            if not link:
+                continue
+            listing_hash = cache.fingerprint(item)
+            cached = cache.get(link, listing_hash)
+            if cached is not None:
+                frontier.count("detail_cache_hits")
+                _merge_detail(item, cached)
+                continue
+            # detail pages sit one level below the listing that links them
+            frontier.add(link, on_detail, depth=task.depth, data={"item": item, "_listing_hash": listing_hash})
+
+    first = fetch_listing(url)
+    frontier.mark_seen(url)
+    on_listing(frontier, CrawlTask(url, on_listing, 0), first)
+    stats = frontier.run()
+    print(f"{source} crawl: {len(items)} items, {stats.fetched + 1} pages fetched, "
+          f"{stats.detail_cache_hits} details unchanged, {stats.failed} failed, {stats.over_budget} over budget")
+    if not changed_pages and not stats.failed:
+        # every listing page is as it was: the caller keeps the stored events
+        raise NotModified(url, source, city)
+    # the same event may be linked from several listing pages
+    seen = set()
+    unique = []
+    for item in items:
+        key = item.get("original_url")
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(item)
+    return unique
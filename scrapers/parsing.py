@@ -0,0 +1,95 @@
+"""
+HTML parsing backend for the scrapers.
+
+``make_soup`` picks the fastest installed tree builder (lxml when available,
+otherwise the stdlib ``html.parser``; override with ``SCRAPER_HTML_PARSER``)
+and can restrict the tree to the elements a scraper actually reads through a
+``SoupStrainer``. Everything outside the strained elements (navigation,
+footers, inline scripts, ads) is skipped instead of being built into Python
+objects, which is where most of the parse time and memory goes.
+"""
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    HAVE_LXML = True
+except ImportError:
+    HAVE_LXML = False
+
+
+def default_parser():
+    parser = os.environ.get("SCRAPER_HTML_PARSER")
+    if parser:
+        return parser
+    return "lxml" if HAVE_LXML else "html.parser"
+
+
+def make_soup(markup, parse_only=None, parser=None):
+    return BeautifulSoup(markup, parser or default_parser(), parse_only=parse_only)
+
+
+def _unpack(name, attrs):
+    # while parsing bs4 calls strainer functions with (name, attrs); when
+    # matching an existing tree it passes the Tag alone
+    if attrs is None and hasattr(name, "attrs"):
+        return name.name, name.attrs
+    return name, attrs or {}
+
+
+def _classes(attrs):
+    value = attrs.get("class") or ""
+    if isinstance(value, (list, tuple)):
+        return set(value)
+    return set(value.split())
+
+
+def _rels(attrs):
+    value = attrs.get("rel") or ""
+    if isinstance(value, (list, tuple)):
+        value = " ".join(value)
+    return set(value.lower().split())
+
+
+# containers the frontier reads to find the next listing page
+PAGINATION_CLASSES = {"pagination", "pager", "next"}
+
+
+def card_strainer(card_classes):
+    """Keep only card containers (by class) plus pagination links.
+
+    Strained cards keep their whole subtree, so per-card selectors work
+    unchanged; ``soup.select`` of the card selector still finds them.
+    """
+    wanted = set(card_classes)
+
+    def match(name, attrs=None):
+        name, attrs = _unpack(name, attrs)
+        classes = _classes(attrs)
+        if classes & wanted or classes & PAGINATION_CLASSES:
+            return True
+        if name in ("a", "link"):
+            return "next" in _rels(attrs) or "next" in (attrs.get("aria-label") or "").lower()
+        return False
+
+    return SoupStrainer(match)
+
+
+DETAIL_CLASSES = {
+    "address", "event-address", "venue-address", "category", "event-category",
+    "tags", "event-description", "description",
+}
+
+
+def _detail_match(name, attrs=None):
+    name, attrs = _unpack(name, attrs)
+    if name == "script":
+        return (attrs.get("type") or "").lower() == "application/ld+json"
+    if name in ("meta", "address"):
+        return True
+    return "itemprop" in attrs or bool(_classes(attrs) & DETAIL_CLASSES)
+
+
+# elements read by frontier.extract_detail
+DETAIL_STRAINER = SoupStrainer(_detail_match)
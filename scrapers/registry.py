@@ -0,0 +1,156 @@
+"""
+Registry of scraper sources.
+
+Every source is a declarative ``SourceSpec`` (listing URL, selectors and
+field mapping) run by the shared ``extract.ListingExtractor`` through the
+crawl frontier. Built-in sources register themselves from their modules;
+``Registry.configure`` enables/disables, tunes or adds sources from config
+without code changes, e.g. a JSON file::
+
+    {
+      "skiddle": {"enabled": false},
+      "allevents": {"limit": 40},
+      "example": {"source": "Example", "base": "https://example.com",
+                  "url": "{base}/events/{city}", "items": ".event",
+                  "fields": {"venue": ".venue", "start_time": "time",
+                             "start_datetime": {"selector": "time", "attr": "datetime"}}}
+    }
+"""
+import dataclasses
+import json
+import threading
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import quote
+
+from .extract import ListingExtractor, simple_classes
+from .frontier import crawl_source
+from .parsing import card_strainer
+from .session import allowed_by_robots
+
+
+@dataclass
+class SourceSpec:
+    name: str  # registry key; its fan-out jobs are named ``scrape_<name>``
+    source: str  # value stored in Event.source
+    base: str
+    url: str  # listing URL template, formatted with {base} and {city}
+    items: str  # card selector (cards mode) or event link selector (anchors mode)
+    mode: str = "cards"
+    link: str = "a[href]"
+    title: Optional[str] = None
+    fields: Dict[str, Any] = field(default_factory=dict)
+    limit: int = 80
+    parent_depth: int = 3
+    parent_marker: Optional[str] = None
+    strain: bool = True  # parse only the card containers (cards mode, class selectors)
+    details: bool = True  # follow detail pages
+    enabled: bool = True
+    cities: Optional[List[str]] = None  # cities the listing covers; None means any city
+
+    def serves(self, city):
+        return self.cities is None or city.strip().lower() in {c.strip().lower() for c in self.cities}
+
+    @classmethod
+    def from_dict(cls, name, data):
+        known = {f.name for f in dataclasses.fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"unknown settings for source {name}: {', '.join(sorted(unknown))}")
+        return cls(**{**data, "name": name})
+
+    @property
+    def job_name(self):
+        return f"scrape_{self.name}"
+
+    @cached_property
+    def extractor(self):
+        return ListingExtractor(
+            self.source, self.base, self.items, mode=self.mode, link=self.link, title=self.title,
+            fields=self.fields, limit=self.limit, parent_depth=self.parent_depth,
+            parent_marker=self.parent_marker,
+        )
+
+    @cached_property
+    def strainer(self):
+        if not self.strain or self.mode != "cards":
+            return None
+        classes = simple_classes(self.items)
+        return card_strainer(classes) if classes else None
+
+    def listing_url(self, city):
+        return self.url.format(base=self.base, city=quote(city))
+
+    def parse_listing(self, soup, page_url, city="Sydney"):
+        """Events on one listing page."""
+        return self.extractor.extract(soup, page_url, city)
+
+    def scrape(self, city="Sydney"):
+        """Events of ``city``; ``NotModified`` and crawl errors propagate to the caller."""
+        url = self.listing_url(city)
+        if not allowed_by_robots(url):
+            print(f"Skipping {self.name} due to robots.txt: {url}")
+            return []
+        return crawl_source(url, self.source, city, self.parse_listing, details=self.details,
+                            parse_only=self.strainer)
+
+
+class Registry:
+    def __init__(self):
+        self._specs: Dict[str, SourceSpec] = {}
+        self._lock = threading.Lock()
+
+    def register(self, spec: SourceSpec) -> SourceSpec:
+        spec.extractor  # compile selectors up front so bad specs fail at registration
+        with self._lock:
+            self._specs[spec.name] = spec
+        return spec
+
+    def get(self, name) -> SourceSpec:
+        return self._specs[name]
+
+    def __contains__(self, name):
+        return name in self._specs
+
+    def __iter__(self):
+        return iter(list(self._specs.values()))
+
+    def enabled(self) -> List[SourceSpec]:
+        return [s for s in self if s.enabled]
+
+    def jobs(self):
+        """``(job name, callable)`` pairs of the enabled sources."""
+        return [(s.job_name, s.scrape) for s in self.enabled()]
+
+    def configure(self, enabled: Optional[Iterable[str]] = None, overrides: Optional[Dict[str, dict]] = None):
+        """Apply per-source ``overrides`` and, if given, enable only ``enabled``.
+
+        An override for a known source replaces the given settings (``fields``
+        are merged); one for an unknown name registers a new source.
+        """
+        for name, data in (overrides or {}).items():
+            if name in self:
+                spec = self.get(name)
+                data = dict(data)
+                if "fields" in data:
+                    data["fields"] = {**spec.fields, **data["fields"]}
+                self.register(dataclasses.replace(spec, **data))
+            else:
+                self.register(SourceSpec.from_dict(name, data))
+        if enabled is not None:
+            names = set(enabled)
+            missing = names - set(self._specs)
+            if missing:
+                print(f"Ignoring unknown scraper sources: {', '.join(sorted(missing))}")
+            for spec in self:
+                if spec.enabled != (spec.name in names):
+                    self.register(dataclasses.replace(spec, enabled=spec.name in names))
+
+    def load(self, path, enabled=None):
+        with open(path, encoding="utf-8") as fh:
+            overrides = json.load(fh)
+        self.configure(enabled=enabled, overrides=overrides)
+
+
+registry = Registry()
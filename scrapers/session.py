@@ -1,6 +1,13 @@
-"""Shared requests session with retries and robots.txt helper."""
+"""Shared requests session with retries, conditional fetching and a cached robots.txt check."""
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
 import requests
 from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from urllib3.util.retry import Retry
 from urllib.parse import urljoin, urlparse
 import urllib.robotparser as robotparser
@@ -8,24 +15,435 @@ import urllib.robotparser as robotparser
 DEFAULT_UA = "EventScraperBot/1.0 (+https://example.com)"
 
 
-def create_session(user_agent: str = DEFAULT_UA, retries: int = 3, backoff: float = 0.3):
+class PoolStats:
+    """Request and connection counters for one pooled adapter."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    @property
+    def reused(self):
+        return max(0, self.requests - self.new_connections)
+
+    def to_dict(self):
+        return {"requests": self.requests, "new_connections": self.new_connections, "reused": self.reused}
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that counts requests and newly opened connections.
+
+    Every request that does not open a connection went over a kept-alive
+    one, i.e. it skipped the TCP/TLS handshake.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.stats = PoolStats()
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.record_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.record_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+    def send(self, request, **kwargs):
+        self.stats.record_request()
+        return super().send(request, **kwargs)
+
+
+def create_session(user_agent: str = DEFAULT_UA, retries: int = 3, backoff: float = 0.3,
+                   pool_connections: int = 10, pool_maxsize: int = 10):
     s = requests.Session()
     s.headers.update({"User-Agent": user_agent})
     retry = Retry(total=retries, backoff_factor=backoff, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=["GET", "POST"])
-    adapter = HTTPAdapter(max_retries=retry)
+    adapter = PooledHTTPAdapter(max_retries=retry, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
     s.mount("http://", adapter)
     s.mount("https://", adapter)
     return s
 
 
+class SessionRegistry:
+    """Long-lived sessions, one per host, shared by every scrape and thread.
+
+    Reusing a session keeps its connection pool (and the kept-alive TLS
+    connections in it) across scheduled runs. ``pool_maxsize`` bounds the
+    connections kept per host and should be at least the number of threads
+    that fetch from one host concurrently.
+    """
+
+    def __init__(self, pool_connections=4, pool_maxsize=8, user_agent=DEFAULT_UA):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.user_agent = user_agent
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def get(self, url):
+        host = self.host_of(url)
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = create_session(self.user_agent, pool_connections=self.pool_connections,
+                                         pool_maxsize=self.pool_maxsize)
+                self._sessions[host] = session
+            return session
+
+    def stats(self):
+        """``{host: {"requests", "new_connections", "reused"}}`` since startup."""
+        out = {}
+        with self._lock:
+            items = list(self._sessions.items())
+        for host, session in items:
+            adapters = getattr(session, "adapters", {})
+            adapter = adapters.get(host.split("://")[0] + "://") if adapters else None
+            if isinstance(adapter, PooledHTTPAdapter):
+                out[host] = adapter.stats.to_dict()
+        return out
+
+    def close(self):
+        with self._lock:
+            sessions, self._sessions = list(self._sessions.values()), {}
+        for session in sessions:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+
+class NotModified(Exception):
+    """Raised by a scraper when its listing page has not changed since the last run."""
+
+    def __init__(self, url, source=None, city=None):
+        super().__init__(f"{url} not modified")
+        self.url = url
+        self.source = source
+        self.city = city
+
+
+class StateDB:
+    """Small SQLite file holding crawl state that must survive restarts."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+
+class ValidatorStore:
+    """ETag / Last-Modified / body hash per URL.
+
+    New validators are staged while a run is in progress and only written by
+    ``commit()`` once the scraped data has been stored, so a failed ingest
+    never causes the next run to skip a page it has not really processed.
+    """
+
+    def __init__(self, db: StateDB):
+        self.db = db
+        self.db.execute("CREATE TABLE IF NOT EXISTS http_validators ("
+                        "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, content_hash TEXT, updated_at REAL)")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def get(self, url):
+        rows = self.db.execute("SELECT etag, last_modified, content_hash FROM http_validators WHERE url = ?", (url,))
+        if not rows:
+            return None
+        return {"etag": rows[0][0], "last_modified": rows[0][1], "content_hash": rows[0][2]}
+
+    def stage(self, url, etag, last_modified, content_hash, source=None, city=None):
+        with self._lock:
+            self._pending[url] = (etag, last_modified, content_hash, source, city)
+
+    def _take(self, city):
+        # staged validators of ``city`` (all of them when None), removed from pending
+        with self._lock:
+            if city is None:
+                pending, self._pending = self._pending, {}
+            else:
+                pending = {url: v for url, v in self._pending.items() if v[4] == city}
+                for url in pending:
+                    del self._pending[url]
+        return pending
+
+    def commit(self, sources=None, city=None):
+        """Persist staged validators, optionally only those of ``sources``.
+
+        The rest are dropped: a source that produced nothing (e.g. its parser
+        failed) must be fetched in full again next time. With ``city`` only
+        that city's validators are committed or dropped; other cities' stay
+        staged until their own data is stored.
+        """
+        pending = self._take(city)
+        if sources is not None:
+            pending = {url: v for url, v in pending.items() if v[3] in sources}
+        now = time.time()
+        for url, (etag, last_modified, content_hash, _source, _city) in pending.items():
+            self.db.execute("INSERT OR REPLACE INTO http_validators (url, etag, last_modified, content_hash, updated_at) "
+                            "VALUES (?, ?, ?, ?, ?)", (url, etag, last_modified, content_hash, now))
+        return len(pending)
+
+    def discard(self, city=None):
+        self._take(city)
+
+
+_state_lock = threading.Lock()
+_state = {}
+
+
+def state_db() -> StateDB:
+    """Process-wide crawl state database (``SCRAPER_STATE_DB``, default scraper_state.db)."""
+    with _state_lock:
+        if "db" not in _state:
+            _state["db"] = StateDB(os.environ.get("SCRAPER_STATE_DB", "scraper_state.db"))
+        return _state["db"]
+
+
+def validator_store() -> ValidatorStore:
+    db = state_db()
+    with _state_lock:
+        if "validators" not in _state:
+            _state["validators"] = ValidatorStore(db)
+        return _state["validators"]
+
+
+def conditional_get(session, url, source=None, city=None, timeout=10):
+    """GET ``url`` with stored validators.
+
+    Raises ``NotModified`` when the server answers 304 or the body hashes the
+    same as last time; otherwise returns the response and stages its
+    validators for ``ValidatorStore.commit()``.
+    """
+    if os.environ.get("SCRAPER_CONDITIONAL", "1") in ("0", "false", "no"):
+        host_throttle().wait(url)
+        resp = session.get(url, timeout=timeout)
+        resp.raise_for_status()
+        return resp
+    store = validator_store()
+    known = store.get(url)
+    headers = {}
+    if known:
+        if known["etag"]:
+            headers["If-None-Match"] = known["etag"]
+        if known["last_modified"]:
+            headers["If-Modified-Since"] = known["last_modified"]
+    host_throttle().wait(url)
+    resp = session.get(url, timeout=timeout, headers=headers) if headers else session.get(url, timeout=timeout)
+    if resp.status_code == 304:
+        raise NotModified(url, source, city)
+    resp.raise_for_status()
+    body = getattr(resp, "content", None)
+    if body is None:
+        body = resp.text.encode("utf-8")
+    digest = hashlib.sha256(body).hexdigest()
+    resp_headers = getattr(resp, "headers", None) or {}
+    store.stage(url, resp_headers.get("ETag"), resp_headers.get("Last-Modified"), digest, source, city)
+    if known and known["content_hash"] == digest:
+        raise NotModified(url, source, city)
+    return resp
+
+
+_MAX_AGE_RE = re.compile(r"max-age\s*=\s*(\d+)")
+
+
+class RobotsCache:
+    """robots.txt rules per host, fetched at most once per TTL.
+
+    Entries are kept parsed in memory and persisted in the state database so
+    a restart does not refetch them. A ``Cache-Control: max-age`` on the
+    robots response overrides the default TTL (bounded by ``max_ttl``).
+    Unreachable robots files are treated as allow-all, as before, but that
+    answer is only cached for ``error_ttl`` seconds.
+    """
+
+    def __init__(self, db: StateDB, ttl=24 * 3600, error_ttl=300, max_ttl=7 * 24 * 3600,
+                 timeout=5, user_agent=DEFAULT_UA):
+        self.db = db
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.max_ttl = max_ttl
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self.fetches = 0
+        self._parsed = {}
+        self._lock = threading.Lock()
+        self._host_locks = {}
+        self.db.execute("CREATE TABLE IF NOT EXISTS robots_cache ("
+                        "host TEXT PRIMARY KEY, status INTEGER, body TEXT, expires_at REAL)")
+
+    @staticmethod
+    def host_of(url):
+        parsed = urlparse(url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def _host_lock(self, host):
+        with self._lock:
+            return self._host_locks.setdefault(host, threading.Lock())
+
+    def _build(self, status, body):
+        rp = robotparser.RobotFileParser()
+        if status in (401, 403):
+            rp.disallow_all = True
+        elif status is None or status >= 400:
+            rp.allow_all = True
+        else:
+            rp.parse((body or "").splitlines())
+        return rp
+
+    def _ttl_for(self, resp):
+        cache_control = resp.headers.get("Cache-Control", "") if resp is not None else ""
+        if "no-store" in cache_control or "no-cache" in cache_control:
+            return self.error_ttl
+        m = _MAX_AGE_RE.search(cache_control)
+        if m:
+            return min(int(m.group(1)), self.max_ttl)
+        return self.ttl
+
+    def _fetch(self, host):
+        self.fetches += 1
+        try:
+            resp = requests.get(urljoin(host, "/robots.txt"), timeout=self.timeout,
+                                headers={"User-Agent": self.user_agent})
+        except Exception as e:
+            print(f"robots.txt fetch failed for {host}: {e}")
+            return None, None, self.error_ttl
+        if resp.status_code >= 500:
+            return None, None, self.error_ttl
+        return resp.status_code, resp.text, self._ttl_for(resp)
+
+    def parser(self, url):
+        host = self.host_of(url)
+        now = time.time()
+        entry = self._parsed.get(host)
+        if entry and entry[0] > now:
+            return entry[1]
+        with self._host_lock(host):
+            # another thread may have refreshed it while we waited
+            entry = self._parsed.get(host)
+            if entry and entry[0] > now:
+                return entry[1]
+            rows = self.db.execute("SELECT status, body, expires_at FROM robots_cache WHERE host = ?", (host,))
+            if rows and rows[0][2] > now:
+                status, body, expires_at = rows[0]
+            else:
+                status, body, ttl = self._fetch(host)
+                expires_at = now + ttl
+                self.db.execute("INSERT OR REPLACE INTO robots_cache (host, status, body, expires_at) VALUES (?, ?, ?, ?)",
+                                (host, status, body, expires_at))
+            rp = self._build(status, body)
+            self._parsed[host] = (expires_at, rp)
+            return rp
+
+    def allowed(self, url, user_agent=None):
+        return self.parser(url).can_fetch(user_agent or self.user_agent, url)
+
+    def delay(self, url, user_agent=None):
+        """Seconds to wait between requests to the host (Crawl-delay or Request-rate), or 0."""
+        rp = self.parser(url)
+        ua = user_agent or self.user_agent
+        try:
+            delay = rp.crawl_delay(ua)
+            if delay:
+                return float(delay)
+            rate = rp.request_rate(ua)
+            if rate and rate.requests:
+                return rate.seconds / rate.requests
+        except Exception:
+            pass
+        return 0.0
+
+
+class HostThrottle:
+    """Spaces out requests to a host according to its robots.txt delay."""
+
+    def __init__(self, robots: RobotsCache, max_delay=10.0):
+        self.robots = robots
+        self.max_delay = max_delay
+        self._next = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        delay = min(self.robots.delay(url), self.max_delay)
+        if delay <= 0:
+            return
+        host = self.robots.host_of(url)
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next.get(host, 0.0))
+            self._next[host] = slot + delay
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def robots_cache() -> RobotsCache:
+    db = state_db()
+    with _state_lock:
+        if "robots" not in _state:
+            _state["robots"] = RobotsCache(
+                db,
+                ttl=int(os.environ.get("ROBOTS_TTL", str(24 * 3600))),
+                timeout=float(os.environ.get("ROBOTS_TIMEOUT", "5")),
+            )
+        return _state["robots"]
+
+
+def session_registry() -> SessionRegistry:
+    with _state_lock:
+        if "sessions" not in _state:
+            _state["sessions"] = SessionRegistry(
+                pool_connections=int(os.environ.get("SCRAPER_POOL_CONNECTIONS", "4")),
+                pool_maxsize=int(os.environ.get("SCRAPER_POOL_MAXSIZE", "8")),
+            )
+        return _state["sessions"]
+
+
+def get_session(url):
+    """Pooled, kept-alive session for ``url``'s host."""
+    return session_registry().get(url)
+
+
+def host_throttle() -> HostThrottle:
+    robots = robots_cache()
+    with _state_lock:
+        if "throttle" not in _state:
+            _state["throttle"] = HostThrottle(robots, max_delay=float(os.environ.get("ROBOTS_MAX_DELAY", "10")))
+        return _state["throttle"]
+
+
 def allowed_by_robots(url: str, user_agent: str = DEFAULT_UA) -> bool:
-    parsed = urlparse(url)
-    robots_url = urljoin(f"{parsed.scheme}://{parsed.netloc}", "/robots.txt")
-    rp = robotparser.RobotFileParser()
     try:
-        rp.set_url(robots_url)
-        rp.read()
-        return rp.can_fetch(user_agent, url)
+        return robots_cache().allowed(url, user_agent)
     except Exception:
-        # if robots cannot be fetched, assume allowed but callers should be cautious
+        # if robots cannot be evaluated, assume allowed but callers should be cautious
         return True
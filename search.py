@@ -0,0 +1,150 @@
+"""
+Full-text event search.
+
+SQLite keeps an FTS5 index (``events_fts``) over title, venue, description
+and category as an external-content table: it stores only the index and
+reads text from ``events``. Triggers update it in the same transaction as
+every insert, delete and change to those columns, so each ingest (and any
+admin edit) is searchable once it commits. The bulk "seen again" stamp the
+ingest does on unchanged rows does not touch the indexed columns, so it
+costs the index nothing. PostgreSQL gets a stored generated ``tsvector``
+column with a GIN index instead.
+
+Queries are built from the words of the user's input (never passed through
+as query syntax); with ``prefix`` the last word matches as a prefix for
+typeahead, backed by FTS5 prefix indexes for 2 and 3 characters. Results
+are ranked by BM25 (SQLite, the index's ``rank`` column, configured with
+the column weights by ``set_rank``) or ``ts_rank_cd`` (PostgreSQL),
+weighting title matches over venue and category, and those over the
+description. Every match is scored, so latency grows with the number of
+matching events rather than the table: selective queries take a few
+milliseconds, while a word found in most events costs roughly 1 µs per
+matching event on SQLite: about 0.7 s for a word in 700k of 1M events
+(see ``benchmarks/search_bench.py``).
+"""
+import re
+
+from sqlalchemy import column, table, text
+
+SEARCH_COLUMNS = ("title", "venue", "description", "category")
+# relative weight of a match in each column, in SEARCH_COLUMNS order
+SQLITE_WEIGHTS = (10.0, 4.0, 1.0, 3.0)
+POSTGRES_WEIGHTS = ("A", "B", "D", "C")
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+events_fts = table("events_fts", column("rowid"), column("rank"))
+
+
+class FeatureUnavailable(ValueError):
+    """Full-text search is not available on this database."""
+
+
+def query_words(q):
+    return _WORD_RE.findall((q or "").lower())
+
+
+def fts5_query(q, prefix=True):
+    """FTS5 MATCH expression requiring every word of ``q``, or None if it has none."""
+    words = query_words(q)
+    if not words:
+        return None
+    terms = [f'"{w}"' for w in words]
+    if prefix:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+
+def tsquery(q, prefix=True):
+    """``to_tsquery`` text requiring every word of ``q``, or None if it has none."""
+    words = query_words(q)
+    if not words:
+        return None
+    terms = list(words)
+    if prefix:
+        terms[-1] += ":*"
+    return " & ".join(terms)
+
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+    "title, venue, description, category, content='events', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN "
+    "INSERT INTO events_fts (rowid, title, venue, description, category) "
+    "VALUES (new.id, new.title, new.venue, new.description, new.category); END",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN "
+    "INSERT INTO events_fts (events_fts, rowid, title, venue, description, category) "
+    "VALUES ('delete', old.id, old.title, old.venue, old.description, old.category); END",
+    "CREATE TRIGGER IF NOT EXISTS events_fts_update AFTER UPDATE OF title, venue, description, category ON events BEGIN "
+    "INSERT INTO events_fts (events_fts, rowid, title, venue, description, category) "
+    "VALUES ('delete', old.id, old.title, old.venue, old.description, old.category); "
+    "INSERT INTO events_fts (rowid, title, venue, description, category) "
+    "VALUES (new.id, new.title, new.venue, new.description, new.category); END",
+]
+
+
+def _pg_vector():
+    parts = [
+        f"setweight(to_tsvector('simple', coalesce({col}, '')), '{weight}')"
+        for col, weight in zip(SEARCH_COLUMNS, POSTGRES_WEIGHTS)
+    ]
+    return " || ".join(parts)
+
+
+def create_index(ctx):
+    """Migration step: build the search index for ``ctx``'s dialect."""
+    if ctx.dialect.name == "sqlite":
+        for sql in SQLITE_DDL:
+            ctx.conn.exec_driver_sql(sql)
+        # index the rows that exist already
+        ctx.conn.exec_driver_sql("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+    elif ctx.dialect.name == "postgresql":
+        if not ctx.has_column("events", "search_vector"):
+            ctx.conn.exec_driver_sql(
+                f"ALTER TABLE events ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({_pg_vector()}) STORED")
+        concurrently = "" if ctx.transactional else " CONCURRENTLY"
+        ctx.conn.exec_driver_sql(
+            f"CREATE INDEX{concurrently} IF NOT EXISTS ix_events_search_vector ON events USING gin (search_vector)")
+    else:
+        print(f"Full-text search is not available on {ctx.dialect.name}")
+
+
+def set_rank(ctx):
+    """Migration step: make the FTS5 ``rank`` column BM25 with ``SQLITE_WEIGHTS``."""
+    if ctx.dialect.name == "sqlite":
+        weights = ", ".join(str(w) for w in SQLITE_WEIGHTS)
+        ctx.conn.exec_driver_sql(f"INSERT INTO events_fts (events_fts, rank) VALUES ('rank', 'bm25({weights})')")
+
+
+def apply_search(query, id_col, dialect_name, q, prefix=True):
+    """Restrict an ``Event`` select to matches of ``q``, best first.
+
+    Returns None when ``q`` has no words and raises ``FeatureUnavailable``
+    on databases without a search index. Any ordering already on ``query``
+    is replaced by relevance (ties broken by id); limit the result to the
+    page size so only the best matches are read.
+    """
+    if dialect_name == "sqlite":
+        match = fts5_query(q, prefix)
+        if match is None:
+            return None
+        # rank is BM25, lower for better matches
+        return (
+            query.join(events_fts, events_fts.c.rowid == id_col)
+            .where(text("events_fts MATCH :match").bindparams(match=match))
+            .order_by(None)
+            .order_by(events_fts.c.rank, id_col)
+        )
+    if dialect_name == "postgresql":
+        tsq = tsquery(q, prefix)
+        if tsq is None:
+            return None
+        return (
+            query.where(text("events.search_vector @@ to_tsquery('simple', :tsq)").bindparams(tsq=tsq))
+            .order_by(None)
+            .order_by(
+                text("ts_rank_cd(events.search_vector, to_tsquery('simple', :tsq_rank)) DESC").bindparams(tsq_rank=tsq),
+                id_col,
+            )
+        )
+    raise FeatureUnavailable(f"full-text search is not available on {dialect_name}")
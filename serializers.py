@@ -0,0 +1,59 @@
+"""
+JSON encoding for API responses.
+
+``dumps`` uses orjson when it is installed and the standard library
+otherwise; both write compact UTF-8 with the same text for the same values.
+Datetimes may be passed as they come from the database: naive values are
+UTC (as everything in this app is stored) and aware ones are UTC too (see
+``database.make_engine``); both encoders write them as ``isoformat()`` with
+a ``+00:00`` offset, so views do not format timestamps row by row.
+
+``row_dicts`` turns plain result tuples (``select`` of columns, not ORM
+entities) into dicts for the first ``len(names)`` columns of each row.
+"""
+import json
+from datetime import datetime, timezone
+
+from flask import current_app
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC if orjson is not None else 0
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.astimezone(timezone.utc).isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj):
+    """``obj`` as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=ORJSON_OPTIONS)
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_response(obj, status=200):
+    return current_app.response_class(dumps(obj), status=status, mimetype="application/json")
+
+
+def row_dicts(rows, names, formatters=None):
+    """Dicts of ``names`` to the leading columns of ``rows``.
+
+    ``formatters`` maps a name to a function applied to its value; columns
+    after ``names`` (e.g. keyset cursor values) are left out.
+    """
+    formatters = [(name, fmt) for name, fmt in (formatters or {}).items() if name in names]
+    out = []
+    for row in rows:
+        d = dict(zip(names, row))
+        for name, fmt in formatters:
+            d[name] = fmt(d[name])
+        out.append(d)
+    return out
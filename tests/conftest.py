@@ -1,9 +1,29 @@
+import os
 import sys
 from pathlib import Path
 
+import pytest
+
+# keep crawl state (HTTP validators, robots cache) out of the working tree
+os.environ.setdefault("SCRAPER_STATE_DB", ":memory:")
+# no background scrape schedule in tests
+os.environ.setdefault("SCRAPER_SCHEDULER", "off")
+# tests drain the mail queue themselves
+os.environ.setdefault("MAIL_SENDER", "off")
+
 # Ensure the repository root is on sys.path when pytest collects tests so
 # imports like `import app` and `from scrapers import ...` work reliably.
 ROOT = Path(__file__).resolve().parents[1]
 root_str = str(ROOT)
 if root_str not in sys.path:
     sys.path.insert(0, root_str)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_response_cache():
+    # tests write to the database directly, bypassing the cache invalidation
+    # done by the app's own writers
+    appmod = sys.modules.get("app")
+    if appmod is not None and hasattr(appmod, "response_cache"):
+        appmod.response_cache.local.clear()
+    yield
@@ -1,6 +1,7 @@
 import os
 os.environ['DB_PATH'] = 'sqlite:///:memory:'
 import json
+import pytest
 from importlib import reload
 import app as appmod
 reload(appmod)
@@ -34,3 +35,192 @@ def test_list_events():
     assert isinstance(data, list)
     # at least one event should be present (the one we added)
     assert any(e.get('original_url') == 'http://example.com/test-api' for e in data)
+
+
+def test_list_events_keyset_pagination_and_filters():
+    client = app.test_client()
+    # insert in reverse so ordering comes from the parsed start time, not the id
+    appmod.ingest_events([
+        {'title': f'Paged {i}', 'original_url': f'http://example.com/paged/{i}', 'city': ' SYDNEY ',
+         'start_time': f'Mon {i + 1} March 2026, 7pm', 'source': 'Pager'}
+        for i in reversed(range(5))
+    ])
+    db = SessionLocal()
+    db.query(Event).filter(Event.original_url == 'http://example.com/paged/2').update({'featured': True})
+    db.commit()
+    db.close()
+    try:
+        seen = []
+        cursor = None
+        while True:
+            url = '/api/events?source=Pager&limit=2' + (f'&cursor={cursor}' if cursor else '')
+            r = client.get(url)
+            assert r.status_code == 200
+            seen.extend(e['title'] for e in r.get_json())
+            cursor = r.headers.get('X-Next-Cursor')
+            if not cursor:
+                break
+        assert seen == [f'Paged {i}' for i in range(5)]
+
+        r = client.get('/api/events?source=Pager&featured=true')
+        assert [e['title'] for e in r.get_json()] == ['Paged 2']
+        r = client.get('/api/events?source=Pager&from=2026-03-02&to=2026-03-03')
+        assert [e['title'] for e in r.get_json()] == ['Paged 1', 'Paged 2']
+        # 7pm Sydney time on 1 March is 08:00 UTC
+        assert r.get_json()[0]['start_at'] == '2026-03-02T08:00:00+00:00'
+        assert client.get('/api/events?cursor=not-a-cursor').status_code == 400
+        bad_id = appmod.encode_cursor(['2026-03-02T08:00:00+00:00', 'x'])
+        assert client.get(f'/api/events?cursor={bad_id}').status_code == 400
+    finally:
+        db = SessionLocal()
+        db.query(Event).filter(Event.source == 'Pager').delete()
+        db.commit()
+        db.close()
+
+
+def test_list_events_rows_match_to_dict_and_fields_select_columns(monkeypatch):
+    import serializers
+    client = app.test_client()
+    db = SessionLocal()
+    ev = db.query(Event).filter(Event.original_url == 'http://example.com/test-api').one()
+    ev.start_at = datetime(2026, 3, 2, 8, 30, 15, 120000, tzinfo=timezone.utc)
+    db.commit()
+    expected = ev.to_dict()
+    db.close()
+    appmod.response_cache.local.clear()
+
+    for encoder in (serializers.orjson, None):
+        monkeypatch.setattr(serializers, 'orjson', encoder)
+        appmod.response_cache.local.clear()
+        r = client.get('/api/events')
+        assert r.status_code == 200 and r.mimetype == 'application/json'
+        assert next(e for e in r.get_json() if e['id'] == expected['id']) == expected
+
+    r = client.get('/api/events?fields=id,title,start_at&limit=1')
+    assert list(r.get_json()[0]) == ['id', 'title', 'start_at']
+    assert client.get('/api/events?fields=id,secret').status_code == 400
+
+
+def test_scrape_jobs_are_submitted_deduplicated_and_reported(monkeypatch):
+    from scrapers.fanout import CityRun, FanoutResult
+    from scrapers.fanout import SourceStats
+
+    class FakeFanout:
+        def run(self, cities, on_city=None, spread=None, on_progress=None):
+            result = FanoutResult()
+            for city in cities:
+                run = result.cities[city] = CityRun(city, jobs=1)
+                run.stats['scrape_test'] = SourceStats(name='scrape_test', status='ok', items=3, duration=0.5)
+                run.counts = {'seen': 3, 'inserted': 3, 'updated': 0, 'deactivated': 0}
+            on_progress(result)
+            return result
+
+    monkeypatch.setenv('ADMIN_TOKEN', 'secret')
+    monkeypatch.setattr(appmod, 'city_fanout', FakeFanout())
+    client = app.test_client()
+    assert client.post('/api/scrape').status_code == 401
+    assert client.get('/api/scrape', headers={'X-Admin-Token': 'secret'}).status_code == 405
+
+    r = client.post('/api/scrape', headers={'X-Admin-Token': 'secret'})
+    assert r.status_code == 202
+    job = r.get_json()
+    assert job['status'] == 'queued' and not job['deduplicated']
+    assert r.headers['Location'] == f"/api/scrape/{job['id']}"
+    again = client.post('/api/scrape', headers={'X-Admin-Token': 'secret'}).get_json()
+    assert again['id'] == job['id'] and again['deduplicated']
+
+    appmod.run_queued_scrapes()
+    status = client.get(f"/api/scrape/{job['id']}", headers={'X-Admin-Token': 'secret'}).get_json()
+    assert status['status'] == 'finished' and status['finished_at']
+    city = status['progress']['cities'][0]
+    assert city['counts']['inserted'] == 3
+    assert city['sources'][0] == {'name': 'scrape_test', 'status': 'ok', 'items': 3, 'duration': 0.5, 'error': None}
+
+    # nothing in flight any more: the next submission is a new job
+    assert client.post('/api/scrape', headers={'X-Admin-Token': 'secret'}).get_json()['id'] != job['id']
+    assert client.get('/api/scrape/nope', headers={'X-Admin-Token': 'secret'}).status_code == 404
+
+
+def test_ticket_requests_joined_pages_and_filters():
+    from sqlalchemy import event as sa_event
+
+    db = SessionLocal()
+    ev = Event(title='Ticketed Show', original_url='http://example.com/tickets-show', city='Sydney', active=True)
+    db.add(ev)
+    db.commit()
+    base = datetime(2026, 3, 1, 12, 0)
+    for n in range(5):
+        db.add(appmod.TicketRequest(email=f'fan{n}@example.com', event_id=ev.id if n % 2 == 0 else None,
+                                    created_at=base.replace(day=1 + n), confirmed=n == 4))
+    db.commit()
+    event_id = ev.id
+    db.close()
+
+    statements = []
+    counter = lambda *a, **kw: statements.append(a[2])
+    sa_event.listen(appmod.engine, 'before_cursor_execute', counter)
+    try:
+        client = app.test_client()
+        r = client.get('/api/ticket-requests?limit=2&from=2026-03-01')
+        first = r.get_json()
+        assert len(statements) == 1
+    finally:
+        sa_event.remove(appmod.engine, 'before_cursor_execute', counter)
+    assert [t['email'] for t in first] == ['fan4@example.com', 'fan3@example.com']
+    assert first[0]['event_title'] == 'Ticketed Show' and first[1]['event_title'] is None
+
+    seen = [t['email'] for t in first]
+    cursor = r.headers['X-Next-Cursor']
+    while cursor:
+        r = client.get(f'/api/ticket-requests?limit=2&from=2026-03-01&cursor={cursor}')
+        seen += [t['email'] for t in r.get_json()]
+        cursor = r.headers.get('X-Next-Cursor')
+    assert seen == [f'fan{n}@example.com' for n in (4, 3, 2, 1, 0)]
+
+    r = client.get(f'/api/ticket-requests?event_id={event_id}&confirmed=false&to=2026-03-03')
+    assert [t['email'] for t in r.get_json()] == ['fan2@example.com', 'fan0@example.com']
+    assert client.get('/api/ticket-requests?event_id=abc').status_code == 400
+
+    csv_body = client.get(f'/api/ticket-requests.csv?event_id={event_id}').get_data(as_text=True)
+    assert csv_body.count('Ticketed Show') == 3
+
+
+def test_streaming_exports(monkeypatch):
+    monkeypatch.setattr(appmod, 'EXPORT_CHUNK_SIZE', 2)
+    db = SessionLocal()
+    for n in range(5):
+        db.add(Event(title=f'Export {n}', original_url=f'http://example.com/export-{n}', city='Melbourne',
+                     source='Export', active=n != 4, start_at=datetime(2026, 5, 1 + n, 9, 0, tzinfo=timezone.utc)))
+    db.commit()
+    db.close()
+
+    client = app.test_client()
+    r = client.get('/api/events.csv?source=Export')
+    assert r.is_streamed and r.headers['Content-Disposition'] == 'attachment; filename=events.csv'
+    lines = r.get_data(as_text=True).splitlines()
+    assert lines[0].split(',')[:3] == ['id', 'title', 'start_time']
+    assert [l.split(',')[1] for l in lines[1:]] == ['Export 0', 'Export 1', 'Export 2', 'Export 3']
+
+    r = client.get('/api/events.ndjson?source=Export&city=Melbourne&from=2026-05-02')
+    rows = [json.loads(l) for l in r.get_data(as_text=True).splitlines()]
+    assert [row['title'] for row in rows] == ['Export 1', 'Export 2', 'Export 3']
+    assert rows[0]['start_at'] == '2026-05-02T09:00:00+00:00' and rows[0]['featured'] is False
+    assert client.get('/api/events.ndjson?source=Export&city=Sydney').get_data() == b''
+
+    assert client.get('/api/events.xlsx').status_code == 404
+    assert client.get('/api/events.csv?from=nope').status_code == 400
+
+
+def test_parquet_export():
+    pq = pytest.importorskip('pyarrow.parquet')
+    import io
+    db = SessionLocal()
+    db.add(Event(title='Columnar', original_url='http://example.com/columnar', city='Perth', source='Parquet', active=True))
+    db.commit()
+    db.close()
+
+    r = app.test_client().get('/api/events.parquet?source=Parquet')
+    assert r.status_code == 200
+    table = pq.read_table(io.BytesIO(r.get_data()))
+    assert table.column('title').to_pylist() == ['Columnar']
+    assert str(table.schema.field('start_at').type) == 'timestamp[us, tz=UTC]'
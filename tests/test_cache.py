@@ -0,0 +1,89 @@
+import os
+os.environ.setdefault('DB_PATH', 'sqlite:///:memory:')
+from datetime import datetime, timezone
+
+from flask import Flask
+
+import app as appmod
+from cache import ResponseCache, SqliteBackend
+
+
+def _counting_app(cache):
+    app = Flask(__name__)
+    calls = {'n': 0}
+
+    @app.route('/items')
+    @cache.cached('items')
+    def items():
+        calls['n'] += 1
+        return {'n': calls['n']}
+
+    return app, calls
+
+
+def test_cache_hit_etag_and_invalidation():
+    cache = ResponseCache(ttl=60)
+    app, calls = _counting_app(cache)
+    client = app.test_client()
+    r1 = client.get('/items')
+    r2 = client.get('/items')
+    assert calls['n'] == 1
+    assert r1.get_json() == r2.get_json()
+    etag = r1.headers['ETag']
+    assert client.get('/items', headers={'If-None-Match': etag}).status_code == 304
+
+    # query args are part of the key
+    client.get('/items?page=2')
+    assert calls['n'] == 2
+
+    cache.invalidate('items')
+    r3 = client.get('/items', headers={'If-None-Match': etag})
+    assert r3.status_code == 200
+    assert calls['n'] == 3
+
+
+def test_shared_backend_sees_invalidations_from_other_processes(tmp_path):
+    url = f"sqlite:///{tmp_path / 'cache.db'}"
+    cache_a = ResponseCache.from_url(url, ttl=60)
+    cache_b = ResponseCache.from_url(url, ttl=60)
+    app_a, calls_a = _counting_app(cache_a)
+    app_b, calls_b = _counting_app(cache_b)
+    app_a.test_client().get('/items')
+    # worker B is served worker A's entry from the shared store
+    assert app_b.test_client().get('/items').get_json() == {'n': 1}
+    assert calls_b['n'] == 0
+    cache_a.invalidate('items')
+    app_b.test_client().get('/items')
+    assert calls_b['n'] == 1
+
+
+def test_patch_event_invalidates_event_listing():
+    client = appmod.app.test_client()
+    db = appmod.SessionLocal()
+    ev = appmod.Event(title='Cached Event', original_url='http://example.com/cached', city='Sydney',
+                      source='CacheTest', last_scraped_time=datetime.now(timezone.utc), active=True)
+    db.add(ev)
+    db.commit()
+    ev_id = ev.id
+    db.close()
+    try:
+        r = client.get('/api/events?source=CacheTest')
+        assert [e['featured'] for e in r.get_json()] == [False]
+        assert client.patch(f'/api/events/{ev_id}', json={'featured': True}).status_code == 200
+        r = client.get('/api/events?source=CacheTest')
+        assert [e['featured'] for e in r.get_json()] == [True]
+    finally:
+        db = appmod.SessionLocal()
+        db.query(appmod.Event).filter(appmod.Event.source == 'CacheTest').delete()
+        db.commit()
+        db.close()
+
+
+def test_shared_backend_reconnects_after_fork(tmp_path, monkeypatch):
+    backend = SqliteBackend(str(tmp_path / 'cache.db'))
+    parent_conn = backend._conn()
+    # a forked worker gets its own connection instead of the master's
+    monkeypatch.setattr(os, 'getpid', lambda: -1)
+    assert backend._conn() is not parent_conn
+    backend.bump('events')
+    assert backend.generation('events') == 1
@@ -34,3 +34,15 @@ def test_confirm_endpoint_marks_request_confirmed(tmp_path, monkeypatch):
     assert tr2.confirmed is True
     assert tr2.confirmed_at is not None
     db.close()
+
+
+def test_stored_ip_is_not_taken_from_a_forged_header():
+    client = appmod.app.test_client()
+    resp = client.post('/api/ticket-request', json={
+        'email': 'forged-ip@example.com', 'consent': True, 'event_url': 'https://example.com/event/ip'
+    }, headers={'X-Forwarded-For': '203.0.113.66'}, environ_base={'REMOTE_ADDR': '192.0.2.7'})
+    assert resp.status_code == 200
+    db = appmod.SessionLocal()
+    tr = db.query(appmod.TicketRequest).filter(appmod.TicketRequest.email == 'forged-ip@example.com').one()
+    assert tr.ip_address == '192.0.2.7'
+    db.close()
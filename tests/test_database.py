@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+from sqlalchemy import text
+
+from database import make_engine
+
+
+def test_sqlite_connections_use_wal_and_readers_do_not_wait_for_writers(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'wal.db'}", pragmas={"busy_timeout": 2000})
+    with engine.begin() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 2000
+        conn.execute(text("CREATE TABLE t (n INTEGER)"))
+        conn.execute(text("INSERT INTO t VALUES (1)"))
+
+    writing, done = threading.Event(), threading.Event()
+
+    def writer():
+        with engine.begin() as conn:
+            conn.execute(text("INSERT INTO t VALUES (2)"))
+            writing.set()
+            done.wait(5)
+
+    t = threading.Thread(target=writer)
+    t.start()
+    try:
+        assert writing.wait(5)
+        # the open write transaction neither blocks nor leaks into this read
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT count(*) FROM t")).scalar() == 1
+    finally:
+        done.set()
+        t.join()
+
+
+def test_memory_sqlite_skips_wal():
+    engine = make_engine("sqlite:///:memory:")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "memory"
+
+
+def test_server_databases_get_pool_settings():
+    pytest.importorskip("psycopg2")
+    engine = make_engine("postgresql://user@localhost/events", pool={"pool_size": 3})
+    assert engine.pool.size() == 3
+    assert engine.pool._pre_ping and engine.pool._recycle == 1800
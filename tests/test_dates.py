@@ -0,0 +1,36 @@
+from datetime import date, datetime, timezone
+
+import pytest
+
+from scrapers.dates import annotate_event_times, parse_event_times
+
+TODAY = date(2026, 2, 1)
+
+
+def utc(*args):
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.mark.parametrize("text,start,end", [
+    ("2026-02-20T19:00:00+11:00", utc(2026, 2, 20, 8, 0), None),
+    ("Sat 20 Feb 2026, 7:30pm", utc(2026, 2, 20, 8, 30), None),
+    ("20th February", utc(2026, 2, 19, 13, 0), None),
+    ("20/02/2026", utc(2026, 2, 19, 13, 0), None),
+    ("Feb 20 - 22, 2026", utc(2026, 2, 19, 13, 0), utc(2026, 2, 21, 13, 0)),
+    ("Saturday, 20 February 2026 7:00pm - 10:00pm", utc(2026, 2, 20, 8, 0), utc(2026, 2, 20, 11, 0)),
+    ("Night Market 3 Mar", utc(2026, 3, 2, 13, 0), None),
+    ("Every Friday", None, None),
+])
+def test_parse_event_times(text, start, end):
+    assert parse_event_times(text, tz="Australia/Sydney", today=TODAY) == (start, end)
+
+
+def test_time_element_attribute_wins_over_text():
+    start, _ = parse_event_times("Tonight", attr="2026-02-20T09:00:00Z", today=TODAY)
+    assert start == utc(2026, 2, 20, 9, 0)
+
+
+def test_annotate_uses_city_timezone():
+    item = annotate_event_times({"start_time": "2026-07-01 18:00", "city": "Perth"})
+    assert item["start_at"] == utc(2026, 7, 1, 10, 0)
+    assert item["end_at"] is None
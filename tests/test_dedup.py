@@ -0,0 +1,107 @@
+import os
+import random
+os.environ.setdefault('DB_PATH', 'sqlite:///:memory:')
+from datetime import date, datetime, timezone
+
+import app as appmod
+from dedup import cluster, event_shingles, normalize_text
+
+
+def teardown_function(function):
+    db = appmod.SessionLocal()
+    db.query(appmod.Event).filter(appmod.Event.original_url.like('http://example.com/dedup/%')).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def test_normalize_text():
+    assert normalize_text('JAZZ @ the Opera House – Café & Bar!') == 'jazz opera house cafe bar'
+
+
+def test_cluster_joins_similar_events_on_the_same_day_only():
+    day, other_day = date(2026, 3, 2), date(2026, 3, 3)
+    records = [
+        (5, day, event_shingles('Jazz at the Opera House', 'Sydney Opera House')),
+        (2, day, event_shingles('JAZZ @ Opera House – Live', 'Opera House, Sydney')),
+        (9, day, event_shingles('Food & Wine Fair', 'Town Hall')),
+        (3, other_day, event_shingles('Jazz at the Opera House', 'Sydney Opera House')),
+        (4, None, event_shingles('Jazz at the Opera House', 'Sydney Opera House')),
+        (7, None, event_shingles('Jazz at the Opera House', 'Sydney Opera House')),
+    ]
+    assert cluster(records) == {5: 2, 2: 2, 9: 9, 3: 3, 4: 4, 7: 7}
+
+
+def test_cluster_scales_with_events_not_pairs():
+    # 2000 distinct events over 20 days plus a re-listing of every tenth one
+    rng = random.Random(3)
+    words = 'jazz blues rock comedy opera market wine film dance yoga craft trivia poetry ballet choir'.split()
+    titles = [' '.join(rng.sample(words, 4)) for _ in range(2000)]
+    venues = [f'{rng.choice(words)} {rng.choice(words)} hall' for _ in range(2000)]
+    records = [(i, date(2026, 3, 1 + i % 20), event_shingles(titles[i], venues[i])) for i in range(2000)]
+    records += [(10000 + i, date(2026, 3, 1 + i % 20), event_shingles(titles[i].title() + '!', venues[i]))
+                for i in range(0, 2000, 10)]
+    clusters = cluster(records)
+    assert all(clusters[10000 + i] == clusters[i] for i in range(0, 2000, 10))
+
+
+def test_ingest_clusters_cross_source_duplicates_and_list_can_collapse_them():
+    when = 'Mon 2 March 2026, 7pm'
+    appmod.ingest_events([
+        {'title': 'Jazz at the Opera House', 'venue': 'Sydney Opera House', 'start_time': when, 'city': 'Sydney',
+         'source': 'DedupA', 'original_url': 'http://example.com/dedup/a'},
+        {'title': 'JAZZ @ Opera House – Live', 'venue': 'Opera House, Sydney', 'start_time': when, 'city': 'Sydney',
+         'source': 'DedupB', 'original_url': 'http://example.com/dedup/b'},
+        {'title': 'Food Fair', 'venue': 'Town Hall', 'start_time': when, 'city': 'Sydney',
+         'source': 'DedupB', 'original_url': 'http://example.com/dedup/c'},
+    ])
+    client = appmod.app.test_client()
+    events = client.get('/api/events?source=DedupA,DedupB').get_json()
+    ids = {e['original_url'][-1]: e['id'] for e in events}
+    clusters = {e['original_url'][-1]: e['cluster_id'] for e in events}
+    assert clusters == {'a': ids['a'], 'b': ids['a'], 'c': ids['c']}
+
+    collapsed = client.get('/api/events?source=DedupA,DedupB&dedupe=true').get_json()
+    assert sorted(e['original_url'][-1] for e in collapsed) == ['a', 'c']
+
+    # deactivating the canonical event hands the cluster to the duplicate
+    r = client.patch(f"/api/events/{ids['a']}", json={'active': False})
+    assert r.status_code == 200
+    collapsed = client.get('/api/events?source=DedupA,DedupB&dedupe=true').get_json()
+    assert sorted(e['original_url'][-1] for e in collapsed) == ['b', 'c']
+
+
+def test_only_the_changed_days_are_reclustered(monkeypatch):
+    def item(key, title, when):
+        return {'title': title, 'venue': 'Opera House', 'start_time': when, 'city': 'Sydney',
+                'source': 'DedupA', 'original_url': f'http://example.com/dedup/{key}'}
+
+    appmod.ingest_events([item('d1', 'Jazz Night', 'Mon 2 March 2026, 7pm'),
+                          item('d2', 'Comedy Gala', 'Tue 3 March 2026, 7pm')])
+    clustered = []
+    real_cluster = appmod.dedup.cluster
+
+    def spy(records, **kwargs):
+        records = list(records)
+        clustered.append(sorted(r[0] for r in records))
+        return real_cluster(records, **kwargs)
+
+    monkeypatch.setattr(appmod.dedup, 'cluster', spy)
+    db = appmod.SessionLocal()
+    ids = dict(db.query(appmod.Event.original_url, appmod.Event.id)
+               .filter(appmod.Event.original_url.like('http://example.com/dedup/%')))
+    db.close()
+    d1, d2 = ids['http://example.com/dedup/d1'], ids['http://example.com/dedup/d2']
+
+    r = appmod.app.test_client().patch(f'/api/events/{d1}', json={'active': True})
+    assert r.status_code == 200 and clustered == [[d1]]
+
+    # an ingest re-clusters the day of the new event, not the day of the unchanged one
+    clustered.clear()
+    appmod.ingest_events([item('d1', 'Jazz Night', 'Mon 2 March 2026, 7pm'),
+                          item('d2', 'Comedy Gala', 'Tue 3 March 2026, 7pm'),
+                          item('d3', 'COMEDY GALA – Live', 'Tue 3 March 2026, 9pm')])
+    assert len(clustered) == 1 and d2 in clustered[0] and d1 not in clustered[0]
+    db = appmod.SessionLocal()
+    d3 = db.query(appmod.Event).filter_by(original_url='http://example.com/dedup/d3').one()
+    assert d3.cluster_id == d2
+    db.close()
@@ -0,0 +1,155 @@
+import sys
+import threading
+import time
+
+from scrapers.fanout import CityFanout
+from scrapers.registry import Registry, SourceSpec
+from scrapers.session import NotModified
+
+
+def spec(name, base, cities=None):
+    return SourceSpec(name=name, source=name.title(), base=base, url='{base}/{city}', items='.event',
+                      cities=cities)
+
+
+def registry_with(scrape):
+    reg = Registry()
+    for s in (spec('alpha', 'https://shared.example'), spec('beta', 'https://shared.example'),
+              spec('gamma', 'https://gamma.example', cities=['Sydney'])):
+        s.scrape = (lambda s: lambda city: scrape(s, city))(s)
+        reg.register(s)
+    return reg
+
+
+def test_jobs_fan_out_per_city_under_host_limits():
+    lock = threading.Lock()
+    active, peak = {}, {}
+
+    def scrape(s, city):
+        host = s.base
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        time.sleep(0.02)
+        with lock:
+            active[host] -= 1
+        if s.name == 'beta' and city == 'Perth':
+            raise NotModified(s.listing_url(city), s.source, city)
+        return [{'source': s.source, 'city': city, 'original_url': f'{s.listing_url(city)}/{n}'} for n in range(2)]
+
+    done = []
+    fanout = CityFanout(registry_with(scrape), max_workers=4, concurrency=1)
+    result = fanout.run(['Sydney', 'Perth', 'Sydney'], on_city=lambda run: done.append(run.city))
+
+    assert sorted(done) == ['Perth', 'Sydney']
+    assert peak['https://shared.example'] == 1
+    sydney, perth = result.cities['Sydney'], result.cities['Perth']
+    assert (sydney.jobs, len(sydney.items)) == (3, 6)
+    # gamma only serves Sydney; beta's Perth page was unchanged
+    assert (perth.jobs, len(perth.items)) == (2, 2)
+    assert perth.stats['scrape_beta'].status == 'unchanged'
+    assert perth.sources == {'Alpha', 'Beta'}
+    assert sydney.throughput > 0 and result.to_dict()['cities'][0]['items'] == 6
+
+
+def test_starts_are_spread_and_slow_jobs_time_out():
+    starts = {}
+
+    def scrape(s, city):
+        starts[(s.name, city)] = time.monotonic()
+        if s.name == 'gamma':
+            time.sleep(1)
+        return []
+
+    fanout = CityFanout(registry_with(scrape), max_workers=4, concurrency=2, deadlines={'scrape_gamma': 0.1})
+    jobs = fanout.plan(['Sydney', 'Perth'], spread=0.5)
+    assert [j.name for j in jobs] == ['scrape_alpha:Sydney', 'scrape_beta:Sydney', 'scrape_gamma:Sydney',
+                                      'scrape_alpha:Perth', 'scrape_beta:Perth']
+    assert [round(j.offset, 2) for j in jobs] == [0.0, 0.1, 0.2, 0.3, 0.4]
+
+    began = time.monotonic()
+    result = fanout.run(['Sydney', 'Perth'], spread=0.5)
+    assert starts[('beta', 'Perth')] - began >= 0.39
+    assert result.cities['Sydney'].stats['scrape_gamma'].status == 'timeout'
+    assert result.duration < 0.9
+
+
+def test_failures_are_isolated_per_job():
+    def scrape(s, city):
+        if s.name == 'alpha':
+            raise RuntimeError('boom')
+        return [{'source': s.source, 'city': city, 'original_url': f'{s.listing_url(city)}/1'}]
+
+    result = CityFanout(registry_with(scrape), max_workers=4).run(['Sydney'])
+    stats = result.cities['Sydney'].stats
+    assert stats['scrape_alpha'].status == 'failed' and 'boom' in stats['scrape_alpha'].error
+    assert stats['scrape_beta'].status == 'ok' and stats['scrape_gamma'].status == 'ok'
+    assert len(result.items) == 2
+
+
+def test_timed_out_job_keeps_its_host_until_it_returns():
+    ended, starts = {}, {}
+
+    def scrape(s, city):
+        starts[(s.name, city)] = time.monotonic()
+        if s.name == 'alpha':
+            time.sleep(0.3)
+        ended[(s.name, city)] = time.monotonic()
+        return []
+
+    fanout = CityFanout(registry_with(scrape), max_workers=4, concurrency=1, deadlines={'scrape_alpha': 0.05})
+    result = fanout.run(['Perth'])
+    assert result.cities['Perth'].stats['scrape_alpha'].status == 'timeout'
+    # beta shares alpha's host, so it only starts once alpha's thread is done
+    assert starts[('beta', 'Perth')] >= ended[('alpha', 'Perth')]
+
+
+def test_deadline_starts_when_the_job_starts():
+    def scrape(s, city):
+        time.sleep(0.15)
+        return [{'source': s.source, 'city': city, 'original_url': f'{s.listing_url(city)}/1'}]
+
+    # one worker: the second job waits in line ~0.15s, which is not part of its deadline
+    fanout = CityFanout(registry_with(scrape), max_workers=1, deadline=0.25)
+    result = fanout.run(['Perth'])
+    assert [st.status for st in result.cities['Perth'].stats.values()] == ['ok', 'ok']
+
+
+def test_city_processing_does_not_hold_up_dispatch():
+    gate = threading.Event()
+    starts = {}
+
+    def scrape(s, city):
+        starts[(s.name, city)] = time.monotonic()
+        return []
+
+    def on_city(run):
+        if run.city == 'Sydney':
+            gate.wait(1)
+        return {'city': run.city}
+
+    fanout = CityFanout(registry_with(scrape), max_workers=4, concurrency=1)
+    timer = threading.Timer(0.2, gate.set)
+    timer.start()
+    began = time.monotonic()
+    result = fanout.run(['Sydney', 'Perth'], on_city=on_city)
+    timer.cancel()
+    assert starts[('beta', 'Perth')] - began < 0.15
+    assert result.cities['Sydney'].counts == {'city': 'Sydney'}
+    assert result.cities['Perth'].counts == {'city': 'Perth'}
+
+
+def test_crashing_source_is_reported_as_failed(monkeypatch):
+    # the package re-exports a Registry instance under the module's name
+    registry_mod = sys.modules['scrapers.registry']
+
+    def broken_crawl(url, source, city, parse_listing, **kwargs):
+        raise ConnectionError('connection reset')
+
+    monkeypatch.setattr(registry_mod, 'allowed_by_robots', lambda url: True)
+    monkeypatch.setattr(registry_mod, 'crawl_source', broken_crawl)
+    reg = Registry()
+    reg.register(spec('alpha', 'https://alpha.example'))
+    result = CityFanout(reg).run(['Sydney'])
+    stats = result.cities['Sydney'].stats['scrape_alpha']
+    assert stats.status == 'failed' and 'connection reset' in stats.error
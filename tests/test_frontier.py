@@ -0,0 +1,141 @@
+import json
+from urllib.parse import urljoin
+
+import pytest
+
+from scrapers import frontier as fr
+
+BASE = 'https://crawl.example'
+
+LISTING_1 = """
+<div class="card"><a href="/e/1">One</a></div>
+<div class="card"><a href="/e/2">Two</a></div>
+<a rel="next" href="/list?page=2">Next</a>
+"""
+LISTING_2 = """
+<div class="card"><a href="/e/2">Two</a></div>
+<div class="card"><a href="/e/3">Three</a></div>
+<a rel="next" href="/list?page=3">Next</a>
+"""
+LISTING_3 = '<div class="card"><a href="/e/4">Four</a></div>'
+
+
+def detail(n):
+    data = {'@context': 'https://schema.org', '@type': 'MusicEvent', 'description': f'About {n}',
+            'location': {'@type': 'Place', 'name': 'Hall',
+                         'address': {'streetAddress': '1 George St', 'addressLocality': 'Sydney'}}}
+    return f'<script type="application/ld+json">{json.dumps(data)}</script>'
+
+
+PAGES = {
+    f'{BASE}/list': LISTING_1,
+    f'{BASE}/list?page=2': LISTING_2,
+    f'{BASE}/list?page=3': LISTING_3,
+    **{f'{BASE}/e/{n}': detail(n) for n in range(1, 5)},
+}
+
+
+class Resp:
+    def __init__(self, text):
+        self.text = text
+
+
+class NoDelay:
+    def delay(self, url):
+        return 0.0
+
+
+def parse(soup, page_url, city):
+    return [{'title': a.get_text(strip=True), 'original_url': urljoin(BASE, a['href']), 'city': city}
+            for a in soup.select('.card a')]
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    log = []
+
+    def fetch(url):
+        log.append(url)
+        return Resp(PAGES[url])
+
+    monkeypatch.setattr(fr, 'robots_cache', lambda: NoDelay())
+    monkeypatch.setattr(fr, 'allowed_by_robots', lambda url: True)
+    monkeypatch.setattr(fr, 'get_session', lambda url: None)
+    monkeypatch.setattr(fr, 'conditional_get', lambda session, url, **kw: fetch(url))
+    monkeypatch.setattr(fr, 'detail_cache', lambda cache=fr.DetailCache(fr.StateDB(':memory:')): cache)
+    monkeypatch.setattr(fr, 'listing_cache', lambda cache=fr.ListingCache(fr.StateDB(':memory:')): cache)
+    return log, fetch
+
+
+def test_crawl_follows_pagination_and_enriches_details(fetched):
+    log, fetch = fetched
+    frontier = fr.CrawlFrontier(fetch=fetch, workers=3, host_delay=0)
+    items = fr.crawl_source(f'{BASE}/list', 'Test', 'Sydney', parse, frontier=frontier)
+    assert [i['title'] for i in items] == ['One', 'Two', 'Three', 'Four']
+    assert items[0]['address'] == '1 George St, Sydney'
+    assert items[0]['venue'] == 'Hall'
+    assert items[3]['description'] == 'About 4'
+    # detail page for /e/2 is linked twice but fetched once; the second link is
+    # either a queued duplicate or, once the first fetch finished, a cache hit
+    assert log.count(f'{BASE}/e/2') == 1
+    assert frontier.stats.duplicates + frontier.stats.detail_cache_hits >= 1
+
+
+def test_budgets_and_unchanged_details_are_skipped(fetched):
+    log, fetch = fetched
+    frontier = fr.CrawlFrontier(fetch=fetch, host_delay=0, max_depth=0)
+    items = fr.crawl_source(f'{BASE}/list', 'Test', 'Sydney', parse, frontier=frontier)
+    assert [i['title'] for i in items] == ['One', 'Two']
+    assert f'{BASE}/list?page=2' not in log
+
+    log.clear()
+    frontier = fr.CrawlFrontier(fetch=fetch, host_delay=0, max_depth=0)
+    items = fr.crawl_source(f'{BASE}/list', 'Test', 'Sydney', parse, frontier=frontier)
+    # listing data unchanged: detail fields come from the cache, no detail fetches
+    assert log == [f'{BASE}/list']
+    assert frontier.stats.detail_cache_hits == 2
+    assert items[1]['address'] == '1 George St, Sydney'
+
+
+def test_unchanged_first_page_still_checks_later_pages(fetched, monkeypatch):
+    log, fetch = fetched
+    fr.crawl_source(f'{BASE}/list', 'Test', 'Sydney', parse, frontier=fr.CrawlFrontier(fetch=fetch, host_delay=0))
+    unchanged = {f'{BASE}/list'}
+
+    def conditional(session, url, source=None, city=None):
+        if url in unchanged:
+            log.append(url)
+            raise fr.NotModified(url, source, city)
+        return fetch(url)
+
+    monkeypatch.setattr(fr, 'conditional_get', conditional)
+    monkeypatch.setitem(PAGES, f'{BASE}/list?page=2', LISTING_2.replace('/e/3">Three', '/e/5">Five'))
+    monkeypatch.setitem(PAGES, f'{BASE}/e/5', detail(5))
+    log.clear()
+    items = fr.crawl_source(f'{BASE}/list', 'Test', 'Sydney', parse,
+                            frontier=fr.CrawlFrontier(fetch=fetch, host_delay=0))
+    # page 1 comes from the listing cache, the new event on page 2 is found
+    assert [i['title'] for i in items] == ['One', 'Two', 'Five', 'Four']
+    assert items[0]['address'] == '1 George St, Sydney'
+    assert f'{BASE}/e/5' in log and f'{BASE}/e/1' not in log
+
+    # only when no listing page changed is the whole source unchanged
+    unchanged.update({f'{BASE}/list?page=2', f'{BASE}/list?page=3'})
+    with pytest.raises(fr.NotModified):
+        fr.crawl_source(f'{BASE}/list', 'Test', 'Sydney', parse, frontier=fr.CrawlFrontier(fetch=fetch, host_delay=0))
+
+
+def test_host_delay_spaces_requests():
+    times = []
+
+    def fetch(url):
+        times.append(fr.time.monotonic())
+        return Resp('')
+
+    frontier = fr.CrawlFrontier(fetch=fetch, workers=4, host_delay=0.1)
+    frontier._host_delay = lambda url: 0.1
+    for n in range(3):
+        frontier.add(f'{BASE}/p/{n}', lambda f, t, r: None)
+    frontier.run()
+    gaps = [b - a for a, b in zip(times, times[1:])]
+    assert len(times) == 3 and all(g >= 0.09 for g in gaps)
@@ -0,0 +1,105 @@
+import os
+os.environ.setdefault('DB_PATH', 'sqlite:///:memory:')
+from datetime import datetime, timedelta, timezone
+
+import app as appmod
+
+
+def _item(url, **kw):
+    d = {'title': 'Ingest Event', 'original_url': url, 'city': 'Sydney', 'source': 'Test'}
+    d.update(kw)
+    return d
+
+
+def teardown_function(function):
+    db = appmod.SessionLocal()
+    db.query(appmod.Event).filter(appmod.Event.original_url.like('http://example.com/ingest/%')).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+def test_ingest_inserts_updates_and_deactivates():
+    now = datetime.now(timezone.utc)
+    db = appmod.SessionLocal()
+    db.add(appmod.Event(title='Old', original_url='http://example.com/ingest/stale', city='Sydney',
+                        last_scraped_time=now - timedelta(days=5), active=True))
+    db.add(appmod.Event(title='Before', original_url='http://example.com/ingest/1', city='Sydney',
+                        last_scraped_time=now - timedelta(days=5), active=False))
+    db.commit()
+    db.close()
+
+    counts = appmod.ingest_events([
+        _item('http://example.com/ingest/1', title='After'),
+        _item('http://example.com/ingest/2'),
+        _item('http://example.com/ingest/2'),
+        _item(None),
+    ], now=now)
+    assert counts['seen'] == 2
+    assert counts['inserted'] == 1
+    assert counts['updated'] == 1
+    assert counts['deactivated'] == 1
+
+    db = appmod.SessionLocal()
+    rows = {e.original_url: e for e in db.query(appmod.Event).filter(appmod.Event.original_url.like('http://example.com/ingest/%'))}
+    db.close()
+    assert rows['http://example.com/ingest/1'].title == 'After'
+    assert rows['http://example.com/ingest/1'].active is True
+    assert rows['http://example.com/ingest/2'].active is True
+    assert rows['http://example.com/ingest/stale'].active is False
+
+
+def test_ingest_unchanged_items_are_not_counted_as_updates():
+    now = datetime.now(timezone.utc)
+    appmod.ingest_events([_item('http://example.com/ingest/3')], now=now)
+    counts = appmod.ingest_events([_item('http://example.com/ingest/3')], now=now + timedelta(minutes=30))
+    del counts['run_id']
+    assert counts == {'seen': 1, 'inserted': 0, 'updated': 0, 'unchanged': 1, 'deactivated': 0}
+
+
+def test_fingerprints_backfilled_and_changes_logged():
+    now = datetime.now(timezone.utc)
+    db = appmod.SessionLocal()
+    # stored before fingerprints existed
+    db.add(appmod.Event(title='Ingest Event', original_url='http://example.com/ingest/legacy', city='Sydney',
+                        source='Test', last_scraped_time=now, active=True))
+    db.add(appmod.Event(title='Gone', original_url='http://example.com/ingest/gone', city='Sydney',
+                        last_scraped_time=now - timedelta(days=5), active=True))
+    db.commit()
+    db.close()
+
+    counts = appmod.ingest_events([
+        _item('http://example.com/ingest/legacy'),
+        _item('http://example.com/ingest/new', venue='Hall'),
+    ], now=now, run_id='run-1')
+    assert (counts['inserted'], counts['updated'], counts['unchanged'], counts['deactivated']) == (1, 0, 1, 1)
+
+    counts = appmod.ingest_events([
+        _item('http://example.com/ingest/legacy'),
+        _item('http://example.com/ingest/new', venue='Town Hall'),
+    ], now=now + timedelta(minutes=30), run_id='run-2')
+    assert (counts['updated'], counts['unchanged']) == (1, 1)
+
+    db = appmod.SessionLocal()
+    legacy = db.query(appmod.Event).filter(appmod.Event.original_url == 'http://example.com/ingest/legacy').one()
+    assert legacy.content_hash == appmod.event_fingerprint(appmod.normalize_event(_item(legacy.original_url)))
+    log = db.query(appmod.EventChange).filter(appmod.EventChange.run_id.in_(['run-1', 'run-2'])).all()
+    db.close()
+    assert sorted((c.run_id, c.change, c.original_url.rsplit('/', 1)[-1]) for c in log) == [
+        ('run-1', 'deactivated', 'gone'), ('run-1', 'inserted', 'new'), ('run-2', 'updated', 'new')]
+    assert [c.to_dict()['fields'] for c in log if c.change == 'updated'] == [['venue']]
+
+
+def test_unchanged_sources_are_kept_active():
+    now = datetime.now(timezone.utc)
+    db = appmod.SessionLocal()
+    db.add(appmod.Event(title='Quiet', original_url='http://example.com/ingest/quiet', city='Sydney', source='Quiet',
+                        last_scraped_time=now - timedelta(days=5), active=True))
+    db.commit()
+    db.close()
+
+    counts = appmod.ingest_events([], now=now, unchanged={('Quiet', 'Sydney')})
+    assert counts['deactivated'] == 0
+    db = appmod.SessionLocal()
+    ev = db.query(appmod.Event).filter(appmod.Event.original_url == 'http://example.com/ingest/quiet').one()
+    db.close()
+    assert ev.active is True
@@ -0,0 +1,62 @@
+import threading
+import time
+
+from sqlalchemy import create_engine, insert
+
+import jobs
+
+
+class NoLock:
+    def acquire(self):
+        return True
+
+    def release(self):
+        pass
+
+
+def test_overlapping_runs_are_coalesced_into_one_follow_up():
+    gate = threading.Event()
+    calls = []
+
+    def job(**kwargs):
+        calls.append(kwargs)
+        gate.wait(2)
+
+    runner = jobs.JobRunner(job, NoLock(), name='test')
+    assert runner.start(n=1) == 'started'
+    while not calls:
+        time.sleep(0.01)
+    assert [runner.run(n=i) for i in (2, 3, 4)] == ['coalesced'] * 3
+    gate.set()
+    assert runner.wait(2)
+    # one follow-up run with the latest request's arguments
+    assert calls == [{'n': 1}, {'n': 4}]
+    assert (runner.runs, runner.coalesced) == (2, 3)
+
+
+def test_database_lock_is_exclusive_and_expired_leases_are_taken_over(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'locks.db'}")
+    a = jobs.DatabaseLock(engine, 'scrape', ttl=30)
+    b = jobs.DatabaseLock(engine, 'scrape', ttl=30)
+    assert a.acquire()
+    assert not b.acquire()
+    assert jobs.JobRunner(lambda: None, b, name='test').run() == 'skipped'
+    a.release()
+    assert b.acquire()
+    b.release()
+
+    # a holder that died without releasing
+    with engine.begin() as conn:
+        conn.execute(insert(jobs.job_locks).values(name='scrape', owner='gone', expires_at=time.time() - 1))
+    assert a.acquire()
+    a.release()
+
+
+def test_file_lock_is_exclusive(tmp_path):
+    path = str(tmp_path / 'scrape.lock')
+    a, b = jobs.lock_from_url(f'file://{path}', None, 'scrape'), jobs.FileLock(path)
+    assert a.acquire()
+    assert not b.acquire()
+    a.release()
+    assert b.acquire()
+    b.release()
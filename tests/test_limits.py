@@ -0,0 +1,90 @@
+import threading
+
+from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from limits import MemoryStore, RateLimiter, SessionStore, SqliteStore, store_from_url
+
+
+def test_token_bucket_refills_and_expires():
+    store = MemoryStore()
+    assert [store.take("ip", 3, 60, now=100)[0] for _ in range(4)] == [True, True, True, False]
+    allowed, retry_after = store.take("ip", 3, 60, now=100)
+    assert not allowed and retry_after == 20  # one token every 20s
+    assert store.take("ip", 3, 60, now=120)[0]
+    # a refilled bucket is forgotten
+    assert store.purge(now=150) == 0
+    assert store.purge(now=181) == 1 and len(store) == 0
+
+
+def test_sqlite_store_is_shared_between_processes(tmp_path):
+    # two stores on one file stand in for two gunicorn workers
+    path = str(tmp_path / "state.db")
+    a, b = SqliteStore(path), SqliteStore(path)
+    assert a.take("ip", 2, 60, now=0)[0] and b.take("ip", 2, 60, now=0)[0]
+    assert not a.take("ip", 2, 60, now=0)[0] and not b.take("ip", 2, 60, now=1)[0]
+
+    sessions_a, sessions_b = SessionStore(a, ttl=60), SessionStore(b, ttl=60)
+    token = sessions_a.create()
+    assert sessions_b.valid(token) and not sessions_b.valid("forged")
+    sessions_b.revoke(token)
+    assert not sessions_a.valid(token)
+    SessionStore(a, ttl=-1).create()  # already expired
+    assert b.purge(now=1e12) == 2
+
+
+def test_decorator_limits_any_route():
+    app = Flask(__name__)
+    limiter = RateLimiter(MemoryStore(), max_requests=2, window=3600)
+
+    @app.route("/search")
+    @limiter.limit()
+    def search():
+        return "ok"
+
+    @app.route("/login", methods=["POST"])
+    @limiter.limit(max_requests=1, window=60)
+    def login():
+        return "ok"
+
+    client = app.test_client()
+    assert [client.get("/search").status_code for _ in range(3)] == [200, 200, 429]
+    # separate buckets per route and per client
+    assert client.post("/login").status_code == 200
+    r = client.post("/login")
+    assert r.status_code == 429 and r.get_json() == {"error": "rate_limited"} and r.headers["Retry-After"] == "60"
+    # a forged X-Forwarded-For does not get a fresh bucket
+    assert client.get("/search", headers={"X-Forwarded-For": "203.0.113.9"}).status_code == 429
+
+
+def test_client_ip_is_the_hop_appended_by_the_trusted_proxy():
+    app = Flask(__name__)
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+    limiter = RateLimiter(MemoryStore(), max_requests=1, window=3600)
+
+    @app.route("/search")
+    @limiter.limit()
+    def search():
+        return "ok"
+
+    client = app.test_client()
+    assert client.get("/search", headers={"X-Forwarded-For": "198.51.100.1, 203.0.113.9"}).status_code == 200
+    # the client-supplied (leftmost) entry is ignored
+    assert client.get("/search", headers={"X-Forwarded-For": "198.51.100.2, 203.0.113.9"}).status_code == 429
+    assert client.get("/search", headers={"X-Forwarded-For": "203.0.113.10"}).status_code == 200
+
+
+def test_sweeper_starts_on_first_use_in_each_process(tmp_path, monkeypatch):
+    def sweepers():
+        return sum(t.name == "state-sweep" for t in threading.enumerate())
+
+    before = sweepers()
+    store = store_from_url(f"sqlite:///{tmp_path / 'state.db'}", sweep=3600)
+    assert sweepers() == before
+    store.take("ip", 2, 60)
+    store.get("session:x")
+    assert sweepers() == before + 1
+    # a forked worker starts its own
+    monkeypatch.setattr("os.getpid", lambda: -1)
+    assert store.take("ip", 2, 60)[0]
+    assert sweepers() == before + 2
@@ -0,0 +1,116 @@
+import smtplib
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from database import make_engine
+from mailer import MailQueue, SMTPPool, outbound_emails
+import app as appmod
+
+
+class FakeSMTP:
+    """Local SMTP stand-in recording handshakes and messages."""
+    instances = []
+    fail = {}  # recipient -> exception raised once when sending to it
+
+    def __init__(self, host, port, timeout=None):
+        self.handshakes = []
+        self.sent = []
+        self.closed = False
+        FakeSMTP.instances.append(self)
+
+    def starttls(self):
+        self.handshakes.append("starttls")
+
+    def login(self, user, password):
+        self.handshakes.append("login")
+
+    def noop(self):
+        return (250, b"OK")
+
+    def send_message(self, msg):
+        exc = FakeSMTP.fail.pop(msg["To"], None)
+        if exc is not None:
+            raise exc
+        self.sent.append(msg["To"])
+
+    def quit(self):
+        self.closed = True
+
+    close = quit
+
+
+def _queue(tmp_path, **kw):
+    FakeSMTP.instances.clear()
+    FakeSMTP.fail.clear()
+    engine = make_engine(f"sqlite:///{tmp_path / 'mail.db'}")
+    outbound_emails.create(engine)
+    pool = SMTPPool("smtp.test", 587, "user", "pass", factory=FakeSMTP)
+    return MailQueue(engine, pool, "events@example.com", **kw)
+
+
+def _enqueue(queue, count):
+    with queue.engine.begin() as conn:
+        for n in range(count):
+            queue.enqueue(conn, f"fan{n}@example.com", "Confirm", "Click", ref_id=n)
+
+
+def _rows(queue):
+    with queue.engine.connect() as conn:
+        return {r.to_addr: r for r in conn.execute(select(outbound_emails))}
+
+
+def test_batches_reuse_one_authenticated_connection(tmp_path):
+    delivered = []
+    queue = _queue(tmp_path, batch_size=20, on_sent=delivered.append)
+    _enqueue(queue, 45)
+
+    assert queue.drain() == 45
+    assert len(FakeSMTP.instances) == 1
+    assert FakeSMTP.instances[0].handshakes == ["starttls", "login"]
+    assert len(FakeSMTP.instances[0].sent) == 45
+    assert [len(batch) for batch in delivered] == [20, 20, 5]
+    assert {r.status for r in _rows(queue).values()} == {"sent"}
+
+
+def test_retries_with_backoff_and_gives_up_on_permanent_rejections(tmp_path):
+    queue = _queue(tmp_path, retry_base=30)
+    _enqueue(queue, 4)
+    FakeSMTP.fail.update({
+        "fan1@example.com": smtplib.SMTPRecipientsRefused({"fan1@example.com": (450, b"mailbox busy")}),
+        "fan2@example.com": smtplib.SMTPRecipientsRefused({"fan2@example.com": (550, b"no such user")}),
+        # the pooled connection was dropped by the server: reconnect and resend
+        "fan3@example.com": smtplib.SMTPServerDisconnected("gone"),
+    })
+
+    started = datetime.now(timezone.utc)
+    assert queue.drain() == 4
+    rows = _rows(queue)
+    assert rows["fan0@example.com"].status == "sent"
+    assert rows["fan3@example.com"].status == "sent" and len(FakeSMTP.instances) == 2
+    assert rows["fan2@example.com"].status == "failed" and "no such user" in rows["fan2@example.com"].last_error
+    busy = rows["fan1@example.com"]
+    assert busy.status == "queued" and busy.attempts == 1
+    assert busy.next_attempt_at.replace(tzinfo=timezone.utc) >= started + timedelta(seconds=30)
+
+    # not due yet; once due it goes out on a pooled connection
+    assert queue.drain() == 0
+    assert len(queue.claim(now=started + timedelta(seconds=31))) == 1
+
+
+def test_ticket_request_queues_confirmation_and_stamps_it_when_sent(monkeypatch):
+    FakeSMTP.instances.clear()
+    FakeSMTP.fail.clear()
+    monkeypatch.setattr(appmod.mail_queue, "pool", SMTPPool("smtp.test", factory=FakeSMTP))
+    client = appmod.app.test_client()
+    r = client.post('/api/ticket-request', json={'email': 'queued@example.com', 'event_url': 'https://example.com/e'})
+    assert r.status_code == 200
+
+    db = appmod.SessionLocal()
+    tr = db.query(appmod.TicketRequest).filter_by(email='queued@example.com').one()
+    assert tr.confirm_sent_at is None
+    appmod.mail_queue.drain()
+    db.expire_all()
+    assert tr.confirm_sent_at is not None
+    db.close()
+    assert FakeSMTP.instances[0].sent == ['queued@example.com']
@@ -0,0 +1,67 @@
+from sqlalchemy import event, inspect, text
+
+from database import make_engine
+from migrations import MIGRATIONS, Migration, Migrator
+import app as appmod
+
+
+def _columns(engine, table):
+    return {c["name"] for c in inspect(engine).get_columns(table)}
+
+
+def test_upgrades_a_pre_migration_database_once(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        # schema from before featured/city_key/start_at and the ticket confirmation columns
+        conn.execute(text("CREATE TABLE events (id INTEGER PRIMARY KEY, title VARCHAR(512) NOT NULL, start_time VARCHAR(128), "
+                          "end_time VARCHAR(128), venue VARCHAR(512), address VARCHAR(1024), city VARCHAR(128), "
+                          "description TEXT, category VARCHAR(256), image_url VARCHAR(1024), source VARCHAR(256), "
+                          "original_url VARCHAR(1024), last_scraped_time DATETIME, active BOOLEAN)"))
+        conn.execute(text("CREATE INDEX ix_events_city_active_start ON events (city, active, start_time)"))
+        conn.execute(text("CREATE TABLE ticket_requests (id INTEGER PRIMARY KEY, email VARCHAR(320) NOT NULL, "
+                          "consent BOOLEAN, event_id INTEGER, event_url VARCHAR(1024), created_at DATETIME)"))
+        conn.execute(text("INSERT INTO events (title, city, original_url, active) VALUES ('Old', ' Sydney ', 'http://x/old', 1)"))
+
+    migrator = Migrator(engine, appmod.Base.metadata)
+    assert migrator.upgrade() == [m.version for m in MIGRATIONS]
+    assert {"featured", "city_key", "start_at", "end_at", "content_hash"} <= _columns(engine, "events")
+    assert {"confirmed", "confirm_token", "ip_address", "user_agent"} <= _columns(engine, "ticket_requests")
+    indexes = {i["name"] for i in inspect(engine).get_indexes("events")}
+    assert "ix_events_city_active_start_at" in indexes and "ix_events_city_active_start" not in indexes
+    assert "scrape_jobs" in inspect(engine).get_table_names()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT city_key, featured FROM events")).one() == ("sydney", 0)
+
+    # a current schema costs startup a single version check
+    statements = []
+    listener = lambda *a, **kw: statements.append(a[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    assert Migrator(engine, appmod.Base.metadata).upgrade() == []
+    event.remove(engine, "before_cursor_execute", listener)
+    assert sum("schema_migrations" in s for s in statements) == 1
+
+
+def test_new_migrations_apply_in_order_and_wait_for_the_lock(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    Migrator(engine, appmod.Base.metadata).upgrade()
+    calls = []
+
+    class BusyOnce:
+        attempts = 0
+
+        def acquire(self):
+            self.attempts += 1
+            return self.attempts > 1
+
+        def release(self):
+            calls.append("release")
+
+    head = MIGRATIONS[-1].version
+    extra = [
+        Migration(head + 2, "second", lambda ctx: calls.append(("second", ctx.transactional)), transactional=False),
+        Migration(head + 1, "first", lambda ctx: calls.append(("first", ctx.transactional))),
+    ]
+    migrator = Migrator(engine, appmod.Base.metadata, migrations=MIGRATIONS + extra, lock=BusyOnce)
+    assert migrator.upgrade() == [head + 1, head + 2]
+    assert calls == [("first", True), ("second", False), "release"]
+    assert migrator.current() == head + 2 and migrator.pending() == []
@@ -0,0 +1,58 @@
+import threading
+import time
+
+from limits import MemoryStore
+from mxcache import MXCache
+import app as appmod
+
+
+def test_results_are_cached_with_positive_negative_and_error_ttls():
+    calls = []
+
+    def resolve(domain):
+        calls.append(domain)
+        if domain == "broken.test":
+            raise RuntimeError("SERVFAIL")
+        return domain == "good.test"
+
+    cache = MXCache(resolve, positive_ttl=60, negative_ttl=60, error_ttl=0)
+    assert cache.check("Gmail.com", 1) is True  # known provider: no lookup
+    assert cache.check("good.test", 1) is True
+    assert cache.check("bad.test", 1) is False
+    assert cache.check("broken.test", 1) is None
+    assert cache.check("GOOD.test ", 1) is True and cache.check("bad.test", 1) is False
+    assert cache.check("broken.test", 1) is None  # error TTL 0: looked up again
+    assert calls == ["good.test", "bad.test", "broken.test", "broken.test"]
+
+
+def test_slow_lookups_are_bounded_and_shared():
+    release = threading.Event()
+    calls = []
+
+    def resolve(domain):
+        calls.append(domain)
+        release.wait(5)
+        return True
+
+    cache = MXCache(resolve)
+    started = time.monotonic()
+    assert cache.check("slow.test", 0.05) is None
+    assert cache.check("slow.test", 0.05) is None  # joins the lookup in flight
+    assert time.monotonic() - started < 1
+    release.set()
+    assert cache.lookup("slow.test").result(5) is True
+    assert cache.check("slow.test", 0) is True and calls == ["slow.test"]
+
+
+def test_ticket_request_checks_rate_limit_before_dns(monkeypatch):
+    looked_up = []
+    monkeypatch.setattr(appmod, "mx_cache", MXCache(lambda d: looked_up.append(d) or True))
+    monkeypatch.setattr(appmod.rate_limiter, "store", MemoryStore())
+    client = appmod.app.test_client()
+    statuses = [
+        client.post('/api/ticket-request', json={'email': f'fan@domain{n}.test'},
+                    headers={'X-Forwarded-For': '198.51.100.7'}).status_code
+        for n in range(appmod.RATE_LIMIT_MAX + 2)
+    ]
+    assert statuses.count(429) == 2
+    assert len(looked_up) == appmod.RATE_LIMIT_MAX
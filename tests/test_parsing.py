@@ -0,0 +1,53 @@
+import pytest
+
+from scrapers import allevents, eventfinda, skiddle
+from scrapers.frontier import extract_detail, find_next_page
+from scrapers.parsing import make_soup, DETAIL_STRAINER, HAVE_LXML
+
+PARSERS = ['html.parser'] + (['lxml'] if HAVE_LXML else [])
+
+NOISE = ''.join(f'<li><a href="/nav/{i}">Nav {i}</a></li>' for i in range(20))
+
+LISTINGS = {
+    allevents: '<div class="event-card"><a href="/sydney/e-{i}">Event {i}</a>'
+               '<span class="date">Sat {d} Mar 2026</span><span class="venue">Venue {i}</span></div>',
+    eventfinda: '<div class="ef-event"><a href="/event/{i}"><span class="ef-title">Event {i}</span></a>'
+                '<span class="ef-date">{d} March 2026</span></div>',
+    skiddle: '<div class="card"><a href="/whats-on/e-{i}"><h3 class="title">Event {i}</h3></a>'
+             '<span class="date">{d}/03/2026</span></div>',
+}
+
+
+def page(module):
+    cards = ''.join(LISTINGS[module].format(i=i, d=i + 1) for i in range(5))
+    return (f'<html><head><script>var x = 1;</script></head><body><ul>{NOISE}</ul>'
+            f'<main>{cards}</main><ul class="pagination"><li><a rel="next" href="?page=2">Next</a></li></ul>'
+            f'<footer>{NOISE}</footer></body></html>')
+
+
+@pytest.mark.parametrize('parser', PARSERS)
+@pytest.mark.parametrize('module', list(LISTINGS), ids=lambda m: m.__name__.rsplit('.', 1)[-1])
+def test_strained_listing_matches_full_parse(module, parser):
+    html = page(module)
+    url = f'{module.BASE}/listing'
+    full = module.parse_listing(make_soup(html, parser='html.parser'), url, 'Sydney')
+    strained_soup = make_soup(html, parse_only=module.CARDS, parser=parser)
+
+    assert len(full) == 5
+    assert module.parse_listing(strained_soup, url, 'Sydney') == full
+    assert 'Nav 3' not in strained_soup.get_text()
+    assert find_next_page(strained_soup, url) == f'{url}?page=2'
+
+
+@pytest.mark.parametrize('parser', PARSERS)
+def test_detail_strainer_keeps_structured_data(parser):
+    html = ('<html><head><meta property="og:description" content="Fallback">'
+            '<script>track()</script>'
+            '<script type="application/ld+json">{"@type": "Event", "description": "Live music",'
+            ' "location": {"name": "Hall", "address": "1 George St"}}</script></head>'
+            f'<body><ul>{NOISE}</ul><span class="category">Music</span></body></html>')
+    full = extract_detail(make_soup(html, parser='html.parser'))
+    strained = extract_detail(make_soup(html, parse_only=DETAIL_STRAINER, parser=parser))
+
+    assert strained == full
+    assert strained['description'] == 'Live music'
@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from bs4 import BeautifulSoup
+
+from scrapers import registry as default_registry
+from scrapers.extract import compile_selector
+from scrapers.registry import Registry
+
+PAGE = """
+<div class="event"><a href="/e/1">One</a><time datetime="2026-03-01T19:00">1 Mar</time>
+  <span class="venue">Hall</span><img data-src="/1.jpg" src="/ph.gif"></div>
+<div class="event"><a href="/e/2">Two</a></div>
+<div class="event"><span>no link</span></div>
+"""
+
+EXAMPLE = {
+    'source': 'Example',
+    'base': 'https://example.com',
+    'url': '{base}/events/{city}',
+    'items': '.event',
+    'fields': {
+        'start_time': 'time',
+        'start_datetime': {'selector': 'time', 'attr': 'datetime'},
+        'venue': '.venue',
+        'image_url': {'selector': 'img', 'attr': ['data-src', 'src']},
+    },
+}
+
+
+def test_builtin_sources_registered_in_order():
+    assert [s.job_name for s in default_registry.enabled()] == [
+        'scrape_allevents', 'scrape_eventfinda', 'scrape_skiddle', 'scrape_sydney_com', 'scrape_cityofsydney']
+
+
+def test_source_added_from_config(tmp_path):
+    reg = Registry()
+    path = tmp_path / 'sources.json'
+    path.write_text(json.dumps({'example': EXAMPLE}))
+    reg.load(str(path))
+
+    spec = reg.get('example')
+    assert spec.listing_url('Sydney') == 'https://example.com/events/Sydney'
+    assert spec.strainer is not None
+    items = spec.parse_listing(BeautifulSoup(PAGE, 'html.parser'), spec.listing_url('Sydney'), 'Sydney')
+    assert [i['original_url'] for i in items] == ['https://example.com/e/1', 'https://example.com/e/2']
+    assert items[0]['start_datetime'] == '2026-03-01T19:00'
+    assert items[0]['venue'] == 'Hall' and items[0]['image_url'] == '/1.jpg'
+    assert items[1]['venue'] is None and items[1]['source'] == 'Example'
+    # selectors are compiled once and shared
+    assert spec.extractor._items is compile_selector('.event')
+
+
+def test_configure_tunes_and_disables_sources():
+    reg = Registry()
+    reg.configure(overrides={'example': EXAMPLE, 'other': {**EXAMPLE, 'source': 'Other'}})
+    reg.configure(overrides={'example': {'limit': 1, 'fields': {'venue': '.place'}}}, enabled=['example'])
+
+    assert [name for name, _ in reg.jobs()] == ['scrape_example']
+    spec = reg.get('example')
+    assert spec.fields['start_time'] == 'time' and spec.fields['venue'] == '.place'
+    assert len(spec.parse_listing(BeautifulSoup(PAGE, 'html.parser'), '', 'Sydney')) == 1
+
+    with pytest.raises(ValueError):
+        reg.configure(overrides={'broken': {**EXAMPLE, 'fields': {'price': '.price'}}})
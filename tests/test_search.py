@@ -0,0 +1,103 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+import app as appmod
+import search
+from search import fts5_query, tsquery
+
+Event = appmod.Event
+SessionLocal = appmod.SessionLocal
+
+ITEMS = [
+    {'title': 'Harbour Jazz Night', 'original_url': 'http://example.com/s/1', 'city': 'Sydney',
+     'venue': 'Opera Bar', 'description': 'Live music by the water', 'source': 'SearchTest'},
+    {'title': 'Food Fair', 'original_url': 'http://example.com/s/2', 'city': 'Sydney',
+     'venue': 'Town Hall', 'description': 'Stalls, and a jazz trio in the afternoon', 'source': 'SearchTest'},
+    {'title': 'Jazz Brunch', 'original_url': 'http://example.com/s/3', 'city': 'Melbourne',
+     'venue': 'Café Écoute', 'source': 'SearchTest'},
+]
+
+
+@pytest.fixture(autouse=True)
+def events():
+    appmod.ingest_events(ITEMS)
+    yield
+    db = SessionLocal()
+    db.query(Event).filter(Event.source == 'SearchTest').delete()
+    db.commit()
+    db.close()
+
+
+def _titles(**params):
+    r = appmod.app.test_client().get('/api/events/search', query_string=params)
+    assert r.status_code == 200
+    return [e['title'] for e in r.get_json()]
+
+
+def test_query_builders_quote_words_and_prefix_the_last():
+    assert fts5_query('Jazz "AND" nig') == '"jazz" "and" "nig"*'
+    assert fts5_query('jazz', prefix=False) == '"jazz"'
+    assert fts5_query(' -*() ') is None
+    assert tsquery('harbour ni') == 'harbour & ni:*'
+
+
+def test_title_matches_rank_above_description_matches():
+    assert _titles(q='jazz', city='Sydney') == ['Harbour Jazz Night', 'Food Fair']
+    everywhere = _titles(q='jazz')
+    assert sorted(everywhere[:2]) == ['Harbour Jazz Night', 'Jazz Brunch'] and everywhere[2] == 'Food Fair'
+
+
+def test_typeahead_prefix_and_diacritics():
+    # only the last word is a prefix
+    assert _titles(q='harbour ni') == ['Harbour Jazz Night']
+    assert _titles(q='harb ni') == []
+    assert _titles(q='harb', prefix='false') == []
+    assert _titles(q='cafe ecoute') == ['Jazz Brunch']
+
+
+def test_index_follows_updates_and_deletes():
+    db = SessionLocal()
+    ev = db.query(Event).filter_by(original_url='http://example.com/s/2').one()
+    ev.title = 'Night Market'
+    db.commit()
+    assert _titles(q='market') == ['Night Market']
+    db.delete(ev)
+    db.commit()
+    db.close()
+    appmod.response_cache.local.clear()
+    assert _titles(q='market') == []
+
+
+def test_query_without_words_is_rejected():
+    r = appmod.app.test_client().get('/api/events/search?q=%2B%2B')
+    assert r.status_code == 400
+
+
+def test_best_match_wins_over_newer_ones():
+    # many newer events mention the word only in passing
+    filler = [{'title': f'Weekly Market {n}', 'original_url': f'http://example.com/s/f{n}', 'city': 'Perth',
+               'description': 'with a saxophone set', 'source': 'SearchTest'} for n in range(30)]
+    appmod.ingest_events([{'title': 'Saxophone Summit', 'original_url': 'http://example.com/s/sax',
+                           'city': 'Perth', 'source': 'SearchTest'}])
+    appmod.ingest_events(filler)
+    appmod.response_cache.local.clear()
+    assert _titles(q='saxophone', limit=1) == ['Saxophone Summit']
+
+
+def test_postgres_query_ranks_every_match():
+    q = search.apply_search(select(appmod.Event.id), appmod.Event.id, 'postgresql', 'Harbour ni')
+    compiled = q.compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "events.search_vector @@ to_tsquery('simple', %(tsq)s)" in sql
+    assert "ORDER BY ts_rank_cd(events.search_vector, to_tsquery('simple', %(tsq_rank)s)) DESC, events.id" in sql
+    assert compiled.params['tsq'] == compiled.params['tsq_rank'] == 'harbour & ni:*'
+    assert search.apply_search(select(appmod.Event.id), appmod.Event.id, 'postgresql', '++') is None
+
+
+def test_unsupported_database_answers_501(monkeypatch):
+    with pytest.raises(search.FeatureUnavailable):
+        search.apply_search(select(appmod.Event.id), appmod.Event.id, 'mssql', 'jazz')
+    monkeypatch.setattr(appmod.engine.dialect, 'name', 'mssql')
+    r = appmod.app.test_client().get('/api/events/search?q=jazz&limit=7')
+    assert r.status_code == 501 and 'not available' in r.get_json()['error']
@@ -0,0 +1,153 @@
+import pytest
+
+from scrapers import session as sess
+
+
+class FakeResp:
+    def __init__(self, status_code=200, text='', headers=None):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(self.status_code)
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, timeout=10, headers=None):
+        self.sent_headers.append(headers or {})
+        return self.responses.pop(0)
+
+
+class NoThrottle:
+    def wait(self, url):
+        pass
+
+
+@pytest.fixture
+def store(monkeypatch):
+    db = sess.StateDB(':memory:')
+    store = sess.ValidatorStore(db)
+    monkeypatch.setattr(sess, 'validator_store', lambda: store)
+    monkeypatch.setattr(sess, 'host_throttle', lambda: NoThrottle())
+    return store
+
+
+def test_conditional_get_sends_validators_and_short_circuits(store):
+    url = 'https://example.com/listing'
+    s = FakeSession([
+        FakeResp(text='<html>v1</html>', headers={'ETag': '"abc"', 'Last-Modified': 'Mon, 02 Mar 2026 00:00:00 GMT'}),
+        FakeResp(status_code=304),
+        FakeResp(text='<html>v1</html>'),
+        FakeResp(text='<html>v2</html>'),
+    ])
+    assert sess.conditional_get(s, url, source='Test').text == '<html>v1</html>'
+    store.commit(sources={'Test'})
+
+    with pytest.raises(sess.NotModified):
+        sess.conditional_get(s, url, source='Test', city='Sydney')
+    assert s.sent_headers[1] == {'If-None-Match': '"abc"', 'If-Modified-Since': 'Mon, 02 Mar 2026 00:00:00 GMT'}
+
+    # no validators honoured by the server, but the body hash is unchanged
+    with pytest.raises(sess.NotModified) as exc:
+        sess.conditional_get(s, url, source='Test', city='Sydney')
+    assert (exc.value.source, exc.value.city) == ('Test', 'Sydney')
+
+    assert sess.conditional_get(s, url, source='Test').text == '<html>v2</html>'
+
+
+def test_validators_of_sources_without_items_are_not_committed(store):
+    url = 'https://example.com/broken'
+    s = FakeSession([FakeResp(text='<html>x</html>'), FakeResp(text='<html>x</html>')])
+    sess.conditional_get(s, url, source='Broken')
+    store.commit(sources=set())
+    # fetched and parsed again in full
+    assert sess.conditional_get(s, url, source='Broken').text == '<html>x</html>'
+
+
+def test_commit_per_city_keeps_other_cities_staged(store):
+    store.stage('https://example.com/sydney', '"s"', None, 'h1', 'Test', 'Sydney')
+    store.stage('https://example.com/perth', '"p"', None, 'h2', 'Test', 'Perth')
+    assert store.commit(sources={'Test'}, city='Sydney') == 1
+    assert store.get('https://example.com/perth') is None
+    store.discard(city='Sydney')
+    assert store.commit(sources={'Test'}, city='Perth') == 1
+    assert store.get('https://example.com/perth')['etag'] == '"p"'
+
+
+ROBOTS = """User-agent: *
+Disallow: /private/
+Crawl-delay: 2
+"""
+
+
+def test_robots_fetched_once_per_host_and_persisted(tmp_path, monkeypatch):
+    calls = []
+
+    def fake_get(url, timeout=None, headers=None):
+        calls.append((url, timeout))
+        return FakeResp(text=ROBOTS, headers={'Cache-Control': 'public, max-age=600'})
+
+    monkeypatch.setattr(sess.requests, 'get', fake_get)
+    db = sess.StateDB(str(tmp_path / 'state.db'))
+    robots = sess.RobotsCache(db, timeout=3)
+    assert robots.allowed('https://example.com/events')
+    assert not robots.allowed('https://example.com/private/x')
+    assert robots.delay('https://example.com/events') == 2.0
+    assert calls == [('https://example.com/robots.txt', 3)]
+
+    # a restarted process reuses the persisted copy
+    restarted = sess.RobotsCache(sess.StateDB(str(tmp_path / 'state.db')))
+    assert not restarted.allowed('https://example.com/private/y')
+    assert restarted.fetches == 0
+    rows = db.execute("SELECT expires_at FROM robots_cache")
+    assert 0 < rows[0][0] - sess.time.time() <= 600
+
+
+def test_unreachable_robots_allows_but_is_cached_briefly(monkeypatch):
+    def fail(url, timeout=None, headers=None):
+        raise ConnectionError("unreachable")
+
+    monkeypatch.setattr(sess.requests, 'get', fail)
+    robots = sess.RobotsCache(sess.StateDB(':memory:'), error_ttl=60)
+    assert robots.allowed('https://down.example/events')
+    assert robots.allowed('https://down.example/other')
+    assert robots.fetches == 1
+
+
+def test_registry_reuses_pooled_connections_per_host():
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            body = b'<html>ok</html>'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f'http://127.0.0.1:{server.server_address[1]}'
+    registry = sess.SessionRegistry(pool_connections=1, pool_maxsize=2)
+    try:
+        for path in ('/a', '/b', '/c'):
+            s = registry.get(base + path)
+            assert s.get(base + path, timeout=5).status_code == 200
+        assert registry.get(base + '/d') is s
+        assert registry.stats()[base] == {'requests': 3, 'new_connections': 1, 'reused': 2}
+    finally:
+        registry.close()
+        server.shutdown()
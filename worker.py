@@ -0,0 +1,37 @@
+"""
+Standalone scrape and mail worker.
+
+Runs the scrape schedule and drains the outbound mail queue in its own
+process so the web workers only serve requests. Start the web app with
+``SCRAPER_SCHEDULER=off`` and ``MAIL_SENDER=off`` and run:
+
+    python worker.py
+
+The first scrape starts immediately. The shared job lock still guarantees a
+single run if a web process with an embedded scheduler is running as well.
+"""
+import os
+
+# this process drives the schedule and the mail workers itself
+os.environ["SCRAPER_SCHEDULER"] = "off"
+os.environ["MAIL_SENDER"] = "off"
+
+from apscheduler.schedulers.blocking import BlockingScheduler  # noqa: E402
+
+import app  # noqa: E402
+
+
+def main():
+    scheduler = app.create_scheduler(BlockingScheduler, run_now=True)
+    app.mail_queue.start()
+    print(f"Scrape worker started: every {app.SCRAPER_INTERVAL_MINUTES:g} minutes for {', '.join(app.SCRAPER_CITIES)}")
+    try:
+        scheduler.start()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        app.mail_queue.stop(timeout=10)
+
+
+if __name__ == "__main__":
+    main()